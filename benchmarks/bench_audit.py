@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作簿审计基准 / Workbook audit benchmark
+
+生成一批含有手写风格公式的工作簿（公式逐行向下填充、每个单元格单独保存，每行文本都不同），
+分别用单进程和全部CPU核心审计，报告每秒处理的MB数和公式数、峰值内存，并按此速度估算2 GB存档所需时间。
+Generates workbooks full of hand-written-style formulas (filled down and
+stored cell by cell, so every row has a different text), audits them in one
+process and on all CPU cores, and reports MB/s, formulas/s, peak memory and
+the projected time for a 2 GB archive.
+
+用法 / Usage: python benchmarks/bench_audit.py [workbooks] [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.audit import AUDIT_STATUSES, audit_workbooks  # noqa: E402
+from excel_function_maker.xlsx import XlsxWriter  # noqa: E402
+
+# 每行的公式：符合、写法不同、含义不同、不属于目录
+ROW_FORMULAS = [
+    "=VLOOKUP(A{row},$D$1:$F$1000,2,FALSE)",
+    "=sumif( $A$1:A{row}, \">10\" )",
+    "=COUNTIF(B{row}:C{row},apple)",
+    "=SUM(A{row}:C{row})*2",
+    '="a"&SUMPRODUCT(LEN(A{row}:J{row})-LEN(SUBSTITUTE(A{row}:J{row},"a","")))',
+]
+
+
+def peak_rss_mb():
+    """进程峰值内存（MB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_archive(directory, workbooks, rows):
+    for index in range(workbooks):
+        with XlsxWriter(os.path.join(directory, f"book{index:03d}.xlsx")) as writer:
+            for row in range(1, rows + 1):
+                writer.write_row([row, "text"] + [formula.format(row=row) for formula in ROW_FORMULAS])
+
+
+def main():
+    workbooks = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    directory = tempfile.mkdtemp()
+    make_archive(directory, workbooks, rows)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / (1024 * 1024)
+    print(f"{workbooks} workbooks x {rows:,} rows, {size:.1f} MB, {os.cpu_count()} CPU core(s)")
+
+    for label, workers in (("1 process", 1), ("all cores", 0)):
+        start = time.perf_counter()
+        formulas = 0
+        counts = dict.fromkeys(AUDIT_STATUSES, 0)
+        for result in audit_workbooks([directory], workers):
+            formulas += result.formulas
+            for status, count in result.counts.items():
+                counts[status] += count
+        elapsed = time.perf_counter() - start
+        projected = 2048 / (size / elapsed) / 60
+        print(f"{label:<10} {elapsed:6.2f}s {size / elapsed:6.1f} MB/s {formulas / elapsed:>10,.0f} formulas/s  "
+              f"2 GB in ~{projected:.0f} min  "
+              + " ".join(f"{status}={count}" for status, count in counts.items()))
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"peak RSS (main process) {peak:.1f} MB")
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
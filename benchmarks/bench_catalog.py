@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+函数目录启动开销基准 / Function catalog startup benchmark
+
+分别用13个和500个函数的目录，测量创建LanguageManager、首次获取函数表以及
+预先合并两种语言全部函数（旧做法）的耗时和内存。
+Measures LanguageManager construction, first get_functions() and an eager
+merge of both languages (the old approach) at 13 and 500 functions.
+
+用法 / Usage: python benchmarks/bench_catalog.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_function_maker.language as efm  # noqa: E402
+
+
+def build_catalog(target_dir, size):
+    """复制内置目录，并补充合成函数直到达到 size 个"""
+    shutil.copytree(efm.CATALOG_DIR, target_dir)
+    files = {name: os.path.join(target_dir, name) for name in ("functions.json", "zh.json", "en.json")}
+    data = {}
+    for name, path in files.items():
+        with open(path, "r", encoding="utf-8") as f:
+            data[name] = json.load(f)
+    catalog = data["functions.json"]
+    for i in range(size - len(catalog)):
+        key = f"FUNC{i:04d}"
+        catalog[key] = {"template": f"={key}({{0}},{{1}},{{2}})",
+                        "args": [{"kind": "range"}, {"kind": "criteria", "quote": True},
+                                 {"kind": "range", "optional": True}]}
+        for lang in ("zh", "en"):
+            data[f"{lang}.json"]["functions"][key] = {
+                "name": f"{key} {lang}", "description": f"Synthetic function {i} ({lang})",
+                "params": ["Range (e.g.: A1:A10)", "Criteria", "Sum range (optional)"],
+                "example": f"={key}(A1:A10,\">10\",B1:B10)"}
+    for name, path in files.items():
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data[name], f, ensure_ascii=False)
+
+
+def measure(label, func):
+    """测量一次调用的耗时和新增内存"""
+    efm._load_json.cache_clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed * 1000:9.3f} ms  {current / 1024:9.1f} KiB retained  {peak / 1024:9.1f} KiB peak")
+    return result
+
+
+def first_lookup(catalog_dir):
+    """创建管理器并取出一个函数定义（界面启动时的实际开销）"""
+    manager = efm.LanguageManager(catalog_dir)
+    functions = manager.get_functions()
+    return manager, functions["SUM"]
+
+
+def eager_both_languages(catalog_dir):
+    """预先合并两种语言的全部函数定义（旧版启动时的做法）"""
+    manager = efm.LanguageManager(catalog_dir)
+    return [dict(table[key]) for table in manager.functions.values() for key in table]
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        for size in (13, 500):
+            catalog_dir = os.path.join(tmp, f"catalog_{size}")
+            build_catalog(catalog_dir, size)
+            print(f"{size} functions:")
+            measure("LanguageManager()", lambda: efm.LanguageManager(catalog_dir))
+            measure("first get_functions()", lambda: first_lookup(catalog_dir))
+            measure("eager merge, both languages", lambda: eager_both_languages(catalog_dir))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
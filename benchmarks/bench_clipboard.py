@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板复制延迟基准 / Clipboard copy latency benchmark
+
+测量1个和10000个公式一次复制的延迟：TSV拼接、Tk剪贴板（需要图形显示环境）和 pyperclip
+（Linux上需要 xclip/xsel）。pyperclip 还测量逐个复制的旧方式，按少量样本估算全部耗时。
+不可用的方式会注明原因并跳过。
+Times one copy of 1 and of 10,000 formulas: building the TSV, Tk's clipboard
+(needs a display) and pyperclip (needs xclip/xsel on Linux). For pyperclip
+the old one-call-per-formula approach is also timed on a sample and
+extrapolated. Unavailable methods are reported and skipped.
+
+用法 / Usage: python benchmarks/bench_clipboard.py [formulas]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.clipboard import copy_rows, copy_text, to_tsv  # noqa: E402
+from excel_function_maker.fill import fill_down  # noqa: E402
+
+# 逐个复制的旧方式只测量这么多次
+LEGACY_SAMPLE = 20
+
+
+def best_ms(func, repeat=5):
+    """多次运行取最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    formulas = list(fill_down("=VLOOKUP(A1,$D$1:$F$1000,2,FALSE)", count))
+    sizes = [("1 formula", formulas[:1]), (f"{count:,} formulas", formulas)]
+
+    for label, rows in sizes:
+        print(f"{label}: build TSV {best_ms(lambda: to_tsv(rows)):.3f} ms ({len(to_tsv(rows)):,} chars)")
+
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"tk: not available ({e})")
+    else:
+        for label, rows in sizes:
+            # update() 让Tk处理剪贴板请求，计入延迟
+            print(f"{label}: tk {best_ms(lambda: (copy_rows(rows, root), root.update())):.3f} ms per copy")
+        root.destroy()
+
+    try:
+        copy_text("")
+    except Exception as e:
+        print(f"pyperclip: not available ({e})")
+        return 0
+    for label, rows in sizes:
+        print(f"{label}: pyperclip {best_ms(lambda: copy_rows(rows), repeat=3):.3f} ms per copy")
+    start = time.perf_counter()
+    for formula in formulas[:LEGACY_SAMPLE]:
+        copy_text(formula)
+    per_call = (time.perf_counter() - start) / LEGACY_SAMPLE * 1000
+    print(f"one pyperclip call per formula: {per_call:.3f} ms each, ~{per_call * count / 1000:.1f} s for {count:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌套公式组合基准 / Nested formula composition benchmark
+
+两种结构：深层嵌套（N层 IF，每层比较并返回同一个 VLOOKUP）和宽组合（N个 VLOOKUP 相加，查找值只有少数几种）。
+报告完整生成的时间，修改最深处一个参数后按缓存重新生成的时间和实际生成的节点数，
+以及提取重复调用为 LET 的耗时和公式长度变化。
+Two shapes: deep nesting (N levels of IF, each comparing and returning the
+same VLOOKUP) and a wide composition (N VLOOKUPs added together over a few
+lookup values). Reports the full render time, the memoized re-render after
+editing one leaf (with the number of nodes actually rendered), and the time
+and length change of hoisting repeated calls into LET.
+
+用法 / Usage: python benchmarks/bench_compose.py [N ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.compose import Composer, Formula, share_let  # noqa: E402
+from excel_function_maker.engine import FormulaEngine  # noqa: E402
+from excel_function_maker.formula import Expression  # noqa: E402
+
+SIZES = [50, 200, 500]
+# 宽组合中不同查找值的个数
+DISTINCT = 8
+
+
+def lookup(cell):
+    return Formula("VLOOKUP", [cell, "$D$1:$F$1000", "2", "FALSE"])
+
+
+def deep(count):
+    """IF(VLOOKUP(A1,...)>0, VLOOKUP(A1,...), IF(VLOOKUP(A2,...)>0, ...))，返回 (根节点, 最深的查找值路径)"""
+    node = Formula("IF", [Expression("TRUE"), "0", "0"])
+    for level in range(count, 0, -1):
+        value = lookup(f"A{level}")
+        node = Formula("IF", [Formula.expression("{0}>0", value), value, node])
+    # 每层的第3个参数是下一层，最后一层的第1个参数是比较，比较的第1个操作数是 VLOOKUP
+    return node, [2] * (count - 1) + [0, 0, 0]
+
+
+def wide(count):
+    """N个 VLOOKUP 相加，查找值在 DISTINCT 个单元格中循环，返回 (根节点, 最后一项的查找值路径)"""
+    terms = [lookup(f"A{i % DISTINCT + 1}") for i in range(count)]
+    template = "+".join(f"{{{i}}}" for i in range(count))
+    return Formula.expression(template, *terms), [count - 1, 0]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run(name, root, path, engine):
+    composer = Composer(engine, let=False)
+    formula, full = timed(composer.render, root)
+    full_renders = composer.renders
+    edited = root.update(path, "B1")
+    composer.renders = 0
+    edited_formula, incremental = timed(composer.render, edited)
+    # 对比：不使用缓存，整棵树重新生成
+    _, uncached = timed(Composer(engine, let=False).render, edited)
+    shared, hoist = timed(share_let, edited_formula)
+    print(f"  {name:5} full render {full:8.2f} ms ({full_renders} nodes); after editing one leaf: "
+          f"cached {incremental:7.3f} ms ({composer.renders} nodes), uncached {uncached:8.2f} ms")
+    print(f"        LET {hoist:8.2f} ms, length {len(edited_formula):,} -> {len(shared):,} chars "
+          f"({shared.count('VLOOKUP(')} VLOOKUP calls instead of {edited_formula.count('VLOOKUP(')})")
+    assert formula != edited_formula
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    engine = FormulaEngine()
+    for count in sizes:
+        print(f"N = {count}")
+        run("deep", *deep(count), engine)
+        run("wide", *wide(count), engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式求值基准 / Formula evaluation benchmark
+
+在大表上比较NumPy向量化求值和逐单元格Python循环（需要numpy）。
+Compares the NumPy-vectorized evaluator with naive per-cell Python loops
+on a large sheet (requires numpy).
+
+用法 / Usage: python benchmarks/bench_evaluator.py [rows]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.evaluator import Evaluator, Sheet  # noqa: E402
+
+FRUITS = ["apple", "pear", "banana", "cherry", "Apple", ""]
+
+
+def make_rows(count):
+    """生成测试数据：A列文本，B列数字，C列混合字符"""
+    rng = random.Random(7)
+    return [[rng.choice(FRUITS), str(rng.randint(0, 100)), "".join(rng.choice("abcxyz") for _ in range(8))]
+            for _ in range(count)]
+
+
+def naive_number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def naive_sum(rows, col):
+    total = 0.0
+    for row in rows:
+        value = naive_number(row[col])
+        if value is not None:
+            total += value
+    return total
+
+
+def naive_countif(rows, col, threshold):
+    count = 0
+    for row in rows:
+        value = naive_number(row[col])
+        if value is not None and value > threshold:
+            count += 1
+    return count
+
+
+def naive_sumif(rows, text):
+    total = 0.0
+    for row in rows:
+        if row[0].lower() == text:
+            value = naive_number(row[1])
+            if value is not None:
+                total += value
+    return total
+
+
+def naive_char_count(rows, col, chars):
+    result = ""
+    for char in chars:
+        count = 0
+        for row in rows:
+            count += len(row[col]) - len(row[col].replace(char, ""))
+        result += f"{char}{count}"
+    return result
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rows = make_rows(count)
+    (sheet, load) = timed(lambda: Sheet.from_rows(rows))
+    print(f"{count:,} rows, sheet load {load:.2f}s")
+    evaluator = Evaluator(sheet)
+    end = count
+    cases = [
+        ("SUM", f"=SUM(B1:B{end})", lambda: naive_sum(rows, 1)),
+        ("COUNTIF", f'=COUNTIF(B1:B{end},">50")', lambda: naive_countif(rows, 1, 50)),
+        ("SUMIF", f'=SUMIF(A1:A{end},"apple",B1:B{end})', lambda: naive_sumif(rows, "apple")),
+        ("CHAR_COUNT", (f'="a"&SUMPRODUCT(LEN(C1:C{end})-LEN(SUBSTITUTE(C1:C{end},"a","")))'
+                        f'&"b"&SUMPRODUCT(LEN(C1:C{end})-LEN(SUBSTITUTE(C1:C{end},"b","")))'),
+         lambda: naive_char_count(rows, 2, "ab")),
+    ]
+    print(f"{'':<11} {'first':>9} {'repeat':>9} {'loop':>9} {'speedup':>8}")
+    for label, formula, naive in cases:
+        value, first = timed(lambda: evaluator.evaluate(formula))
+        value, repeat = timed(lambda: evaluator.evaluate(formula))
+        expected, loop = timed(naive)
+        ok = "" if str(value).rstrip("0").rstrip(".") == str(expected).rstrip("0").rstrip(".") else "  MISMATCH"
+        print(f"{label:<11} {first * 1000:8.1f}ms {repeat * 1000:8.1f}ms {loop * 1000:8.1f}ms "
+              f"{loop / repeat:7.1f}x{ok}")
+
+
+if __name__ == "__main__":
+    main()
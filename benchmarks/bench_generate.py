@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单个公式生成延迟基准 / Per-formula generation latency benchmark
+
+对比预编译格式化器+分类缓存与逐次判断的旧路径（重复输入和唯一输入两种场景）。
+Compares the compiled formatter + classification cache with the legacy
+per-call path, on repeated and on unique inputs.
+
+用法 / Usage: python benchmarks/bench_generate.py [formulas]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker import FormulaEngine, LanguageManager, classify_value  # noqa: E402
+
+LEGACY_PATTERN = r'^(\$?[A-Z]+\$?\d+(:?\$?[A-Z]+\$?\d+)?|[A-Za-z0-9_]+!\$?[A-Z]+\$?\d+(:?\$?[A-Z]+\$?\d+)?)$'
+
+
+def legacy_generate(functions, func_name, values):
+    """旧版 generate_function 的生成逻辑（未编译正则、逐参数判断链）"""
+    func_info = functions[func_name]
+    template = func_info['template']
+    params = []
+    for value in values:
+        value = value.strip()
+        if value:
+            if not (value.startswith('"') and value.endswith('"')) and \
+               not (value.startswith("'") and value.endswith("'")) and \
+               not bool(re.match(LEGACY_PATTERN, value)) and \
+               not value.replace('.', '').replace('-', '').isdigit() and \
+               not value.upper() in ['TRUE', 'FALSE']:
+                if func_name in ['COUNTIF', 'SUMIF'] and len(params) == 1:
+                    value = f'"{value}"'
+                elif func_name in ['VLOOKUP', 'HLOOKUP'] and len(params) == 0:
+                    value = f'"{value}"'
+                elif func_name == 'IF' and len(params) > 0:
+                    value = f'"{value}"'
+                elif func_name in ['CONCATENATE', 'LEFT', 'RIGHT', 'MID']:
+                    if len(params) == 0 and not bool(re.match(LEGACY_PATTERN, value)):
+                        value = f'"{value}"'
+        params.append(value)
+    while len(params) < template.count('{'):
+        params.append('')
+    if func_name in ['SUMIF', 'CONCATENATE']:
+        params = [p for i, p in enumerate(params)
+                  if p or i < len(func_info['params']) - (1 if func_name == 'SUMIF' else 2)]
+    if func_name == 'SUMIF' and len(params) == 2:
+        return f"=SUMIF({params[0]},{params[1]})"
+    if func_name == 'CONCATENATE':
+        return f"=CONCATENATE({','.join(p for p in params if p)})"
+    return template.format(*params)
+
+
+def make_inputs(count, unique):
+    """构造测试输入：重复值（A1:A10、TRUE等）或每行唯一值"""
+    rows = []
+    for i in range(count):
+        n = i if unique else i % 7
+        rows.append(("VLOOKUP", [f"Name{n}", f"A1:D{n + 10}", "3", "FALSE"]))
+        rows.append(("SUMIF", [f"A1:A{n + 10}", f">{n}", f"B1:B{n + 10}"]))
+        rows.append(("IF", [f"A{n + 1}>10", "Pass", "Fail"]))
+        rows.append(("COUNTIF", ["A1:A10", "apple" if not unique else f"apple{n}"]))
+    return rows
+
+
+def measure(label, func, rows):
+    """测量每个公式的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for func_name, values in rows:
+        func(func_name, values)
+    elapsed = time.perf_counter() - start
+    per_formula = elapsed / len(rows) * 1e6
+    print(f"  {label:<10} {per_formula:8.3f} us/formula")
+    return per_formula
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    functions = LanguageManager().get_functions()
+    engine = FormulaEngine()
+    for unique in (False, True):
+        rows = make_inputs(count, unique)
+        classify_value.cache_clear()
+        print("unique inputs:" if unique else "repeated inputs:")
+        legacy = measure("legacy", lambda f, v: legacy_generate(functions, f, v), rows)
+        compiled = measure("compiled", engine.generate, rows)
+        print(f"  speedup    x{legacy / compiled:.2f}")
+
+
+if __name__ == "__main__":
+    main()
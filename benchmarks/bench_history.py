@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史记录库基准 / History store benchmark
+
+向临时数据库记录N条公式，报告每次记录的调用耗时（界面线程实际等待的时间）和后台写入速度，
+再模拟边输入边搜索：逐个字符输入几个查询，报告每次按键的搜索延迟。
+Records N formulas into a temporary database and reports the time each
+add() call takes (what the UI thread waits for) and the background write
+rate, then simulates search-as-you-type by entering a few queries one
+character at a time and reports the latency per keystroke.
+
+用法 / Usage: python benchmarks/bench_history.py [entries]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker import FormulaEngine, LanguageManager  # noqa: E402
+from excel_function_maker.history import HistoryStore  # noqa: E402
+
+QUERIES = ["VLOOKUP(A4567", "sumif", "$D$1:$F$", "A1:A99", "apple", "zz"]
+
+
+def sample_inputs(count):
+    """生成各种函数的参数组合"""
+    specs = [
+        ("VLOOKUP", lambda i: (f"A{i}", "$D$1:$F$1000", str(i % 5 + 1), "FALSE")),
+        ("SUMIF", lambda i: (f"A1:A{i}", f">{i % 100}", f"B1:B{i}")),
+        ("COUNTIF", lambda i: (f"C1:C{i}", "apple" if i % 2 else "pear")),
+        ("SUM", lambda i: (f"A{i}:C{i}",)),
+        ("CHAR_COUNT", lambda i: (f"A{i}:J{i}", "a", "b", "c")),
+    ]
+    for i in range(count):
+        name, params = specs[i % len(specs)]
+        yield name, params(i)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    engine = FormulaEngine(LanguageManager())
+    rows = [(name, params, engine.generate(name, params)) for name, params in sample_inputs(count)]
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "history.sqlite3")
+    try:
+        store = HistoryStore(path)
+        start = time.perf_counter()
+        worst = 0.0
+        for name, params, formula in rows:
+            call = time.perf_counter()
+            store.add(name, params, formula)
+            worst = max(worst, time.perf_counter() - call)
+        queued = time.perf_counter() - start
+        store.flush()
+        written = time.perf_counter() - start
+        print(f"{len(store):,} entries: add() {queued / count * 1e6:.1f} us avg, {worst * 1000:.2f} ms worst; "
+              f"written in background at {count / written:,.0f} entries/s")
+        store.close()
+
+        start = time.perf_counter()
+        store = HistoryStore(path)
+        print(f"reopen: {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"database {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+        for query in QUERIES:
+            latencies = []
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                results = store.search(query[:end])
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            print(f"typing {query!r:16} {len(query):2} keystrokes: median {latencies[len(latencies) // 2]:.2f} ms, "
+                  f"max {latencies[-1]:.2f} ms, {len(results)} results")
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查找函数基准 / VLOOKUP benchmark
+
+在大表上比较索引查找（哈希/二分）和逐行线性扫描，并显示索引构建时间、
+缓存命中和数据修改后的重建（需要numpy）。
+Compares indexed lookups (hash / binary search) with a naive linear scan on a
+large table, and reports index build time, cache reuse and rebuilds after an
+edit (requires numpy).
+
+用法 / Usage: python benchmarks/bench_lookup.py [rows] [lookups]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.evaluator import Evaluator, Sheet, format_value  # noqa: E402
+from excel_function_maker.formula import parse_reference  # noqa: E402
+
+
+def make_rows(count):
+    """生成测试数据：A列文本键，B列有序数字键，C列返回值"""
+    return [[f"key{i:07d}", str(i * 10), f"value{i}"] for i in range(count)]
+
+
+def naive_vlookup(rows, key, col, offset, approximate):
+    """逐行扫描的VLOOKUP（近似匹配要求数据有序）"""
+    found = None
+    for row in rows:
+        cell = row[col]
+        if approximate:
+            if float(cell) > key:
+                break
+            found = row
+        elif cell.lower() == key:
+            return row[col + offset - 1]
+    return found[col + offset - 1] if found else None
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    rows = make_rows(count)
+    sheet = Sheet.from_rows(rows)
+    evaluator = Evaluator(sheet)
+    cache = evaluator.lookups
+    rng = random.Random(7)
+    text_keys = [f"key{rng.randrange(count):07d}" for _ in range(lookups)]
+    number_keys = [rng.randrange(count * 10) + 5 for _ in range(lookups)]
+    text_table = parse_reference(f"A1:C{count}")
+    number_table = parse_reference(f"B1:C{count}")
+    print(f"{count:,} rows, {lookups:,} lookups")
+
+    _, build = timed(lambda: cache.index(text_table).find("key0000000"))
+    _, sort = timed(lambda: cache.index(number_table).find(5, approximate=True))
+    print(f"index build: exact {build * 1000:.1f}ms, sorted {sort * 1000:.1f}ms")
+
+    # 公式路径：每次求值都会解析参数并复用缓存的索引
+    sample = text_keys[:1000]
+    _, formulas = timed(lambda: [evaluator.evaluate(f'=VLOOKUP("{k}",A1:C{count},3,FALSE)') for k in sample])
+    print(f"formula VLOOKUP: {len(sample) / formulas:,.0f} lookups/s (index builds so far: {cache.builds})")
+
+    # 线性扫描太慢，只取少量样本再按比例换算
+    naive_sample = max(1, min(lookups, 200))
+    print(f"{'':<12} {'indexed':>10} {'scan':>10} {'speedup':>8}")
+    for label, keys, table, col, approximate in (
+            ("exact", text_keys, text_table, 0, False),
+            ("approximate", number_keys, number_table, 1, True)):
+        values, indexed = timed(lambda: cache.lookup_many(keys, table, 2, approximate))
+        expected, scan = timed(lambda: [naive_vlookup(rows, k, col, 2, approximate) for k in keys[:naive_sample]])
+        scan *= len(keys) / naive_sample
+        same = [format_value(v) for v in values[:naive_sample]] == [format_value(v) for v in expected]
+        ok = "" if same else "  MISMATCH"
+        print(f"{label:<12} {indexed * 1000:8.1f}ms {scan * 1000:8.1f}ms {scan / indexed:7.0f}x{ok}")
+
+    # 修改查找列后索引失效并重建；修改返回列不影响索引
+    builds = cache.builds
+    sheet.set_cell(count // 2, 2, "changed")
+    cache.lookup("key0000000", text_table, 3, approximate=False)
+    print(f"edit return column: {cache.builds - builds} rebuild(s)")
+    sheet.set_cell(count // 2, 0, "key-new")
+    _, rebuild = timed(lambda: cache.lookup("key-new", text_table, 3, approximate=False))
+    print(f"edit key column: {cache.builds - builds} rebuild(s), {rebuild * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成多进程扩展性基准 / Parallel batch generation scaling benchmark
+
+用法 / Usage: python benchmarks/bench_parallel.py [rows]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker import FormulaEngine, generate_batch, generate_batch_parallel, read_spec_rows  # noqa: E402
+
+SAMPLE_ROWS = [
+    "VLOOKUP,Name{i},A1:D{i},3,FALSE",
+    "SUMIF,A1:A{i},>{i},B1:B{i}",
+    "IF,A{i}>10,Pass,Fail",
+    "CONCATENATE,A{i}, ,B{i}",
+    "CHAR_COUNT,A{i}:J{i},a,b,c,d",
+    "MID,Text{i},2,5",
+]
+
+
+def write_spec_file(path, rows):
+    """生成测试用的CSV输入文件"""
+    rng = random.Random(42)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i in range(1, rows + 1):
+            f.write(rng.choice(SAMPLE_ROWS).format(i=i))
+            f.write("\n")
+
+
+def run(path, workers):
+    """运行一次并返回 (行数, 耗时)"""
+    start = time.perf_counter()
+    count = 0
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if workers == 0:
+            formulas = generate_batch(read_spec_rows(f, "csv"), FormulaEngine())
+        else:
+            formulas = generate_batch_parallel(f, "csv", workers=workers)
+        for _ in formulas:
+            count += 1
+    return count, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cores})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "spec.csv")
+        write_spec_file(path, rows)
+
+        count, base = run(path, 0)
+        print(f"{'in-process':>12}: {count / base:>12,.0f} rows/s")
+        for workers in worker_counts:
+            count, elapsed = run(path, workers)
+            print(f"{workers:>4} workers: {count / elapsed:>12,.0f} rows/s  (x{base / elapsed:.2f} vs in-process)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参数分类基准 / Parameter classification benchmark
+
+在一百万个混合输入上比较旧的单个正则加字符串检查和新的引用解析器（不带缓存的单次
+调用，以及各自实际使用的LRU缓存），并列出两者对各类引用的识别结果。
+Compares the legacy single-regex classification with the reference parser on
+a million mixed inputs, both per uncached call and through the LRU cache each
+one ships with, and lists which reference forms each one recognises.
+
+用法 / Usage: python benchmarks/bench_reference.py [count]
+"""
+
+import functools
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.engine import classify_value  # noqa: E402
+
+# 旧实现（原样保留作为对比基准）
+LEGACY_CELL_REFERENCE_RE = re.compile(
+    r'^(\$?[A-Z]+\$?\d+(:?\$?[A-Z]+\$?\d+)?|[A-Za-z0-9_]+!\$?[A-Z]+\$?\d+(:?\$?[A-Z]+\$?\d+)?)$')
+
+
+def legacy_classify(value):
+    if not value:
+        return "empty"
+    if (value.startswith('"') and value.endswith('"')) or \
+       (value.startswith("'") and value.endswith("'")):
+        return "quoted"
+    if LEGACY_CELL_REFERENCE_RE.match(value) is not None:
+        return "cell_reference"
+    if value.replace('.', '').replace('-', '').isdigit():
+        return "number"
+    if value.upper() in ('TRUE', 'FALSE'):
+        return "boolean"
+    return "text"
+
+
+SAMPLES = ["a1", "A:A", "1:1", "'Sales 2024'!A1", "Sheet1!B2:C9", "R1C1", "R[-1]C[2]",
+           "Table1[Col]", "[@Amount]", "XFD1048576", "XFE1", "apple"]
+
+
+def make_inputs(count):
+    """生成混合输入：引用、数字、文本、布尔值，约一半是不重复的值"""
+    rng = random.Random(3)
+    words = ["apple", "pear", "张三", "hello world", ">10", "TRUE", "false", "", '"x"']
+    inputs = []
+    for i in range(count):
+        pick = rng.random()
+        if pick < 0.3:
+            inputs.append(f"{rng.choice('ABCDEFGHXYZ')}{rng.randint(1, 5000)}")
+        elif pick < 0.4:
+            inputs.append(f"{rng.choice('abc')}{rng.randint(1, 99)}:{rng.choice('xyz')}{rng.randint(100, 999)}")
+        elif pick < 0.45:
+            inputs.append(f"Sheet{rng.randint(1, 9)}!$A${rng.randint(1, 99)}")
+        elif pick < 0.7:
+            inputs.append(str(rng.randint(-1000, 100000)))
+        elif pick < 0.75:
+            inputs.append(f"{rng.random() * 100:.2f}")
+        else:
+            inputs.append(f"{rng.choice(words)}{i % 1000 if rng.random() < 0.3 else ''}")
+    return inputs
+
+
+def timed(func, inputs):
+    if hasattr(func, "cache_clear"):
+        func.cache_clear()
+    start = time.perf_counter()
+    for value in inputs:
+        func(value)
+    return time.perf_counter() - start
+
+
+def best_of(funcs, inputs, repeat=5):
+    """各实现交替运行多轮，取每个实现最快的一次（减少机器负载波动的影响）"""
+    best = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            elapsed = timed(func, inputs)
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    inputs = make_inputs(count)
+    uncached = classify_value.__wrapped__
+
+    print(f"{'input':<20} {'legacy':<16} {'parser':<16}")
+    for value in SAMPLES:
+        print(f"{value:<20} {legacy_classify(value):<16} {uncached(value):<16}")
+
+    # 两者都使用 lru_cache(maxsize=4096)
+    legacy_cached = functools.lru_cache(maxsize=4096)(legacy_classify)
+    labels = ["legacy regex, uncached", "parser, uncached", "legacy regex, LRU 4096",
+              f"parser, LRU {classify_value.cache_info().maxsize}"]
+    rows = list(zip(labels, best_of([legacy_classify, uncached, legacy_cached, classify_value], inputs)))
+    baseline = rows[2][1]
+    print(f"\n{count:,} mixed inputs ({len(set(inputs)):,} distinct)")
+    for label, elapsed in rows:
+        print(f"{label:<24} {elapsed:6.3f}s {count / elapsed:>12,.0f}/s  {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面响应延迟 / GUI responsiveness while a large job runs
+
+Tk 主循环中每 TICK 毫秒安排一个定时事件，记录它比预定时间晚了多少（事件延迟）；
+同时执行一个大任务（生成并估算 N 个接近Excel长度上限的 CHAR_COUNT 公式），
+分别在界面线程中同步执行（旧做法）和交给 BackgroundRunner 在工作线程中执行，比较延迟的 p50/p99/最大值。
+需要图形显示（Linux 无显示时可用 xvfb-run）。
+A timer event is scheduled every TICK ms on the Tk main loop and its
+lateness is recorded while a large job runs (generating and estimating N
+CHAR_COUNT formulas near Excel's length limit), once synchronously on the
+UI thread (the old behavior) and once through BackgroundRunner on the
+worker thread. Reports p50/p99/max event latency. Needs a display (use
+xvfb-run on a headless Linux box).
+
+用法 / Usage: python benchmarks/bench_responsiveness.py [N]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tkinter as tk  # noqa: E402
+
+from excel_function_maker.cost import analyze  # noqa: E402
+from excel_function_maker.engine import FormulaEngine  # noqa: E402
+from excel_function_maker.worker import BackgroundRunner  # noqa: E402
+
+COUNT = 60
+TICK = 10
+# CHAR_COUNT 的字符个数（公式约7000字符，接近Excel的8192上限）
+CHARS = 120
+
+
+def large_job(engine, count):
+    """生成并估算 count 个不同的 CHAR_COUNT 公式，返回公式总长度"""
+    total = 0
+    for i in range(count):
+        chars = [chr(0x4e00 + (i * CHARS + j) % 20000) for j in range(CHARS)]
+        formula = engine.generate("CHAR_COUNT", [f"A{i + 1}:C{i + 1}"] + chars)
+        analyze(formula)
+        total += len(formula)
+    return total
+
+
+def measure(root, start_job):
+    """运行主循环直到任务完成，返回 (事件延迟列表（毫秒）, 任务耗时（秒）)"""
+    lateness = []
+    state = {"done": False}
+
+    def tick(expected):
+        now = time.perf_counter()
+        lateness.append((now - expected) * 1000)
+        if state["done"]:
+            root.quit()
+            return
+        root.after(TICK, tick, now + TICK / 1000)
+
+    def finished(result):
+        state["done"] = True
+        state["elapsed"] = time.perf_counter() - state["start"]
+
+    def begin():
+        state["start"] = time.perf_counter()
+        start_job(finished)
+
+    root.after(TICK, tick, time.perf_counter() + TICK / 1000)
+    # 先让定时事件跑起来再开始任务
+    root.after(50, begin)
+    root.mainloop()
+    return lateness, state["elapsed"]
+
+
+def report(name, lateness, elapsed):
+    ordered = sorted(lateness)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    print(f"{name:12} job {elapsed:6.2f} s   event latency p50 {percentile(0.5):7.1f} ms  "
+          f"p99 {percentile(0.99):7.1f} ms  max {ordered[-1]:7.1f} ms  ({len(ordered)} events)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"cannot open a Tk window ({e}); run under a display or xvfb-run")
+        return 1
+    root.withdraw()
+    engine = FormulaEngine()
+    # 预热：编译函数模板
+    large_job(engine, 1)
+
+    def sync_job(done):
+        done(large_job(engine, count))
+
+    runner = BackgroundRunner(root)
+
+    def worker_job(done):
+        runner.submit("bench", large_job, (engine, count), done)
+
+    print(f"N = {count} CHAR_COUNT formulas, timer every {TICK} ms")
+    report("UI thread", *measure(root, sync_job))
+    report("worker", *measure(root, worker_job))
+    runner.close()
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+函数搜索基准 / Function search benchmark
+
+把内置函数目录复制扩充为N个函数（写入临时目录的 functions.json、zh.json、en.json），报告建立索引的时间，
+再模拟边输入边搜索：逐个字符输入几个查询，报告每次按键的延迟，并与逐个函数比较子串的线性查找对比。
+Grows the built-in catalog to N functions (written as functions.json, zh.json
+and en.json in a temporary directory), reports the index build time, then
+simulates search-as-you-type by entering a few queries one character at a
+time and reports the latency per keystroke next to a linear substring scan
+over every function.
+
+用法 / Usage: python benchmarks/bench_search.py [functions ...]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.language import CATALOG_DIR, LANGUAGES, LanguageManager  # noqa: E402
+from excel_function_maker.search import FunctionIndex, FunctionSearch, normalize  # noqa: E402
+
+QUERIES = ["vlookup", "求和", "count", "vlokup", "字符"]
+SIZES = [13, 100, 500, 1000]
+# 扩充的函数在描述后追加的词，使各函数的文本不完全相同
+EXTRA_WORDS = ["table", "text", "date", "matrix", "financial", "statistics", "logical", "filter"]
+
+
+def load(name):
+    with open(os.path.join(CATALOG_DIR, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_catalog(directory, count):
+    """把内置目录复制扩充为 count 个函数"""
+    catalog = load("functions.json")
+    packs = {language: load(f"{language}.json") for language in LANGUAGES}
+    keys = list(catalog)
+    functions = {}
+    tables = {language: {} for language in LANGUAGES}
+    for i in range(count):
+        base = keys[i % len(keys)]
+        key = base if i < len(keys) else f"{base}{i // len(keys)}"
+        functions[key] = catalog[base]
+        for language in LANGUAGES:
+            info = dict(packs[language]['functions'][base])
+            if key != base:
+                info['description'] += f" {EXTRA_WORDS[i % len(EXTRA_WORDS)]} {i}"
+            tables[language][key] = info
+    with open(os.path.join(directory, "functions.json"), 'w', encoding='utf-8') as f:
+        json.dump(functions, f, ensure_ascii=False)
+    for language in LANGUAGES:
+        with open(os.path.join(directory, f"{language}.json"), 'w', encoding='utf-8') as f:
+            json.dump({'texts': packs[language]['texts'], 'functions': tables[language]}, f, ensure_ascii=False)
+
+
+def linear_search(texts, query):
+    """对比用：逐个函数比较子串"""
+    query = normalize(query)
+    return [key for key, text in texts if query in text]
+
+
+def typing_latency(search, query):
+    """逐个字符输入 query，返回每次按键的延迟（毫秒）和最后的结果数"""
+    latencies = []
+    results = []
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        results = search(query[:end])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return latencies, len(results)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for count in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            write_catalog(directory, count)
+            manager = LanguageManager(directory)
+            start = time.perf_counter()
+            index = FunctionIndex(manager)
+            build = (time.perf_counter() - start) * 1000
+            texts = []
+            tables = [manager.get_function_table(language) for language in LANGUAGES]
+            for key in index.keys:
+                parts = [key] + [f"{table[key]['name']} {table[key]['description']}" for table in tables]
+                texts.append((key, normalize(" ".join(parts))))
+            print(f"{len(index.keys):,} functions: index built in {build:.1f} ms")
+            for query in QUERIES:
+                state = FunctionSearch(index)
+                latencies, found = typing_latency(state.update, query)
+                linear, linear_found = typing_latency(lambda text: linear_search(texts, text), query)
+                print(f"  typing {query!r:10} median {latencies[len(latencies) // 2]:.3f} ms, "
+                      f"max {latencies[-1]:.3f} ms, {found} results; "
+                      f"linear scan median {linear[len(linear) // 2]:.3f} ms, {linear_found} results")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地公式服务压力测试 / Local formula service load test
+
+用若干个保持连接的客户端并发发送请求，报告每秒请求数和延迟的 p50/p99。
+每个连接可以一次发送多个请求再读取响应（pipelining）。不指定 --address 时自动启动一个服务进程。
+Runs concurrent keep-alive clients against the service and reports
+requests/s and p50/p99 latency. Each connection may pipeline several
+requests before reading the responses. Without --address a server process is
+started automatically.
+
+用法 / Usage:
+    python benchmarks/bench_server.py -c 16 -n 20000
+    python benchmarks/bench_server.py -c 16 -n 20000 --pipeline 8
+    python benchmarks/bench_server.py -c 4 -n 200 --batch 10000 -j 0
+    python benchmarks/bench_server.py --address unix:/tmp/efm.sock
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_request(batch):
+    """单个公式或 batch 条公式的请求"""
+    if batch:
+        path = "/batch"
+        body = {"items": [["VLOOKUP", f"A{i}", "$D$1:$F$1000", str(i % 5 + 1), "FALSE"] for i in range(batch)]}
+    else:
+        path = "/generate"
+        body = {"function": "VLOOKUP", "params": ["John", "A1:D10", "3", "FALSE"]}
+    data = json.dumps(body).encode("utf-8")
+    return (f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data
+
+
+async def read_response(reader):
+    """读取一个响应，返回状态码"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(lines[0].split()[1])
+
+
+async def open_connection(address):
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[5:], limit=2 ** 26)
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host, int(port), limit=2 ** 26)
+
+
+async def client(address, request, count, pipeline, latencies, failures):
+    """一个连接：每次发送 pipeline 个请求，再按顺序读取响应"""
+    reader, writer = await open_connection(address)
+    try:
+        while count > 0:
+            burst = min(pipeline, count)
+            count -= burst
+            start = time.perf_counter()
+            writer.write(request * burst)
+            await writer.drain()
+            for _ in range(burst):
+                if await read_response(reader) != 200:
+                    failures.append(1)
+                latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run(address, concurrency, total, pipeline, batch):
+    request = build_request(batch)
+    latencies, failures = [], []
+    # 预热：建立连接，让服务创建工作进程
+    await client(address, request, 1, 1, [], [])
+    per_client = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(address, request, count, pipeline, latencies, failures)
+                           for count in per_client if count))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    what = f"batches of {batch}" if batch else "single formulas"
+    print(f"{len(latencies):,} requests ({what}), {concurrency} connections, pipeline {pipeline}: "
+          f"{len(latencies) / elapsed:,.0f} req/s"
+          + (f" ({len(latencies) * batch / elapsed:,.0f} formulas/s)" if batch else "")
+          + f", p50 {percentile(0.5):.2f} ms, p99 {percentile(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms"
+          + (f", {len(failures)} failed" if failures else ""))
+
+
+def start_server(workers):
+    """启动服务进程（随机端口），返回 (进程, 地址)"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "excel_function_maker", "--serve", "127.0.0.1:0", "-j", str(workers)],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith("serving on "):
+        process.kill()
+        raise RuntimeError(f"server did not start: {line}{process.stderr.read()}")
+    return process, line.split()[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", help="running server (HOST:PORT or unix:PATH); default: start one")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="connections (default: 16)")
+    parser.add_argument("-n", "--requests", type=int, default=20000, help="total requests (default: 20000)")
+    parser.add_argument("--pipeline", type=int, default=1, help="requests sent per connection before reading")
+    parser.add_argument("--batch", type=int, default=0, help="formulas per /batch request (default: single /generate)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="worker processes of the started server")
+    args = parser.parse_args()
+    process = None
+    address = args.address
+    if address is None:
+        process, address = start_server(args.workers)
+    try:
+        asyncio.run(run(address, args.concurrency, args.requests, args.pipeline, args.batch))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+溢出模式对比 / Spill mode comparison
+
+对几种常见的逐行公式（LEFT、SUMIF、IF、CHAR_COUNT 两种模式），比较向下填充N行时
+逐行公式与一个溢出公式的公式个数、公式文本总大小、依赖引用数和生成耗时。
+--xlsx 时同时比较写入工作簿后的文件大小（逐行公式写入A列）。
+For a few common per-row formulas (LEFT, SUMIF, IF, both CHAR_COUNT modes),
+compares filling N rows with per-row formulas against one spill formula:
+formula count, total formula text size, references Excel tracks in its
+dependency graph, and generation time. With --xlsx the per-row workbook size
+is measured as well.
+
+用法 / Usage: python benchmarks/bench_spill.py [--xlsx] [N ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.engine import CHAR_COUNT_COMPAT, CHAR_COUNT_LET, FormulaEngine  # noqa: E402
+from excel_function_maker.fill import FillTemplate  # noqa: E402
+from excel_function_maker.formula import Expression, iter_tokens  # noqa: E402
+from excel_function_maker.spill import spill_down  # noqa: E402
+
+SIZES = [10000, 100000, 1000000]
+
+# (名称, 函数, 参数, CHAR_COUNT模式)
+CASES = [
+    ("LEFT", "LEFT", ["A2", "3"], CHAR_COUNT_COMPAT),
+    ("SUMIF", "SUMIF", ["$A$2:$A$5000", "B2", "$C$2:$C$5000"], CHAR_COUNT_COMPAT),
+    ("IF", "IF", [Expression("D2>100"), Expression("D2*0.9"), "D2"], CHAR_COUNT_COMPAT),
+    ("CHAR_COUNT", "CHAR_COUNT", ["A2", "a", "b"], CHAR_COUNT_COMPAT),
+    ("CHAR_COUNT let", "CHAR_COUNT", ["A2:C2", "a", "b"], CHAR_COUNT_LET),
+]
+
+
+def references(formula):
+    """公式中的引用个数（Excel 依赖图中每个引用都是一条边）"""
+    return sum(1 for kind, _ in iter_tokens(formula.lstrip("=")) if kind == "ref")
+
+
+def xlsx_size(formulas):
+    # xlsx 模块只在需要时导入
+    from excel_function_maker.xlsx import write_formulas
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rows.xlsx")
+        write_formulas(path, formulas)
+        return os.path.getsize(path)
+
+
+def run(name, formula, count, with_xlsx):
+    start = time.perf_counter()
+    chars = sum(len(row) + 1 for row in FillTemplate(formula).fill_down(count))
+    per_row = time.perf_counter() - start
+    start = time.perf_counter()
+    spill = spill_down(formula, count)
+    spilled = time.perf_counter() - start
+    if spill.formula is None:
+        print(f"  {name:15} cannot spill: {spill.reason}")
+        return
+    line = (f"  {name:15} per-row {count:>9,} formulas {chars:>12,} chars {references(formula) * count:>9,} refs "
+            f"{per_row * 1000:7.1f} ms | spill ({spill.mode}, Excel {spill.since}+) 1 formula "
+            f"{len(spill.formula):>4} chars {references(spill.formula):>2} refs {spilled * 1000:5.2f} ms")
+    if with_xlsx:
+        line += f" | per-row .xlsx {xlsx_size(FillTemplate(formula).fill_down(count)) / 1024:,.0f} KiB"
+    print(line)
+    print(f"  {'':15} {spill.formula}")
+
+
+def main():
+    args = sys.argv[1:]
+    with_xlsx = "--xlsx" in args
+    sizes = [int(arg) for arg in args if arg != "--xlsx"] or SIZES
+    engine = FormulaEngine()
+    for count in sizes:
+        print(f"N = {count:,}")
+        for name, func_name, params, mode in CASES:
+            engine.char_count_mode = mode
+            run(name, engine.generate(func_name, params), count, with_xlsx)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行启动耗时基准 / CLI startup-time benchmark
+
+用 -X importtime 统计命令行路径导入的模块和耗时，并检查没有导入tkinter/pyperclip；
+发现这些模块时返回非零退出码，可用于CI回归检查。
+Runs the CLI path under -X importtime, reports import cost and wall-clock
+startup, and exits non-zero if tkinter or pyperclip get imported.
+
+用法 / Usage: python benchmarks/bench_startup.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN = ("tkinter", "_tkinter", "pyperclip")
+CLI_ARGS = ["-m", "excel_function_maker", "--func", "SUM", "--param", "A1:A10"]
+
+
+def import_times(args):
+    """运行一次 -X importtime，返回 {模块: 累计微秒}"""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if parts[0].isdigit():
+            modules[parts[2]] = int(parts[1])
+    return modules
+
+
+def wall_clock(args, runs):
+    """多次运行取最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    modules = import_times(CLI_ARGS)
+    package = {name: us for name, us in modules.items() if name.split(".")[0] == "excel_function_maker"}
+    print("slowest imports on the CLI path (cumulative):")
+    for name, us in sorted(modules.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {us / 1000:8.2f} ms  {name}")
+    print(f"excel_function_maker total: {max(package.values(), default=0) / 1000:.2f} ms")
+
+    baseline = wall_clock(["-c", "pass"], runs)
+    cli = wall_clock(CLI_ARGS, runs)
+    print(f"interpreter startup: {baseline:.1f} ms, CLI formula: {cli:.1f} ms (+{cli - baseline:.1f} ms)")
+
+    leaked = sorted(name for name in modules if name.split(".")[0] in FORBIDDEN)
+    if leaked:
+        print(f"FAIL: GUI modules imported on the CLI path: {', '.join(leaked)}")
+        return 1
+    print("OK: no GUI modules imported")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能跟踪开销 / Tracing overhead
+
+比较生成公式在跟踪关闭（默认）和打开时的每个公式耗时，以及关闭时一个空的 with TRACER.span() 的耗时。
+Compares per-formula generation time with tracing off (the default) and
+on, and the cost of an empty `with TRACER.span()` while tracing is off.
+
+用法 / Usage: python benchmarks/bench_tracing.py [N]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.engine import FormulaEngine  # noqa: E402
+from excel_function_maker.tracing import TRACER  # noqa: E402
+
+COUNT = 200000
+REPEAT = 5
+
+SPECS = [
+    ("SUM", ["A1:A10"]),
+    ("VLOOKUP", ["A2", "D:F", "2", "FALSE"]),
+    ("LEFT", ["hello", "3"]),
+    ("IF", ["=A1>10", "big", "small"]),
+]
+
+
+def best(function, count):
+    """REPEAT 次中最快一次的每次耗时（纳秒）"""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter_ns()
+        function(count)
+        timings.append((time.perf_counter_ns() - start) / count)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    engine = FormulaEngine()
+    specs = [SPECS[i % len(SPECS)] for i in range(count)]
+
+    def generate(_):
+        for name, params in specs:
+            engine.generate(name, params)
+
+    def empty_spans(n):
+        for _ in range(n):
+            with TRACER.span("bench.empty"):
+                pass
+
+    def empty_loop(n):
+        for _ in range(n):
+            pass
+
+    TRACER.disable()
+    off = best(generate, count)
+    span_off = best(empty_spans, count) - best(empty_loop, count)
+    TRACER.enable()
+    on = best(generate, count)
+    span_on = best(empty_spans, count) - best(empty_loop, count)
+    TRACER.disable()
+    print(f"generate, tracing off  {off:8.0f} ns/formula")
+    print(f"generate, tracing on   {on:8.0f} ns/formula  (x{on / off:.2f})")
+    print(f"empty span, off        {span_off:8.0f} ns")
+    print(f"empty span, on         {span_on:8.0f} ns")
+    print()
+    print(TRACER.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面切换耗时基准 / UI switching timing harness
+
+测量语言切换和函数切换的耗时，以及参数区控件数量是否增长（需要图形显示环境）。
+Times language and function switches and checks that no parameter widgets
+are created after warm-up (requires a display).
+
+用法 / Usage: python benchmarks/bench_ui_switch.py [rounds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker import ExcelFunctionMaker  # noqa: E402
+
+
+def count_widgets(widget):
+    """递归统计控件数量"""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    # 在临时目录运行，避免改写真实的语言配置文件
+    os.chdir(tempfile.mkdtemp())
+    try:
+        app = ExcelFunctionMaker()
+    except tk.TclError as e:
+        print(f"no display available: {e}")
+        return 1
+    app.root.update()
+    functions = list(app.lang_manager.get_functions().keys())
+
+    # 预热：让控件池增长到最大参数个数
+    for name in functions:
+        app.function_combo.set(name)
+        app.on_function_selected(None)
+    widgets_before = count_widgets(app.root)
+
+    app.param_entries[0].insert(0, "A1:A10")
+    start = time.perf_counter()
+    for _ in range(rounds):
+        app.on_language_changed(None)
+        app.root.update_idletasks()
+    per_switch = (time.perf_counter() - start) / rounds * 1000
+    kept = app.param_entries[0].get()
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        app.function_combo.set(functions[i % len(functions)])
+        app.on_function_selected(None)
+        app.root.update_idletasks()
+    per_function = (time.perf_counter() - start) / rounds * 1000
+
+    widgets_after = count_widgets(app.root)
+    print(f"language switch: {per_switch:.3f} ms  (input kept: {kept == 'A1:A10'})")
+    print(f"function switch: {per_function:.3f} ms")
+    print(f"widgets: {widgets_before} before, {widgets_after} after ({widgets_after - widgets_before:+d})")
+    app.root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+.xlsx 写入基准 / Streaming .xlsx writer benchmark
+
+把填充生成的公式写入 .xlsx 文件，报告每秒行数、文件大小和进程峰值内存（RSS）。
+写入完成后逐块读回工作表XML，确认行数。
+Writes filled-down formulas to an .xlsx file and reports rows/sec, file size
+and peak process memory (RSS), then streams the sheet back to check the row
+count.
+
+用法 / Usage: python benchmarks/bench_xlsx.py [rows] [columns]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_function_maker.fill import FillTemplate  # noqa: E402
+from excel_function_maker.xlsx import XlsxWriter  # noqa: E402
+
+
+def peak_rss_mb():
+    """进程峰值内存（MB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为KB
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_rows(path):
+    """流式读取工作表XML，统计行数"""
+    rows = 0
+    tail = b""
+    with zipfile.ZipFile(path) as zf, zf.open("xl/worksheets/sheet1.xml") as sheet:
+        while True:
+            chunk = sheet.read(1 << 20)
+            if not chunk:
+                break
+            data = tail + chunk
+            rows += data.count(b"<row ")
+            tail = data[-4:]
+            rows -= tail.count(b"<row ")
+    return rows
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    templates = [FillTemplate('=VLOOKUP(A1,$D$1:$F$1000,2,FALSE)'), FillTemplate('=SUM(A1:C1)')][:columns]
+    while len(templates) < columns:
+        templates.append(FillTemplate(f"=A1*{len(templates)}"))
+    baseline = peak_rss_mb()
+    path = os.path.join(tempfile.mkdtemp(), "bench.xlsx")
+
+    start = time.perf_counter()
+    with XlsxWriter(path) as writer:
+        writer.write_rows(zip(*[template.fill_down(rows) for template in templates]))
+    elapsed = time.perf_counter() - start
+
+    size = os.path.getsize(path) / (1024 * 1024)
+    print(f"{rows:,} rows x {columns} formulas in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s), {size:.1f} MB")
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"peak RSS {peak:.1f} MB (before writing {baseline:.1f} MB)")
+    written = count_rows(path)
+    print("row count ok" if written == rows else f"MISMATCH: {written:,} rows in sheet")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Excel函数制作器 / Excel Function Maker
+一个用于生成常用Excel函数的图形界面工具
+A GUI tool for generating common Excel functions
+
+导入本包不会加载tkinter；批量和图形界面相关的名称在首次访问时才导入。
+Importing the package never loads tkinter; batch and GUI names are imported on first access.
+"""
+
+import importlib
+
+from excel_function_maker.engine import (
+    CompiledFunction, FormulaEngine, char_count_let, classify_value, is_cell_reference,
+    CHAR_COUNT_COMPAT, CHAR_COUNT_LET, CHAR_COUNT_MODES,
+    VALUE_BOOLEAN, VALUE_CELL_REFERENCE, VALUE_EMPTY, VALUE_NUMBER, VALUE_QUOTED, VALUE_TEXT,
+)
+from excel_function_maker.language import CATALOG_DIR, LANGUAGES, FunctionTable, LanguageManager
+
+# 按需导入的名称 -> 所在模块
+_LAZY_ATTRS = {
+    "read_spec_rows": "excel_function_maker.batch",
+    "generate_batch": "excel_function_maker.batch",
+    "generate_batch_parallel": "excel_function_maker.batch",
+    "iter_line_chunks": "excel_function_maker.batch",
+    "analyze": "excel_function_maker.cost",
+    "FormulaCost": "excel_function_maker.cost",
+    "FillTemplate": "excel_function_maker.fill",
+    "fill_down": "excel_function_maker.fill",
+    "Spill": "excel_function_maker.spill",
+    "spill_down": "excel_function_maker.spill",
+    "TRACER": "excel_function_maker.tracing",
+    "Tracer": "excel_function_maker.tracing",
+    "BackgroundRunner": "excel_function_maker.worker",
+    "XlsxWriter": "excel_function_maker.xlsx",
+    "write_formulas": "excel_function_maker.xlsx",
+    "FormulaAuditor": "excel_function_maker.audit",
+    "audit_workbooks": "excel_function_maker.audit",
+    "rewrite_workbook": "excel_function_maker.audit",
+    "HistoryStore": "excel_function_maker.history",
+    "FunctionIndex": "excel_function_maker.search",
+    "FunctionSearch": "excel_function_maker.search",
+    "Expression": "excel_function_maker.formula",
+    "Formula": "excel_function_maker.compose",
+    "Composer": "excel_function_maker.compose",
+    "share_let": "excel_function_maker.compose",
+    "optimize": "excel_function_maker.optimize",
+    "Optimization": "excel_function_maker.optimize",
+    "EXCEL_VERSIONS": "excel_function_maker.optimize",
+    "FormulaServer": "excel_function_maker.server",
+    "ExcelFunctionMaker": "excel_function_maker.gui",
+    "PreviewScheduler": "excel_function_maker.gui",
+    "main": "excel_function_maker.gui",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+python -m excel_function_maker 入口 / Entry point for python -m excel_function_maker
+"""
+
+import sys
+
+from excel_function_maker.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成（流式读取CSV/JSONL，可多进程）
+Batch generation from CSV/JSONL streams, optionally across processes
+"""
+
+import collections
+import concurrent.futures
+import csv
+import json
+import os
+
+from excel_function_maker.compose import Composer, Formula, split_record
+from excel_function_maker.engine import CHAR_COUNT_COMPAT, FormulaEngine
+from excel_function_maker.formula import Expression
+from excel_function_maker.language import LanguageManager
+
+
+def spec_from_record(record):
+    """把一条JSON记录（{"function": ..., "params": [...]} 或 [函数名, 参数...]）转为 (函数名, 参数列表)
+
+    参数也可以是同样形式的记录（嵌套公式）或 {"expression": "{0}>10", "params": [...]}，原样保留。
+    记录不是这两种形式或 params 不是列表时抛出ValueError。
+    """
+    func_name, _, params = split_record(record)
+    params = ["" if p is None else p if isinstance(p, (dict, list)) else str(p) for p in params]
+    return (func_name or "").strip().upper(), params
+
+
+def _nested_values(params, composer):
+    """把嵌套公式参数生成为 Expression（整批共用一个 Composer，相同的子公式只生成一次）"""
+    return [Expression(composer.expression(Formula.from_record(p))) if isinstance(p, (dict, list)) else p
+            for p in params]
+
+
+def read_spec_rows(stream, fmt="csv", first_line=1):
+    """逐行读取批量输入（CSV或JSONL），产出 (行号, 函数名, 参数列表)"""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, first_line):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"line {line_no}: invalid JSON: {e}") from e
+            try:
+                func_name, params = spec_from_record(record)
+            except ValueError as e:
+                raise ValueError(f"line {line_no}: {e}") from e
+            yield line_no, func_name, params
+    else:
+        reader = csv.reader(stream)
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+            # 跳过表头
+            if row[0].strip().lower() == "function":
+                continue
+            yield first_line + reader.line_num - 1, row[0].strip().upper(), row[1:]
+
+
+def generate_batch(rows, engine=None):
+    """批量生成函数（生成器，内存占用恒定）"""
+    engine = engine if engine is not None else FormulaEngine()
+    composer = None
+    for line_no, func_name, params in rows:
+        try:
+            if any(isinstance(p, (dict, list)) for p in params):
+                composer = composer or Composer(engine)
+                params = _nested_values(params, composer)
+            yield engine.generate(func_name, params)
+        except KeyError as e:
+            raise ValueError(f"line {line_no}: unknown function {e.args[0]!r}") from e
+        except ValueError as e:
+            raise ValueError(f"line {line_no}: {e}") from e
+        except (TypeError, IndexError, AttributeError) as e:
+            raise ValueError(f"line {line_no}: invalid nested formula") from e
+
+
+def generate_records(records, engine=None, first_index=0):
+    """生成一组JSON记录的公式，单条出错不影响其他记录
+
+    返回 (公式列表, [(序号, 错误信息), ...])，出错的记录对应的公式为None。
+    """
+    engine = engine if engine is not None else FormulaEngine()
+    composer = Composer(engine)
+    formulas = []
+    errors = []
+    for index, record in enumerate(records, first_index):
+        try:
+            func_name, params = spec_from_record(record)
+            if any(isinstance(p, (dict, list)) for p in params):
+                params = _nested_values(params, composer)
+            formulas.append(engine.generate(func_name, params))
+        except KeyError as e:
+            formulas.append(None)
+            errors.append((index, f"unknown function {e.args[0]!r}"))
+        except ValueError as e:
+            formulas.append(None)
+            errors.append((index, str(e)))
+        except (TypeError, IndexError, AttributeError):
+            formulas.append(None)
+            errors.append((index, "expected {\"function\": ..., \"params\": [...]} or [function, params...]"))
+    return formulas, errors
+
+
+def iter_line_chunks(stream, fmt="csv", chunk_size=5000):
+    """把输入按完整记录切分成块，产出 (起始行号, 行列表)"""
+    chunk = []
+    first_line = 1
+    line_no = 0
+    in_quotes = False
+    for line in stream:
+        line_no += 1
+        chunk.append(line)
+        if fmt == "csv" and line.count('"') % 2:
+            # 引号内的换行属于同一条记录，不能在此处切分
+            in_quotes = not in_quotes
+        if len(chunk) >= chunk_size and not in_quotes:
+            yield first_line, chunk
+            chunk = []
+            first_line = line_no + 1
+    if chunk:
+        yield first_line, chunk
+
+
+_worker_engine = None
+
+
+def _init_batch_worker(language, char_count_mode, defined_names, share_subexpressions=False, target=None):
+    """子进程初始化：每个进程只创建一次生成引擎"""
+    global _worker_engine
+    lang_manager = LanguageManager()
+    lang_manager.current_language = language
+    _worker_engine = FormulaEngine(lang_manager, char_count_mode, defined_names, share_subexpressions, target)
+
+
+def _generate_chunk(first_line, lines, fmt):
+    """子进程中解析并生成一个数据块"""
+    return list(generate_batch(read_spec_rows(lines, fmt, first_line), _worker_engine))
+
+def generate_batch_parallel(stream, fmt="csv", workers=None, chunk_size=5000, max_in_flight=None, language="zh",
+                            char_count_mode=CHAR_COUNT_COMPAT, defined_names=(), share_subexpressions=False,
+                            target=None):
+    """多进程批量生成函数，按输入顺序产出结果，在途数据块数量有上限"""
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                                initargs=(language, char_count_mode, tuple(defined_names),
+                                                          share_subexpressions, target)) as pool:
+        try:
+            for first_line, lines in iter_line_chunks(stream, fmt, chunk_size):
+                # 在途块已满时先按顺序输出最早的块，保持内存平稳
+                while len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+                pending.append(pool.submit(_generate_chunk, first_line, lines, fmt))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
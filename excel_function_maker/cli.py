@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行入口（不导入tkinter和pyperclip）
+Command-line interface; never imports tkinter or pyperclip
+
+python -m excel_function_maker                                  启动图形界面 / launch the GUI
+python -m excel_function_maker --func SUM --param A1:A10        生成单个函数 / one formula
+python -m excel_function_maker specs.csv -j 0 -o formulas.txt   批量生成 / batch mode
+python -m excel_function_maker specs.csv --cost --max-cells 100000   开销检查 / cost gate for CI
+python -m excel_function_maker --func SUM --param A1:C1 --fill 200000   向下填充 / fill down
+python -m excel_function_maker --func LEFT --param A2 --param 3 --fill 100000 --spill   一个溢出公式 / one spill formula
+python -m excel_function_maker --func VLOOKUP --param A2 --param D:F --param 2 --param FALSE --target 2021
+                                                                改写为更快的写法 / rewrite for a version
+python -m excel_function_maker specs.csv -o formulas.xlsx       写入工作簿 / write a workbook
+python -m excel_function_maker --audit archive/ -j 0 --rewrite fixed/   审计工作簿 / audit workbooks
+python -m excel_function_maker --serve 127.0.0.1:8765 -j 0      本地公式服务 / local formula service
+python -m excel_function_maker specs.csv --trace trace.json     耗时跟踪 / timing trace
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from excel_function_maker.engine import CHAR_COUNT_COMPAT, CHAR_COUNT_MODES, FormulaEngine
+from excel_function_maker.formula import Expression
+from excel_function_maker.language import LANGUAGES, LanguageManager
+from excel_function_maker.optimize import EXCEL_VERSIONS, optimize
+
+
+def _expression(text):
+    """--expr 的参数：公式表达式（开头的等号可省略）"""
+    return Expression(text[1:] if text.startswith("=") else text)
+
+
+def _row_count(text):
+    """--fill 的行数：至少为1"""
+    try:
+        count = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid row count {text!r}") from None
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"row count must be at least 1, got {count}")
+    return count
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="excel_function_maker",
+        description="Generate Excel formulas. Without arguments the GUI is started.")
+    parser.add_argument("input", nargs="?",
+                        help="batch input: CSV/JSONL file of (function, params...) rows, or - for stdin")
+    parser.add_argument("--func", help="generate a single formula for this function, e.g. VLOOKUP")
+    parser.add_argument("--param", action="append", default=[],
+                        help="parameter value for --func; repeat for each parameter. Values are always "
+                             "values: =apple is the text criterion \"=apple\"")
+    parser.add_argument("--expr", action="append", dest="param", type=_expression, metavar="FORMULA",
+                        help="a parameter that is itself a formula, inserted as is without quotes, e.g. "
+                             "VLOOKUP(A2,D:F,2,FALSE)>10 (a leading = is optional); mixes with --param in order")
+    parser.add_argument("--fill", type=_row_count, metavar="N",
+                        help="with --func: fill the formula down N rows; relative references shift "
+                             "and $-anchored parts stay fixed, like Excel's fill handle")
+    parser.add_argument("--spill", action="store_true",
+                        help="with --fill: write one dynamic-array formula covering the N rows instead of N "
+                             "formulas (Excel 2021+; MAP/BYROW need 2024/365); falls back to per-row formulas "
+                             "when --target is older or the formula cannot spill")
+    parser.add_argument("--eval", metavar="CSV",
+                        help="also evaluate each formula against this CSV sheet (needs numpy); "
+                             "output becomes formula<TAB>value (value=unknown for a formula that cannot be parsed)")
+    parser.add_argument("--cost", action="store_true",
+                        help="append the estimated recalculation cost of each formula as an extra column")
+    parser.add_argument("--max-cells", type=int, metavar="N",
+                        help="exit with status 3 if any formula touches more than N cells (for CI)")
+    parser.add_argument("--fail-on-flags", action="store_true",
+                        help="exit with status 3 if any formula is flagged as costly (for CI)")
+    parser.add_argument("--audit", nargs="+", metavar="XLSX",
+                        help="audit formulas in these .xlsx files or directories against the function catalog; "
+                             "reports path, sheet, cell, status, function, formula, suggestion for each "
+                             "non-conforming cell (exit status 3 if any)")
+    parser.add_argument("--rewrite", metavar="DIR",
+                        help="with --audit: write copies of the workbooks with style-only differences fixed into DIR")
+    parser.add_argument("--rewrite-mismatches", action="store_true",
+                        help="with --rewrite: also apply suggestions that change a formula's meaning")
+    parser.add_argument("--serve", nargs="?", const="127.0.0.1:8765", metavar="ADDRESS",
+                        help="run a local HTTP formula service on HOST:PORT or unix:PATH "
+                             "(default: 127.0.0.1:8765); POST /generate and /batch with JSON")
+    parser.add_argument("--char-count-mode", choices=CHAR_COUNT_MODES, default=CHAR_COUNT_COMPAT,
+                        help="CHAR_COUNT output: compat (any Excel version) or let "
+                             "(single LET formula, Excel 2021+; default: compat)")
+    parser.add_argument("--let", action="store_true",
+                        help="extract function calls that appear more than once into LET bindings so Excel "
+                             "evaluates them once (Excel 2021+); useful with nested parameters")
+    parser.add_argument("--target", choices=EXCEL_VERSIONS,
+                        help="rewrite formulas into faster equivalents available in this Excel version "
+                             "(e.g. exact VLOOKUP -> XLOOKUP for 2021, INDEX/MATCH before); with --func the "
+                             "original formula and each rewrite's cost change are printed to stderr")
+    parser.add_argument("--names", default="",
+                        help="comma-separated defined names (e.g. Sales,TaxRate) used as references, not quoted text")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file (default: stdout); a .xlsx path writes the formulas into "
+                             "worksheet cells, one row per formula")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="batch input format (default: by extension)")
+    parser.add_argument("--lang", choices=list(LANGUAGES), help="language for generated messages")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="batch worker processes; 0 uses all cores (default: 1, in-process; "
+                             "with --serve, large batches always run in worker processes)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="batch input lines per worker chunk")
+    parser.add_argument("--max-in-flight", type=int, help="batch chunks queued at once (default: 2 x workers)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record timing spans and counters (also for the GUI), write them to FILE as "
+                             "Chrome trace JSON (chrome://tracing, ui.perfetto.dev) and print a summary to "
+                             "stderr; worker processes (-j other than 1) are not traced")
+    return parser
+
+
+def _detect_format(path, fmt):
+    """根据参数或文件扩展名确定输入格式"""
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+def _defined_names(args):
+    """--names 参数中的名称列表"""
+    return [name.strip() for name in args.names.split(",") if name.strip()]
+
+
+def _with_values(rows, csv_path):
+    """为每行输出附加公式在CSV数据上的求值结果；无法解析的公式写 value=unknown 并在stderr说明行号"""
+    # 求值模块（numpy）只在需要时导入
+    from excel_function_maker.evaluator import Evaluator, Sheet, format_value
+    from excel_function_maker.formula import FormulaSyntaxError
+
+    evaluator = Evaluator(Sheet.from_csv(csv_path))
+    for row_no, row in enumerate(rows, 1):
+        try:
+            row.append(format_value(evaluator.evaluate(row[0])))
+        except (FormulaSyntaxError, RecursionError) as e:
+            print(f"warning: row {row_no}: cannot evaluate {row[0]!r}: {e}", file=sys.stderr)
+            row.append("value=unknown")
+        yield row
+
+
+def _with_cost(rows, args, failures):
+    """估算每个公式的开销；超过 --max-cells 或被标记时记入 failures"""
+    from excel_function_maker.cost import analyze
+    from excel_function_maker.formula import FormulaSyntaxError
+
+    for row in rows:
+        try:
+            cost = analyze(row[0])
+        except FormulaSyntaxError:
+            if args.cost:
+                row.append("cost=unknown")
+            yield row
+            continue
+        if args.cost:
+            row.append(cost.summary())
+        if (args.max_cells is not None and cost.cells > args.max_cells) or (args.fail_on_flags and cost.flags):
+            failures.append(cost)
+        yield row
+
+
+def _output_rows(formulas, args, failures):
+    """组装输出列：公式、可选的求值结果和开销估算"""
+    rows = ([formula] for formula in formulas)
+    if args.eval:
+        rows = _with_values(rows, args.eval)
+    if args.cost or args.max_cells is not None or args.fail_on_flags:
+        rows = _with_cost(rows, args, failures)
+    return rows
+
+
+class _TextOutput:
+    """每行一条制表符分隔的文本输出"""
+
+    def __init__(self, path):
+        self.dst = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+
+    def write_row(self, row):
+        self.dst.write("\t".join(row))
+        self.dst.write("\n")
+
+    def close(self):
+        if self.dst is not sys.stdout:
+            self.dst.close()
+
+
+def _open_output(path, formulas=True):
+    """打开输出：.xlsx 路径写入工作表单元格（公式、求值结果、开销各占一列），其他路径写文本"""
+    if path.lower().endswith(".xlsx"):
+        # xlsx 模块只在需要时导入
+        from excel_function_maker.xlsx import XlsxWriter
+        return XlsxWriter(path, formulas=formulas)
+    return _TextOutput(path)
+
+
+def _report_failures(failures):
+    """输出超出开销限制的公式，返回退出码"""
+    if not failures:
+        return 0
+    for cost in failures[:10]:
+        details = "".join(f"; {code} {detail}" for code, detail in cost.flags)
+        print(f"costly formula: {cost.formula}\n  {cost.summary()}{details}", file=sys.stderr)
+    print(f"error: {len(failures)} formula(s) exceed the cost limits", file=sys.stderr)
+    return 3
+
+
+def run_single(args, lang_manager):
+    """生成单个函数并输出"""
+    engine = FormulaEngine(lang_manager, args.char_count_mode, _defined_names(args), args.let, args.target)
+    func_name = args.func.strip().upper()
+    try:
+        formula = engine.generate(func_name, args.param)
+    except KeyError:
+        print(f"error: unknown function {func_name!r}", file=sys.stderr)
+        return 2
+    if args.target is not None:
+        # 改写说明输出到stderr，stdout 只有公式（改写结果有缓存，不会重新分析）
+        optimization = optimize(engine.format(func_name, args.param), args.target)
+        if optimization.rewrites:
+            print(f"original: {optimization.original}", file=sys.stderr)
+        for rewrite in optimization.rewrites:
+            print(f"rewrite: {rewrite.summary()}", file=sys.stderr)
+    formulas = [formula]
+    if args.fill is not None:
+        # 填充和溢出模块只在需要时导入
+        from excel_function_maker.fill import FillTemplate
+        spill = None
+        if args.spill:
+            from excel_function_maker.spill import spill_down
+            spill = spill_down(formula, args.fill, args.target)
+            if spill.formula is not None and args.output.lower().endswith(".xlsx"):
+                # 工作簿写入没有动态数组的元数据，Excel 会把溢出公式按单个值计算
+                spill.formula, spill.reason = None, ".xlsx output cannot hold dynamic-array formulas"
+            if spill.formula is None:
+                print(f"spill: writing {args.fill:,} per-row formulas instead ({spill.reason})", file=sys.stderr)
+        if spill is not None and spill.formula is not None:
+            formulas = [spill.formula]
+            print(f"spill: one {spill.mode} formula for {args.fill:,} rows (Excel {spill.since}+)", file=sys.stderr)
+        else:
+            formulas = FillTemplate(formula).fill_down(args.fill)
+    failures = []
+    try:
+        output = _open_output(args.output)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    count = 0
+    try:
+        for row in _output_rows(formulas, args, failures):
+            output.write_row(row)
+            count += 1
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        output.close()
+    if args.fill is not None:
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"{count} rows in {elapsed:.3f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+    return _report_failures(failures)
+
+
+def run_batch(args, lang_manager):
+    """批量生成并输出吞吐量"""
+    # 批量模块只在批量模式下导入
+    from excel_function_maker.batch import generate_batch, generate_batch_parallel, read_spec_rows
+
+    fmt = _detect_format(args.input, args.format)
+    src = output = None
+    try:
+        src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+        output = _open_output(args.output)
+    except OSError as e:
+        if src is not None and src is not sys.stdin:
+            src.close()
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.workers == 1:
+        engine = FormulaEngine(lang_manager, args.char_count_mode, _defined_names(args), args.let, args.target)
+        formulas = generate_batch(read_spec_rows(src, fmt), engine)
+    else:
+        formulas = generate_batch_parallel(src, fmt, args.workers or None, args.chunk_size,
+                                           args.max_in_flight, lang_manager.current_language,
+                                           args.char_count_mode, _defined_names(args), args.let, args.target)
+    failures = []
+    rows = _output_rows(formulas, args, failures)
+    count = 0
+    start = time.perf_counter()
+    try:
+        for row in rows:
+            output.write_row(row)
+            count += 1
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        formulas.close()
+        if src is not sys.stdin:
+            src.close()
+        output.close()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} rows in {elapsed:.3f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+    return _report_failures(failures)
+
+
+def _rewrite_target(path, base, out_dir):
+    """改写副本的路径：保持相对于输入根目录的位置"""
+    target = os.path.join(out_dir, os.path.relpath(os.path.abspath(path), base))
+    if os.path.abspath(target) == os.path.abspath(path):
+        raise ValueError(f"refusing to overwrite {path}")
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    return target
+
+
+def run_audit(args, lang_manager):
+    """审计工作簿中的公式，输出不符合的单元格，可选写出改写后的副本"""
+    from excel_function_maker.audit import (AUDIT_MISMATCH, AUDIT_STATUSES, AUDIT_STYLE, audit_workbooks,
+                                             rewrite_workbook)
+
+    fix_statuses = {AUDIT_STYLE, AUDIT_MISMATCH} if args.rewrite_mismatches else {AUDIT_STYLE}
+    base = os.path.commonpath([os.path.abspath(p) if os.path.isdir(p) else os.path.dirname(os.path.abspath(p))
+                               for p in args.audit])
+    errors = []
+    totals = dict.fromkeys(AUDIT_STATUSES, 0)
+    workbooks = sheets = formulas = rewritten = 0
+    size = 0
+    # 当前工作簿的改写内容（同一工作簿的工作表结果连续到达）
+    current, fixes = None, {}
+
+    def flush_rewrite():
+        nonlocal rewritten
+        if args.rewrite and fixes:
+            rewritten += rewrite_workbook(current, _rewrite_target(current, base, args.rewrite), fixes)
+
+    output = _open_output(args.output, formulas=False)
+    start = time.perf_counter()
+    try:
+        for result in audit_workbooks(args.audit, args.workers, lang_manager.current_language, errors):
+            if result.path != current:
+                flush_rewrite()
+                current, fixes = result.path, {}
+                workbooks += 1
+                size += os.path.getsize(result.path)
+            sheets += 1
+            formulas += result.formulas
+            if result.error:
+                errors.append((f"{result.path} [{result.sheet}]", result.error))
+            for status, count in result.counts.items():
+                totals[status] += count
+            for cell, status, name, original, suggestion in result.findings:
+                output.write_row([result.path, result.sheet, cell, status, name, original, suggestion])
+            sheet_fixes = {cell: suggestion for cell, (status, suggestion) in result.fixes.items()
+                           if status in fix_statuses}
+            if sheet_fixes:
+                fixes[result.part] = sheet_fixes
+        flush_rewrite()
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        output.close()
+    elapsed = time.perf_counter() - start
+    for path, message in errors:
+        print(f"error: {path}: {message}", file=sys.stderr)
+    matched = sum(totals.values())
+    rate = size / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+    print(f"{workbooks} workbooks, {sheets} sheets, {formulas} formulas, {matched} from the catalog: "
+          + ", ".join(f"{status} {count}" for status, count in totals.items())
+          + f" in {elapsed:.2f}s ({rate:.1f} MB/s)", file=sys.stderr)
+    if args.rewrite:
+        print(f"{rewritten} formulas rewritten into {args.rewrite}", file=sys.stderr)
+    if errors:
+        return 1
+    return 3 if totals[AUDIT_STYLE] or totals[AUDIT_MISMATCH] else 0
+
+
+def run_server(args, lang_manager):
+    """运行本地公式服务直到按 Ctrl+C"""
+    from excel_function_maker.server import serve
+
+    try:
+        serve(args.serve, lang_manager, args.char_count_mode, _defined_names(args), args.workers,
+              ready=lambda address: print(f"serving on {address} (Ctrl+C to stop)", file=sys.stderr),
+              share_subexpressions=args.let, target=args.target)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    """命令行主函数：有参数时生成函数，无参数时启动图形界面"""
+    args = build_parser().parse_args(argv)
+    if not args.trace:
+        return dispatch(args)
+    from excel_function_maker.tracing import TRACER
+    TRACER.enable()
+    try:
+        return dispatch(args)
+    finally:
+        TRACER.disable()
+        try:
+            TRACER.export(args.trace)
+        except OSError as e:
+            print(f"error: cannot write trace: {e}", file=sys.stderr)
+        print(TRACER.summary(), file=sys.stderr)
+
+
+def dispatch(args):
+    """按参数运行图形界面、服务、审计、单个函数或批量生成"""
+    if not args.func and not args.input and not args.audit and not args.serve:
+        # 图形界面模块（tkinter、pyperclip）只在这里才导入
+        from excel_function_maker.gui import main as gui_main
+        gui_main()
+        return 0
+
+    lang_manager = LanguageManager()
+    if args.lang:
+        lang_manager.current_language = args.lang
+    if args.fill is not None and not args.func:
+        print("error: --fill requires --func", file=sys.stderr)
+        return 2
+    if args.spill and args.fill is None:
+        print("error: --spill requires --fill", file=sys.stderr)
+        return 2
+    if args.serve:
+        return run_server(args, lang_manager)
+    if args.audit:
+        return run_audit(args, lang_manager)
+    if args.func:
+        return run_single(args, lang_manager)
+    return run_batch(args, lang_manager)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板输出：多个公式一次放入剪贴板
+Clipboard output: many formulas placed on the clipboard in one operation
+
+多个公式拼成一段TSV文本（每行一个公式，一行中的多个单元格以制表符分隔），粘贴到Excel时
+按列或区域展开。有Tk窗口时使用Tk自己的剪贴板，不启动任何进程；没有窗口时才使用 pyperclip
+（Linux上每次调用都会启动 xclip/xsel）。
+Rows are joined into one TSV text (one row per line, cells separated by tabs)
+that pastes into Excel as a column or block. When a Tk window exists its own
+clipboard is used and no process is spawned; pyperclip (which runs xclip/xsel
+on Linux for every call) is only the fallback.
+"""
+
+from excel_function_maker.tracing import TRACER
+
+CLIPBOARD_TK = "tk"
+CLIPBOARD_PYPERCLIP = "pyperclip"
+
+
+def _tsv_cell(value):
+    """单元格文本；含制表符、换行或以引号开头时按Excel的规则加引号"""
+    text = "" if value is None else str(value)
+    if "\t" in text or "\n" in text or "\r" in text or text.startswith('"'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def to_tsv(rows):
+    """把行转为TSV文本；每行可以是单个字符串（一个单元格）或单元格序列"""
+    lines = []
+    for row in rows:
+        if isinstance(row, str):
+            lines.append(_tsv_cell(row))
+        else:
+            lines.append("\t".join(_tsv_cell(value) for value in row))
+    return "\n".join(lines)
+
+
+def copy_text(text, root=None):
+    """把文本放到剪贴板，返回使用的方式（CLIPBOARD_TK 或 CLIPBOARD_PYPERCLIP）
+
+    root 为Tk窗口时使用Tk的剪贴板；在X11上内容由本程序持有，退出后由剪贴板管理器保留。
+    """
+    with TRACER.span("clipboard.copy", chars=len(text)) as span:
+        if root is not None:
+            span.set(method=CLIPBOARD_TK)
+            root.clipboard_clear()
+            root.clipboard_append(text)
+            return CLIPBOARD_TK
+        span.set(method=CLIPBOARD_PYPERCLIP)
+        # pyperclip 只在没有窗口时导入（Linux上每次复制都会启动 xclip/xsel 进程）
+        import pyperclip
+        pyperclip.copy(text)
+        return CLIPBOARD_PYPERCLIP
+
+
+def copy_rows(rows, root=None):
+    """把多行公式作为TSV一次放到剪贴板，返回使用的方式"""
+    return copy_text(to_tsv(rows), root)
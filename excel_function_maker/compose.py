@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌套公式组合（参数可以是另一个公式）和重复子表达式提取为 LET
+Nested formula composition and extraction of repeated subexpressions into LET
+
+Formula 是不可变的节点：函数名加参数，参数可以是文本（按引擎规则加引号，以等号开头也是文本）或另一个 Formula，
+Expression 类型的参数成为没有子节点的表达式节点；
+Formula.expression("{0}>10", 子公式) 把子公式放进比较、运算等表达式中。相同内容的节点相等，
+子公式可以被多个父节点共用，组成有向无环图。
+Composer 按节点缓存生成结果：修改一个叶子参数时（Formula.update），只有从根到这个叶子路径上的节点是新对象、
+需要重新生成，其余子公式直接使用缓存。
+share_let 把同一公式中出现两次以上的函数调用提取为 LET 绑定，Excel 只计算一次（需要 Excel 2021 或更高版本）。
+A Formula is an immutable node (a function and its parameters), where a
+parameter is text (quoted by the engine's rules, even when it starts with
+"=") or another Formula, and an Expression parameter becomes a leaf
+expression node. Formula.expression("{0}>10", child) embeds children in
+comparisons and other operators. Equal nodes compare equal and can be shared
+by several parents, forming a DAG. Composer memoizes rendering per node:
+Formula.update() copies only the path from the root to the edited leaf, so
+only that path is re-rendered. share_let() hoists function calls that appear more than once
+into LET bindings so Excel evaluates them once (Excel 2021+).
+"""
+
+import bisect
+
+from excel_function_maker.formula import Expression, FormulaSyntaxError, iter_tokens
+
+# 易失性函数每次调用结果可能不同，不能合并为一个绑定
+_VOLATILE = frozenset(["NOW", "TODAY", "RAND", "RANDBETWEEN", "RANDARRAY", "OFFSET", "INDIRECT", "CELL", "INFO"])
+# 这些函数的参数中有局部名称，参数内部的表达式不能提到外面
+_SCOPED = frozenset(["LET", "LAMBDA"])
+# LET 绑定名称的前缀（带下划线，不会与单元格引用混淆）
+LET_PREFIX = "sub_"
+# 缓存的节点数超过此值时清空（编辑过程中不再使用的旧节点）
+MEMO_LIMIT = 100000
+
+
+def split_record(record):
+    """拆分一条JSON记录，返回 (函数名, 表达式模板, 参数列表)，函数名和模板只有一个不为None；形式不对时抛出ValueError"""
+    if isinstance(record, dict):
+        if "expression" in record:
+            function, template = None, str(record["expression"])
+        else:
+            function, template = str(record.get("function", "")), None
+        params = record.get("params")
+        if params is None:
+            params = []
+        elif not isinstance(params, list):
+            raise ValueError(f'"params" of {function or template} must be a list')
+        return function, template, params
+    if isinstance(record, list) and record and isinstance(record[0], str):
+        return record[0], None, record[1:]
+    raise ValueError('expected {"function": ..., "params": [...]} or [function, params...]')
+
+
+class Formula:
+    """公式节点：function 为函数名（表达式节点为None），params 为文本或 Formula 的元组"""
+
+    __slots__ = ("function", "template", "params", "_hash")
+
+    def __init__(self, function, params=(), template=None):
+        self.function = function.strip().upper() if function is not None else None
+        self.template = template
+        self.params = tuple(param if isinstance(param, Formula) else Formula(None, (), param.strip())
+                            if isinstance(param, Expression) else "" if param is None else str(param)
+                            for param in params)
+        # 子节点的哈希已经缓存，整棵树的哈希不需要递归计算
+        self._hash = hash((self.function, self.template, self.params))
+
+    @classmethod
+    def expression(cls, template, *operands):
+        """表达式节点：template 中的 {0}、{1} 替换为各操作数（如 "{0}>10"）"""
+        return cls(None, operands, template)
+
+    @classmethod
+    def from_record(cls, record, nodes=None):
+        """从JSON记录（与批量输入相同：{"function": ..., "params": [...]} 或 [函数名, 参数...]）创建节点
+
+        参数也可以是这样的记录（嵌套公式）或 {"expression": "{0}>10", "params": [...]}。
+        nodes 为字典时相同的子公式共用一个节点。
+        """
+        function, template, params = split_record(record)
+        node = cls(function, [cls.from_record(param, nodes) if isinstance(param, (dict, list)) else param
+                              for param in params], template)
+        if nodes is not None:
+            node = nodes.setdefault(node, node)
+        return node
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Formula) or self._hash != other._hash:
+            return False
+        return (self.function, self.template, self.params) == (other.function, other.template, other.params)
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        if self.function is None:
+            return f"Formula.expression({self.template!r}, {', '.join(map(repr, self.params))})"
+        return f"Formula({self.function!r}, {list(self.params)!r})"
+
+    def with_param(self, index, value):
+        """替换一个参数后的新节点（参数个数不够时补空文本）"""
+        params = list(self.params)
+        params.extend([""] * (index + 1 - len(params)))
+        params[index] = value
+        return Formula(self.function, params, self.template)
+
+    def update(self, path, value):
+        """替换 path（各层参数序号）所指的参数，返回新的根节点；只复制路径上的节点"""
+        parents = []
+        node = self
+        for index in path[:-1]:
+            child = node.params[index] if index < len(node.params) else None
+            if not isinstance(child, Formula):
+                raise ValueError(f"parameter {index + 1} of {node.function or node.template} is not a formula")
+            parents.append((node, index))
+            node = child
+        node = node.with_param(path[-1], value)
+        # 从下往上复制路径上的节点（不递归，深层嵌套也可以使用）
+        for parent, index in reversed(parents):
+            node = parent.with_param(index, node)
+        return node
+
+    def walk(self):
+        """本节点和全部子节点（共用的子节点只产出一次）"""
+        seen = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            yield node
+            stack.extend(param for param in node.params if isinstance(param, Formula))
+
+
+class Composer:
+    """把 Formula 节点生成为公式文本，按节点缓存结果"""
+
+    def __init__(self, engine, let=None):
+        """let 为True时把重复的函数调用提取为 LET 绑定，None 时按引擎的 share_subexpressions"""
+        self.engine = engine
+        self.let = engine.share_subexpressions if let is None else let
+        self._memo = {}
+        # 实际生成过的节点数（用于基准和验证缓存效果）
+        self.renders = 0
+
+    def expression(self, node):
+        """节点的表达式文本（不带开头的等号），未知函数抛出KeyError"""
+        text = self._memo.get(node)
+        if text is not None:
+            return text
+        # 深层嵌套时先生成子节点（从下往上），避免递归过深
+        pending = [node]
+        while pending:
+            current = pending[-1]
+            missing = [param for param in current.params
+                       if isinstance(param, Formula) and param not in self._memo]
+            if missing:
+                pending.extend(missing)
+                continue
+            pending.pop()
+            if current not in self._memo:
+                self._memo[current] = self._render(current)
+        text = self._memo[node]
+        if len(self._memo) > MEMO_LIMIT:
+            self._memo.clear()
+        return text
+
+    def _render(self, node):
+        self.renders += 1
+        memo = self._memo
+        if node.function is None and not node.params:
+            # 没有子节点的表达式（Expression 参数）原样使用，其中的 {1,2} 等数组常量不当作占位符
+            return node.template
+        if node.function is None:
+            # 表达式节点：子公式放进括号，避免与外面的运算符结合错误
+            operands = [f"({memo[param]})" if isinstance(param, Formula) and param.function is None
+                        else memo[param] if isinstance(param, Formula) else param
+                        for param in node.params]
+            try:
+                return node.template.format(*operands)
+            except (IndexError, KeyError, ValueError):
+                raise ValueError(f"invalid expression {node.template!r}: use {{0}}, {{1}}... for its parameters")
+        # 子公式作为 Expression 参数传给引擎，不会加引号
+        values = [Expression(memo[param]) if isinstance(param, Formula) else param for param in node.params]
+        formula = self.engine.format(node.function, values)
+        return formula[1:] if formula.startswith("=") else formula
+
+    def render(self, node):
+        """完整公式（带等号）；按引擎的目标版本改写，let 为True时提取重复的子表达式"""
+        return self.engine.finish("=" + self.expression(node), self.let)
+
+    def clear(self):
+        self._memo.clear()
+
+
+def _calls(tokens):
+    """可以提取的函数调用：(开始, 结束, 比较键, 长度) 的列表
+
+    比较键忽略空白，字符串以外不区分大小写；已闭合的子调用在键中替换为编号（相同内容编号相同），
+    所以深层嵌套时计算所有键的时间也与公式长度成正比。
+    不包括含有易失性函数的调用和 LET/LAMBDA 参数内部的调用。
+    """
+    calls = []
+    ids = {}
+    # 未闭合的括号：[开始位置, 函数名, 是否在局部作用域中, 键的片段, 长度, 是否含易失性函数]
+    stack = []
+    scoped = 0
+    for index, (kind, text) in enumerate(tokens):
+        if kind == "ws":
+            continue
+        if kind == "func":
+            name = text.upper()
+            stack.append([index, name, scoped > 0, [name], len(name), name in _VOLATILE])
+            if name in _SCOPED:
+                scoped += 1
+            continue
+        if kind == "lparen" and not (index and tokens[index - 1][0] == "func"):
+            stack.append([index, None, scoped > 0, ["("], 1, False])
+            continue
+        if not stack:
+            continue
+        frame = stack[-1]
+        frame[3].append(text if kind == "str" else text.upper())
+        frame[4] += len(text)
+        if kind != "rparen":
+            continue
+        start, name, in_scope, parts, size, volatile = stack.pop()
+        if name in _SCOPED:
+            scoped -= 1
+        key = "".join(parts)
+        number = ids.setdefault(key, len(ids))
+        if name is not None and not in_scope and not volatile:
+            calls.append((start, index + 1, key, size))
+        if stack:
+            parent = stack[-1]
+            parent[3].append(f"\x00{number}\x00")
+            parent[4] += size
+            parent[5] = parent[5] or volatile
+    return calls
+
+
+def _inside(span, starts, ends):
+    """span 是否在某个已替换的区域内（区域互不重叠，按开始位置排序）"""
+    index = bisect.bisect_right(starts, span[0]) - 1
+    return index >= 0 and ends[index] >= span[1]
+
+
+def share_let(formula, prefix=LET_PREFIX):
+    """把出现两次以上的函数调用提取为 LET 绑定（最长的优先），没有重复或无法解析时原样返回
+
+    易失性函数（RAND、NOW等）的调用和 LET/LAMBDA 内部的表达式不会被提取。
+    """
+    body = formula[1:] if formula.startswith("=") else formula
+    try:
+        tokens = list(iter_tokens(body))
+    except FormulaSyntaxError:
+        return formula
+    occurrences = {}
+    sizes = {}
+    for start, end, key, size in _calls(tokens):
+        occurrences.setdefault(key, []).append((start, end))
+        sizes[key] = size
+    # 最长的重复调用先提取；被替换为名称的位置（第一次出现以外）中的较短调用不再计数
+    dead_starts, dead_ends = [], []
+    hoisted = []
+    for key in sorted((key for key, spans in occurrences.items() if len(spans) > 1), key=sizes.get, reverse=True):
+        live = sorted(span for span in occurrences[key] if not _inside(span, dead_starts, dead_ends))
+        if len(live) < 2:
+            continue
+        hoisted.append(live)
+        for start, end in live[1:]:
+            index = bisect.bisect_left(dead_starts, start)
+            dead_starts.insert(index, start)
+            dead_ends.insert(index, end)
+    if not hoisted:
+        return formula
+    # 较短的先定义（较长的表达式可能用到它们），名称按定义顺序编号
+    taken = {text.upper() for kind, text in tokens if kind in ("name", "func")}
+    names = {}
+    number = 0
+    for live in reversed(hoisted):
+        number += 1
+        while f"{prefix}{number}".upper() in taken:
+            number += 1
+        for start, end in live:
+            names[start] = (end, f"{prefix}{number}")
+
+    def text_of(start, end):
+        """区域的文本，其中提取过的调用替换为名称（区域本身除外）"""
+        parts = []
+        index = start
+        while index < end:
+            replaced = names.get(index)
+            if replaced is not None and replaced[0] <= end and (index, replaced[0]) != (start, end):
+                parts.append(replaced[1])
+                index = replaced[0]
+            else:
+                parts.append(tokens[index][1])
+                index += 1
+        return "".join(parts).strip()
+
+    bindings = []
+    for live in reversed(hoisted):
+        start, end = live[0]
+        bindings.append(f"{names[start][1]},{text_of(start, end)}")
+    return "=LET(" + ",".join(bindings) + f",{text_of(0, len(tokens))})"
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式计算开销估算
+Formula cost analysis: estimates how expensive a generated formula is to recalculate
+
+对语法树做一次遍历，统计涉及的单元格数、范围扫描次数和易失性函数，
+并标记高开销写法：数组函数中的整列/整行引用、重复计算的相同范围表达式。
+普通函数中的整列引用Excel只计算已用区域，单独计数，不计入单元格数。
+A single pass over the syntax tree counts cells touched, range scans and
+volatile functions, and flags costly patterns: whole-column/row references
+inside array functions and identical range expressions computed more than
+once. Whole-column references outside array functions only read the used
+range, so they are counted separately instead of as a million cells.
+"""
+
+from excel_function_maker.formula import MAX_COLUMNS, MAX_ROWS, column_letters, parse_formula
+
+# 参数按数组逐个单元格计算的函数（不会裁剪到已用区域）
+ARRAY_FUNCTIONS = frozenset(["SUMPRODUCT", "MMULT", "TRANSPOSE", "FREQUENCY", "FILTER", "SORT", "SORTBY",
+                             "UNIQUE", "MAP", "BYROW", "BYCOL", "REDUCE", "SCAN"])
+# 每次工作簿变化都会重新计算的函数
+VOLATILE_FUNCTIONS = frozenset(["NOW", "TODAY", "RAND", "RANDBETWEEN", "RANDARRAY", "OFFSET", "INDIRECT",
+                                "INFO", "CELL"])
+
+# 开销等级阈值（涉及的单元格数）
+COST_MEDIUM_CELLS = 10000
+COST_HIGH_CELLS = 1000000
+
+COST_LOW = "low"
+COST_MEDIUM = "medium"
+COST_HIGH = "high"
+
+# 标记类别
+FLAG_WHOLE_COLUMN_ARRAY = "whole_column_array"
+FLAG_REPEATED_SCAN = "repeated_scan"
+FLAG_VOLATILE = "volatile"
+
+
+def _freeze(node):
+    """把语法树节点转为可哈希的元组（用于识别相同的子表达式）"""
+    if isinstance(node, (list, tuple)):
+        return tuple(_freeze(item) for item in node)
+    return node
+
+
+def render_reference(ref):
+    """引用转为A1形式文本"""
+    if ref.sheet is None:
+        prefix = ""
+    elif ref.sheet.replace("_", "").replace(".", "").isalnum():
+        prefix = f"{ref.sheet}!"
+    else:
+        prefix = "'" + ref.sheet.replace("'", "''") + "'!"
+    if ref.row0 == 0 and ref.row1 == MAX_ROWS - 1:
+        return f"{prefix}{column_letters(ref.col0)}:{column_letters(ref.col1)}"
+    if ref.col0 == 0 and ref.col1 == MAX_COLUMNS - 1:
+        return f"{prefix}{ref.row0 + 1}:{ref.row1 + 1}"
+    start = f"{prefix}{column_letters(ref.col0)}{ref.row0 + 1}"
+    return start if ref.is_cell else f"{start}:{column_letters(ref.col1)}{ref.row1 + 1}"
+
+
+def render(node):
+    """语法树节点转回公式文本（用于提示信息）"""
+    kind = node[0]
+    if kind == "num":
+        return f"{node[1]:g}"
+    if kind == "str":
+        return '"' + node[1].replace('"', '""') + '"'
+    if kind == "bool":
+        return "TRUE" if node[1] else "FALSE"
+    if kind == "ref":
+        return render_reference(node[1]) if node[1] is not None else "#REF!"
+    if kind == "name":
+        return node[1]
+    if kind == "call":
+        return f"{node[1]}({','.join(render(arg) for arg in node[2])})"
+    if kind == "binop":
+        return f"{render(node[2])}{node[1]}{render(node[3])}"
+    if kind == "neg":
+        return f"-{render(node[1])}"
+    return ""
+
+
+def _is_whole_line(ref):
+    """是否整列或整行引用"""
+    return ref.height == MAX_ROWS or ref.width == MAX_COLUMNS
+
+
+class FormulaCost:
+    """一个公式的开销估算结果"""
+
+    __slots__ = ("formula", "cells", "open_refs", "scans", "volatile", "flags")
+
+    def __init__(self, formula):
+        self.formula = formula
+        # 涉及的单元格总数（每次扫描分别计算）
+        self.cells = 0
+        # 普通函数中的整列/整行引用个数（实际开销取决于已用区域）
+        self.open_refs = 0
+        # 多单元格范围被扫描的次数
+        self.scans = 0
+        # 出现的易失性函数名
+        self.volatile = []
+        # (类别, 对象) 列表，如 ("whole_column_array", "A:A")、("repeated_scan", "LEN(A1:J1) x4")
+        self.flags = []
+
+    @property
+    def level(self):
+        """开销等级：有数组整列引用或超过阈值为high"""
+        codes = {code for code, _ in self.flags}
+        if FLAG_WHOLE_COLUMN_ARRAY in codes or self.cells >= COST_HIGH_CELLS:
+            return COST_HIGH
+        if codes or self.cells >= COST_MEDIUM_CELLS:
+            return COST_MEDIUM
+        return COST_LOW
+
+    def summary(self):
+        """单行文本摘要（命令行输出用）"""
+        parts = [f"cost={self.level}", f"cells={self.cells}", f"scans={self.scans}",
+                 f"volatile={','.join(self.volatile) or 'no'}"]
+        if self.open_refs:
+            parts.insert(2, f"open={self.open_refs}")
+        if self.flags:
+            parts.append("flags=" + ",".join(dict.fromkeys(code for code, _ in self.flags)))
+        return " ".join(parts)
+
+    def __repr__(self):
+        return f"FormulaCost({self.summary()})"
+
+
+class _Analyzer:
+    """遍历语法树累计开销"""
+
+    def __init__(self, cost):
+        self.cost = cost
+        # LET名称 -> 绑定的范围引用（嵌套时每层一个字典）
+        self.scopes = []
+        # 含范围的子表达式 -> 出现次数
+        self.subexpressions = {}
+        self.whole_line_refs = []
+
+    def visit(self, node, in_array=False):
+        """返回节点是否引用了多单元格范围"""
+        kind = node[0]
+        if kind == "ref":
+            return self.visit_ref(node[1], in_array)
+        if kind == "name":
+            for scope in reversed(self.scopes):
+                if node[1].lower() in scope:
+                    ref = scope[node[1].lower()]
+                    return self.visit_ref(ref, in_array) if ref is not None else False
+            return False
+        if kind == "call":
+            return self.visit_call(node, in_array)
+        if kind == "binop":
+            left = self.visit(node[2], in_array)
+            right = self.visit(node[3], in_array)
+            return left or right
+        if kind == "neg":
+            return self.visit(node[1], in_array)
+        return False
+
+    def visit_ref(self, ref, in_array):
+        if ref is None:
+            return False
+        cost = self.cost
+        if ref.is_cell:
+            cost.cells += 1
+            return False
+        cost.scans += 1
+        if not _is_whole_line(ref):
+            cost.cells += ref.height * ref.width
+        elif in_array:
+            # 数组函数不会裁剪到已用区域，按整列计算
+            cost.cells += ref.height * ref.width
+            if ref not in self.whole_line_refs:
+                self.whole_line_refs.append(ref)
+        else:
+            cost.open_refs += 1
+        return True
+
+    def visit_call(self, node, in_array):
+        name, args = node[1], node[2]
+        if name in VOLATILE_FUNCTIONS and name not in self.cost.volatile:
+            self.cost.volatile.append(name)
+        if name == "LET" and len(args) >= 3 and len(args) % 2 == 1:
+            return self.visit_let(args, in_array)
+        in_array = in_array or name in ARRAY_FUNCTIONS
+        uses_range = False
+        for arg in args:
+            uses_range = self.visit(arg, in_array) or uses_range
+        if uses_range:
+            key = _freeze(node)
+            self.subexpressions[key] = self.subexpressions.get(key, 0) + 1
+        return uses_range
+
+    def visit_let(self, args, in_array):
+        """LET：范围绑定到名称，只在使用名称的地方计算扫描"""
+        scope = {}
+        self.scopes.append(scope)
+        try:
+            for name_node, value_node in zip(args[:-1:2], args[1:-1:2]):
+                if name_node[0] != "name":
+                    continue
+                if value_node[0] == "ref":
+                    scope[name_node[1].lower()] = value_node[1]
+                else:
+                    self.visit(value_node, in_array)
+                    scope[name_node[1].lower()] = None
+            return self.visit(args[-1], in_array)
+        finally:
+            self.scopes.pop()
+
+    def finish(self):
+        cost = self.cost
+        for ref in self.whole_line_refs:
+            cost.flags.append((FLAG_WHOLE_COLUMN_ARRAY, render_reference(ref)))
+        for key, count in self.subexpressions.items():
+            # 只报告最外层的重复（内层子表达式的重复次数不会更少）
+            if count > 1 and not any(c >= count and key != other and _contains(other, key)
+                                     for other, c in self.subexpressions.items()):
+                cost.flags.append((FLAG_REPEATED_SCAN, f"{render(key)} x{count}"))
+        if cost.volatile:
+            cost.flags.append((FLAG_VOLATILE, ", ".join(cost.volatile)))
+
+
+def _contains(node, part):
+    """node 的子树中是否包含 part"""
+    if not isinstance(node, tuple):
+        return False
+    return any(item == part or _contains(item, part) for item in node)
+
+
+def analyze(formula):
+    """估算公式的计算开销，公式无法解析时抛出 FormulaSyntaxError"""
+    cost = FormulaCost(formula)
+    analyzer = _Analyzer(cost)
+    analyzer.visit(parse_formula(formula))
+    analyzer.finish()
+    return cost
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式生成引擎（不依赖Tk界面）
+Formula generation engine (no Tk dependency)
+"""
+
+import functools
+
+from excel_function_maker.compose import share_let
+from excel_function_maker.formula import Expression, reference_kind
+from excel_function_maker.language import LanguageManager
+from excel_function_maker.optimize import check_target, optimize
+from excel_function_maker.tracing import TRACER
+
+
+# 参数值类别
+VALUE_EMPTY = "empty"
+VALUE_QUOTED = "quoted"
+VALUE_CELL_REFERENCE = "cell_reference"
+VALUE_NUMBER = "number"
+VALUE_BOOLEAN = "boolean"
+VALUE_TEXT = "text"
+
+# CHAR_COUNT 生成模式：兼容模式（每个字符一个SUMPRODUCT）和LET单次计算模式（Excel 2021+）
+CHAR_COUNT_COMPAT = "compat"
+CHAR_COUNT_LET = "let"
+CHAR_COUNT_MODES = (CHAR_COUNT_COMPAT, CHAR_COUNT_LET)
+
+# 数字参数可能的首字符
+_NUMBER_START = frozenset("0123456789.-")
+
+
+def is_cell_reference(text):
+    """检查是否是引用（A1、a1、A:A、1:1、Sheet1!A1、'Sales 2024'!A1、R1C1、Table1[Col] 等）"""
+    return reference_kind(text) is not None
+
+
+@functools.lru_cache(maxsize=4096)
+def classify_value(value):
+    """判断参数值的类别（结果缓存，批量输入中重复的值无需再次解析）"""
+    if not value:
+        return VALUE_EMPTY
+    first = value[0]
+    if first in ('"', "'") and value[-1] == first:
+        return VALUE_QUOTED
+    # 只含数字、点和减号的值不可能是引用，先用字符串检查排除（只检查以这些字符开头的值）
+    if first in _NUMBER_START and value.replace('.', '').replace('-', '').isdigit():
+        return VALUE_NUMBER
+    if reference_kind(value) is not None:
+        return VALUE_CELL_REFERENCE
+    if value.upper() in ('TRUE', 'FALSE'):
+        return VALUE_BOOLEAN
+    return VALUE_TEXT
+
+
+def char_count_let(range_param, chars):
+    """CHAR_COUNT的LET形式：范围只引用一次，总长度LEN(范围)只计算一次"""
+    # LEN(x)-LEN(SUBSTITUTE(x,c,"")) 求和后等于 总长度-替换后总长度
+    parts = "&".join(f'"{char}"&total-SUMPRODUCT(LEN(SUBSTITUTE(rng,"{char}","")))' for char in chars)
+    return f"=LET(rng,{range_param},total,SUMPRODUCT(LEN(rng)),{parts})"
+
+
+class CompiledFunction:
+    """预编译的函数格式化器，每个函数定义只构建一次"""
+
+    __slots__ = ("name", "template", "slot_count", "quote_slots", "required", "layout")
+
+    def __init__(self, name, func_info):
+        self.name = name
+        self.template = func_info['template']
+        self.slot_count = self.template.count('{')
+        args = func_info['args']
+        # 预先计算每个参数位置的引号规则
+        self.quote_slots = tuple(bool(arg.get('quote')) for arg in args)
+        # 可选参数之前必须保留的参数个数
+        self.required = sum(1 for arg in args if not arg.get('optional'))
+        self.layout = func_info.get('layout', 'template')
+
+    def quote(self, index, value, defined_names=frozenset()):
+        """对文本参数自动添加引号（如果需要），已定义的名称（大写）不加引号；Expression 参数是嵌套的公式，原样使用"""
+        if isinstance(value, Expression):
+            return value.strip()
+        value = str(value).strip()
+        if not value:
+            return value
+        if index < len(self.quote_slots) and self.quote_slots[index] and classify_value(value) is VALUE_TEXT \
+                and value.upper() not in defined_names:
+            return f'"{value}"'
+        return value
+
+    def format(self, values, lang_manager, char_count_mode=CHAR_COUNT_COMPAT, defined_names=frozenset()):
+        """根据参数值生成Excel函数"""
+        params = [self.quote(i, value, defined_names) for i, value in enumerate(values)]
+        return self.format_quoted(params, lang_manager, char_count_mode)
+
+    def format_quoted(self, params, lang_manager, char_count_mode=CHAR_COUNT_COMPAT):
+        """用已经加好引号的参数生成Excel函数；参数个数固定的函数多出非空参数时抛出ValueError"""
+        layout = self.layout
+        # 处理可选参数
+        if len(params) < self.slot_count:
+            params.extend([''] * (self.slot_count - len(params)))
+        elif len(params) > self.slot_count and layout in ('template', 'optional_tail') \
+                and any(params[self.slot_count:]):
+            raise ValueError(f"too many parameters for {self.name} (at most {self.slot_count}, got {len(params)})")
+
+        if layout == 'optional_tail':
+            # 过滤空的可选参数，省略后可以少于模板参数个数（如SUMIF只有两个参数）
+            params = [p for i, p in enumerate(params) if p or i < self.required]
+            if len(params) < self.slot_count:
+                return f"={self.name}({','.join(params)})"
+        elif layout == 'variadic':
+            # 可变数量的参数（如CONCATENATE）
+            return f"={self.name}({','.join(p for p in params if p)})"
+        elif layout == 'char_count':
+            # 字符计数统计函数的特殊处理
+            range_param = params[0] if params[0] else 'A1:J1'
+
+            # 处理输入的字符（数量不限），过滤空字符
+            chars = [p.strip().strip('"').strip("'") for p in params[1:] if p.strip()]
+            chars = [char for char in chars if char]
+            if not chars:
+                return f'="{lang_manager.get_text("please_input_chars")}"'
+            if char_count_mode == CHAR_COUNT_LET:
+                return char_count_let(range_param, chars)
+            return "=" + "&".join(
+                f'"{char}"&SUMPRODUCT(LEN({range_param})-LEN(SUBSTITUTE({range_param},"{char}","")))'
+                for char in chars)
+        return self.template.format(*params)
+
+
+class FormulaEngine:
+    """公式生成引擎（不依赖Tk界面，供界面和批量模式共用）"""
+
+    def __init__(self, lang_manager=None, char_count_mode=CHAR_COUNT_COMPAT, defined_names=(), share_subexpressions=False,
+                 target=None):
+        self.lang_manager = lang_manager if lang_manager is not None else LanguageManager()
+        self.char_count_mode = char_count_mode
+        # 工作簿中定义的名称（如 Sales），作为参数时按引用处理，不加引号
+        self.defined_names = frozenset(name.upper() for name in defined_names)
+        # 为True时把重复的函数调用提取为 LET 绑定（Excel 2021+）
+        self.share_subexpressions = share_subexpressions
+        # 目标Excel版本（EXCEL_VERSIONS 之一），设置时把旧写法改写为该版本中更快的写法；None 不改写
+        self.target = check_target(target) if target is not None else None
+        self._compiled = {}
+
+    def compile(self, func_name):
+        """获取函数的预编译格式化器，未知函数抛出KeyError"""
+        compiled = self._compiled.get(func_name)
+        if compiled is None:
+            functions = self.lang_manager.get_functions()
+            if func_name not in functions:
+                raise KeyError(func_name)
+            compiled = self._compiled[func_name] = CompiledFunction(func_name, functions[func_name])
+        return compiled
+
+    def quote_param(self, func_name, index, value):
+        """对文本参数自动添加引号（如果需要）"""
+        return self.compile(func_name).quote(index, value, self.defined_names)
+
+    def format(self, func_name, values):
+        """生成单个函数调用（不提取 LET），未知函数抛出KeyError"""
+        return self.compile(func_name).format(values, self.lang_manager, self.char_count_mode, self.defined_names)
+
+    def generate(self, func_name, values):
+        """根据函数名和参数值生成Excel函数，未知函数抛出KeyError；Expression 类型的参数是嵌套的公式"""
+        if TRACER.enabled:
+            return self._generate_traced(func_name, values)
+        formula = self.compile(func_name).format(values, self.lang_manager, self.char_count_mode, self.defined_names)
+        if self.target is None and not self.share_subexpressions:
+            return formula
+        return self.finish(formula)
+
+    def _generate_traced(self, func_name, values):
+        """与 generate 相同，分别记录参数分类、模板格式化和改写的耗时"""
+        with TRACER.span("engine.classify", function=func_name):
+            compiled = self.compile(func_name)
+            params = [compiled.quote(i, value, self.defined_names) for i, value in enumerate(values)]
+        with TRACER.span("engine.format", function=func_name):
+            formula = compiled.format_quoted(params, self.lang_manager, self.char_count_mode)
+        if self.target is None and not self.share_subexpressions:
+            return formula
+        with TRACER.span("engine.rewrite", function=func_name):
+            return self.finish(formula)
+
+    def finish(self, formula, let=None):
+        """生成后的处理：按目标版本改写，再按需提取 LET（let 为None时按 share_subexpressions）"""
+        if self.target is not None:
+            formula = optimize(formula, self.target).formula
+        if self.share_subexpressions if let is None else let:
+            formula = share_let(formula)
+        return formula
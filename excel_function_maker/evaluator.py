@@ -0,0 +1,911 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地公式求值（用CSV数据预览生成的公式结果）
+Local formula evaluation: preview generated formulas against CSV data
+
+范围运算（求和、计数、条件掩码、LEN/SUBSTITUTE）使用NumPy列数组向量化计算，
+不逐个单元格循环。需要安装numpy。
+Range operations (aggregates, criteria masks, LEN/SUBSTITUTE) run on NumPy
+column arrays instead of per-cell Python loops. Requires numpy.
+"""
+
+import csv
+import math
+import re
+
+try:
+    import numpy as np
+except ImportError:  # 只有求值功能需要numpy
+    np = None
+
+from excel_function_maker.formula import Reference, parse_formula
+from excel_function_maker.lookup import NOT_FOUND, LookupCache
+
+# 单元格文本长度上限（Excel为32767个字符）
+_MAX_TEXT = 32767
+
+
+class ExcelError(Exception):
+    """Excel错误值，如 #DIV/0!、#VALUE!"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+    def __eq__(self, other):
+        return isinstance(other, ExcelError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __str__(self):
+        return self.code
+
+
+def _require_numpy():
+    """检查numpy是否可用"""
+    if np is None:
+        raise RuntimeError("formula evaluation requires numpy (pip install numpy)")
+
+
+def _to_number(text):
+    """把单元格文本转为数字，非数字返回None"""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class Sheet:
+    """按列存储的工作表数据，列的数值/文本数组在首次使用时构建"""
+
+    def __init__(self, columns, row_count):
+        _require_numpy()
+        self._raw = columns
+        self.row_count = row_count
+        self._numbers = {}
+        self._texts = {}
+        self._lower = {}
+        self._versions = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """从行列表（每行是字符串列表）创建工作表"""
+        columns = []
+        row_count = 0
+        for row in rows:
+            for c, value in enumerate(row):
+                if c >= len(columns):
+                    columns.append([""] * row_count)
+                columns[c].append(value)
+            row_count += 1
+            # 补齐较短的行
+            for column in columns[len(row):]:
+                column.append("")
+        return cls(columns, row_count)
+
+    @classmethod
+    def from_csv(cls, path, encoding="utf-8"):
+        """从CSV文件加载工作表（第一行就是第1行，不当作表头）"""
+        with open(path, "r", encoding=encoding, newline="") as f:
+            return cls.from_rows(csv.reader(f))
+
+    @property
+    def column_count(self):
+        return len(self._raw)
+
+    def numbers(self, col):
+        """列的数值数组（非数字为NaN）"""
+        array = self._numbers.get(col)
+        if array is None:
+            raw = self._raw[col] if col < len(self._raw) else [""] * self.row_count
+            try:
+                array = np.asarray(raw, dtype=np.float64)
+            except ValueError:
+                array = np.array([_to_number(v) for v in raw], dtype=np.float64)
+            self._numbers[col] = array
+        return array
+
+    def texts(self, col):
+        """列的文本数组"""
+        array = self._texts.get(col)
+        if array is None:
+            raw = self._raw[col] if col < len(self._raw) else [""] * self.row_count
+            array = np.asarray(raw, dtype=str) if raw else np.zeros(0, dtype="<U1")
+            self._texts[col] = array
+        return array
+
+    def column_version(self, col):
+        """列的版本号，列数据每次修改后加一"""
+        return self._versions.get(col, 0)
+
+    def set_cell(self, row, col, value):
+        """修改单元格（行列号从0开始），并使该列的缓存数组失效"""
+        while col >= len(self._raw):
+            self._raw.append([""] * self.row_count)
+        if row >= self.row_count:
+            for column in self._raw:
+                column.extend([""] * (row + 1 - self.row_count))
+            self.row_count = row + 1
+            # 行数变化后所有列的数组都要重建
+            changed = range(len(self._raw))
+        else:
+            changed = (col,)
+        self._raw[col][row] = value if isinstance(value, str) else format_value(value)
+        for c in changed:
+            self._numbers.pop(c, None)
+            self._texts.pop(c, None)
+            self._lower.pop(c, None)
+            self._versions[c] = self._versions.get(c, 0) + 1
+
+    def lower_texts(self, col):
+        """列的小写文本数组（条件匹配不区分大小写）"""
+        array = self._lower.get(col)
+        if array is None:
+            array = self._lower[col] = np.char.lower(self.texts(col))
+        return array
+
+    def cell(self, row, col):
+        """单个单元格的值：数字、文本，空单元格为空字符串"""
+        if col >= len(self._raw) or row >= self.row_count:
+            return ""
+        text = self._raw[col][row]
+        number = _to_number(text) if text else None
+        return number if number is not None else text
+
+    def block(self, ref, kind):
+        """范围对应的二维数组（超出数据的行列被截掉）"""
+        row1 = min(ref.row1, self.row_count - 1)
+        col1 = min(ref.col1, max(self.column_count - 1, ref.col0))
+        getter = {"numbers": self.numbers, "texts": self.texts, "lower": self.lower_texts}[kind]
+        if row1 < ref.row0:
+            empty = np.zeros((0, col1 - ref.col0 + 1), dtype=np.float64 if kind == "numbers" else "<U1")
+            return empty
+        columns = [getter(c)[ref.row0:row1 + 1] for c in range(ref.col0, col1 + 1)]
+        if len(columns) == 1:
+            return columns[0][:, None]
+        return np.column_stack(columns)
+
+
+class RangeValue:
+    """范围引用的求值结果（按需取数值或文本数组）"""
+
+    __slots__ = ("sheet", "ref")
+
+    def __init__(self, sheet, ref):
+        self.sheet = sheet
+        self.ref = ref
+
+    def numbers(self):
+        return self.sheet.block(self.ref, "numbers")
+
+    def texts(self):
+        return self.sheet.block(self.ref, "texts")
+
+    def lower_texts(self):
+        return self.sheet.block(self.ref, "lower")
+
+    def offset_shape(self, ref):
+        """以本范围左上角为起点、与 ref 同样大小的范围（SUMIF的求和范围规则）"""
+        return RangeValue(self.sheet, Reference(self.ref.row0, self.ref.col0,
+                                                self.ref.row0 + ref.height - 1, self.ref.col0 + ref.width - 1))
+
+
+_CRITERIA_RE = re.compile(r"^(<>|<=|>=|=|<|>)?(.*)$", re.DOTALL)
+
+
+def criteria_mask(value_range, criteria):
+    """计算条件掩码（COUNTIF/SUMIF的条件规则，向量化）"""
+    if isinstance(criteria, bool):
+        criteria = "TRUE" if criteria else "FALSE"
+    if isinstance(criteria, float):
+        op, operand = "=", criteria
+    else:
+        match = _CRITERIA_RE.match(str(criteria))
+        op, operand = match.group(1) or "=", match.group(2)
+        number = _to_number(operand) if operand else None
+        if number is not None:
+            operand = number
+
+    if isinstance(operand, float):
+        numbers = value_range.numbers()
+        with np.errstate(invalid="ignore"):
+            if op == "=":
+                return numbers == operand
+            if op == "<>":
+                return ~(numbers == operand)
+            if op == "<":
+                return numbers < operand
+            if op == ">":
+                return numbers > operand
+            if op == "<=":
+                return numbers <= operand
+            return numbers >= operand
+
+    texts = value_range.lower_texts()
+    operand = operand.lower()
+    if op in ("=", "<>"):
+        if "*" in operand or "?" in operand:
+            pattern = re.compile("^" + re.escape(operand).replace(r"\*", ".*").replace(r"\?", ".") + "$", re.DOTALL)
+            mask = _wildcard_mask(texts, operand, pattern)
+        else:
+            mask = texts == operand
+        return mask if op == "=" else ~mask
+    # 文本大小比较只比较文本单元格
+    is_text = np.isnan(value_range.numbers()) & (texts != "")
+    if op == "<":
+        return is_text & (texts < operand)
+    if op == ">":
+        return is_text & (texts > operand)
+    if op == "<=":
+        return is_text & (texts <= operand)
+    return is_text & (texts >= operand)
+
+
+def _wildcard_mask(texts, operand, pattern):
+    """通配符条件：常见的 abc*、*abc、*abc* 形式用向量化字符串函数"""
+    inner = operand.strip("*")
+    if "?" not in operand and "*" not in inner:
+        if operand.startswith("*") and operand.endswith("*"):
+            return np.char.find(texts, inner) >= 0
+        if operand.endswith("*"):
+            return np.char.startswith(texts, inner)
+        if operand.startswith("*"):
+            return np.char.endswith(texts, inner)
+    return np.vectorize(lambda text: pattern.match(text) is not None, otypes=[bool])(texts)
+
+
+def _match_char_count(node):
+    """识别 LEN(x)-LEN(SUBSTITUTE(x,c,"")) 形式，返回 (x, c) 语法树节点"""
+    if node[1] != "-":
+        return None
+    left, right = node[2], node[3]
+    if left[0] != "call" or left[1] != "LEN" or len(left[2]) != 1:
+        return None
+    if right[0] != "call" or right[1] != "LEN" or len(right[2]) != 1:
+        return None
+    inner = right[2][0]
+    if inner[0] != "call" or inner[1] != "SUBSTITUTE" or len(inner[2]) != 3:
+        return None
+    text_node, old_node, new_node = inner[2]
+    if text_node != left[2][0] or new_node != ("str", ""):
+        return None
+    return text_node, old_node
+
+
+def _is_array(value):
+    """是否多单元格范围或数组（比较时逐个元素计算）"""
+    if isinstance(value, RangeValue):
+        return not value.ref.is_cell
+    return np is not None and isinstance(value, np.ndarray) and value.size > 1
+
+
+def _format_number(value):
+    """数字转文本（整数不带小数点，与Excel一致）"""
+    if math.isfinite(value) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Evaluator:
+    """在工作表数据上计算公式的值"""
+
+    def __init__(self, sheet):
+        _require_numpy()
+        self.sheet = sheet
+        self.lookups = LookupCache(sheet)
+        # LET定义的名称（嵌套时每层一个字典）
+        self._scopes = []
+        self._functions = {
+            "SUM": self._fn_sum,
+            "AVERAGE": self._fn_average,
+            "COUNT": self._fn_count,
+            "COUNTIF": self._fn_countif,
+            "SUMIF": self._fn_sumif,
+            "IF": self._fn_if,
+            "LEFT": self._fn_left,
+            "RIGHT": self._fn_right,
+            "MID": self._fn_mid,
+            "CONCATENATE": self._fn_concatenate,
+            "LEN": self._fn_len,
+            "SUBSTITUTE": self._fn_substitute,
+            "SUMPRODUCT": self._fn_sumproduct,
+            "VLOOKUP": self._fn_vlookup,
+            "HLOOKUP": self._fn_hlookup,
+            "LET": self._fn_let,
+            "SUMIFS": self._fn_sumifs,
+            "COUNTIFS": self._fn_countifs,
+            "XLOOKUP": self._fn_xlookup,
+            "INDEX": self._fn_index,
+            "MATCH": self._fn_match,
+            "CONCAT": self._fn_concat,
+            "TEXTJOIN": self._fn_textjoin,
+        }
+
+    def evaluate(self, formula):
+        """计算公式，Excel错误以 ExcelError 对象返回"""
+        try:
+            value = self.eval_node(parse_formula(formula))
+            if isinstance(value, RangeValue):
+                value = self._scalar(value)
+            if np is not None and isinstance(value, np.ndarray):
+                value = value.flat[0] if value.size else ""
+                value = float(value) if isinstance(value, (np.floating, np.integer)) else str(value)
+            return value
+        except ExcelError as e:
+            return e
+
+    # ---- 语法树求值 ----
+
+    def eval_node(self, node):
+        """计算语法树节点"""
+        kind = node[0]
+        if kind in ("num", "str", "bool"):
+            return node[1]
+        if kind == "ref":
+            if node[1] is None:
+                raise ExcelError("#REF!")
+            return RangeValue(self.sheet, node[1])
+        if kind == "call":
+            func = self._functions.get(node[1])
+            if func is None:
+                raise ExcelError("#NAME?")
+            return func(node[2])
+        if kind == "neg":
+            return self._arith("-", 0.0, self.eval_node(node[1]))
+        if kind == "binop":
+            op = node[1]
+            counted = _match_char_count(node)
+            if counted is not None:
+                return self._count_occurrences(*counted)
+            left, right = self.eval_node(node[2]), self.eval_node(node[3])
+            if op == "&":
+                return self._concat(left, right)
+            if op in ("=", "<>", "<", ">", "<=", ">="):
+                if _is_array(left) or _is_array(right):
+                    return self._compare_arrays(op, left, right)
+                return self._compare(op, self._scalar(left), self._scalar(right))
+            return self._arith(op, left, right)
+        if kind == "missing":
+            return ""
+        if kind == "name":
+            key = node[1].lower()
+            for scope in reversed(self._scopes):
+                if key in scope:
+                    return scope[key]
+        raise ExcelError("#NAME?")
+
+    def _count_occurrences(self, text_node, old_node):
+        """LEN(x)-LEN(SUBSTITUTE(x,c,"")) 的快速计算：直接统计子串出现次数"""
+        texts = self._text_array(self.eval_node(text_node))
+        old = self._to_text(self.eval_node(old_node))
+        if not isinstance(texts, np.ndarray):
+            return float(texts.count(old) * len(old)) if old else 0.0
+        if not old or texts.size == 0:
+            return np.zeros(texts.shape)
+        if len(old) == 1 and texts.dtype.kind == "U":
+            # 单个字符：把文本数组看作UCS-4码点矩阵，一次比较完成
+            width = texts.dtype.itemsize // 4
+            codes = np.ascontiguousarray(texts).view(np.uint32).reshape(texts.shape + (width,))
+            return (codes == ord(old)).sum(axis=-1).astype(np.float64)
+        return np.char.count(texts, old).astype(np.float64) * len(old)
+
+    def _scalar(self, value):
+        """范围和数组在标量上下文中取左上角的值"""
+        if isinstance(value, RangeValue):
+            return self.sheet.cell(value.ref.row0, value.ref.col0)
+        if isinstance(value, np.ndarray):
+            item = value.flat[0] if value.size else ""
+            if isinstance(item, np.bool_):
+                return bool(item)
+            return float(item) if isinstance(item, (np.floating, np.integer)) else str(item)
+        return value
+
+    def _to_num(self, value):
+        """标量转数字"""
+        value = self._scalar(value)
+        if isinstance(value, bool):
+            return 1.0 if value else 0.0
+        if isinstance(value, float):
+            return value
+        if value == "":
+            return 0.0
+        number = _to_number(value)
+        if number is None:
+            raise ExcelError("#VALUE!")
+        return number
+
+    def _to_text(self, value):
+        """标量转文本"""
+        value = self._scalar(value)
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if isinstance(value, float):
+            return _format_number(value)
+        return value
+
+    def _num_array(self, value):
+        """数组运算的数值操作数（空单元格按0计算）"""
+        if isinstance(value, RangeValue):
+            numbers = value.numbers()
+            texts = value.texts()
+            if np.isnan(numbers).any() and (np.isnan(numbers) & (texts != "")).any():
+                raise ExcelError("#VALUE!")
+            return np.nan_to_num(numbers, nan=0.0)
+        if isinstance(value, np.ndarray):
+            return value.astype(np.float64)
+        return self._to_num(value)
+
+    def _text_array(self, value):
+        """数组运算的文本操作数"""
+        if isinstance(value, RangeValue):
+            return value.texts()
+        if isinstance(value, np.ndarray):
+            return value.astype(str)
+        return self._to_text(value)
+
+    def _arith(self, op, left, right):
+        """四则运算和乘方，支持数组"""
+        a, b = self._num_array(left), self._num_array(right)
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        if op == "^":
+            return a ** b
+        if np.any(np.asarray(b) == 0):
+            raise ExcelError("#DIV/0!")
+        return a / b
+
+    def _concat(self, left, right):
+        """& 文本连接"""
+        a, b = self._text_array(left), self._text_array(right)
+        if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+            return np.char.add(a, b)
+        return a + b
+
+    def _compare(self, op, a, b):
+        """标量比较：数字 < 文本 < 逻辑值，文本不区分大小写"""
+        rank = lambda v: 2 if isinstance(v, bool) else (0 if isinstance(v, float) else 1)
+        if a == "" and isinstance(b, float):
+            a = 0.0
+        if b == "" and isinstance(a, float):
+            b = 0.0
+        ka, kb = (rank(a), a.lower() if isinstance(a, str) else a), (rank(b), b.lower() if isinstance(b, str) else b)
+        if op == "=":
+            return ka == kb
+        if op == "<>":
+            return ka != kb
+        if op == "<":
+            return ka < kb
+        if op == ">":
+            return ka > kb
+        if op == "<=":
+            return ka <= kb
+        return ka >= kb
+
+    def _comparable(self, value):
+        """数组比较的操作数：(类别, 数值, 小写文本)；类别 0数字 1文本 2逻辑值，空单元格为-1（按另一边的类别比较）"""
+        if isinstance(value, RangeValue):
+            numbers = value.numbers()
+            texts = value.lower_texts()
+            rank = np.where(np.isnan(numbers), np.where(texts == "", -1, 1), 0)
+            return rank, np.nan_to_num(numbers, nan=0.0), texts
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind == "b":
+                return np.full(value.shape, 2), value.astype(np.float64), np.full(value.shape, "")
+            if value.dtype.kind in "fiu":
+                return np.zeros(value.shape, dtype=int), value.astype(np.float64), np.full(value.shape, "")
+            texts = np.char.lower(value.astype(str))
+            return np.where(texts == "", -1, 1), np.zeros(value.shape), texts
+        value = self._scalar(value)
+        if isinstance(value, bool):
+            return np.array(2), np.array(float(value)), np.array("")
+        if isinstance(value, float):
+            return np.array(0), np.array(value), np.array("")
+        return np.array(-1 if value == "" else 1), np.array(0.0), np.array(value.lower())
+
+    def _compare_arrays(self, op, left, right):
+        """逐个元素比较（规则与 _compare 相同），返回逻辑值数组"""
+        rank_a, numbers_a, texts_a = self._comparable(left)
+        rank_b, numbers_b, texts_b = self._comparable(right)
+        if np.ndim(rank_a) and np.ndim(rank_b) and np.shape(rank_a) != np.shape(rank_b):
+            raise ExcelError("#VALUE!")
+        # 空单元格与数字比较时为0，与文本比较时为空文本；两边都为空时相等
+        rank_a, rank_b = (np.where(rank_a == -1, np.where(rank_b == -1, 1, rank_b), rank_a),
+                          np.where(rank_b == -1, np.where(rank_a == -1, 1, rank_a), rank_b))
+        by_number = rank_a != 1
+        same = rank_a == rank_b
+        equal = same & np.where(by_number, numbers_a == numbers_b, texts_a == texts_b)
+        less = np.where(same, np.where(by_number, numbers_a < numbers_b, texts_a < texts_b), rank_a < rank_b)
+        if op == "=":
+            return equal
+        if op == "<>":
+            return ~equal
+        if op == "<":
+            return less
+        if op == ">":
+            return ~less & ~equal
+        if op == "<=":
+            return less | equal
+        return ~less
+
+    def _ranges_and_scalars(self, args):
+        """聚合函数的参数：范围只取数字，标量参数转换为数字"""
+        arrays = []
+        for arg in args:
+            value = self.eval_node(arg)
+            if isinstance(value, RangeValue):
+                numbers = value.numbers()
+                arrays.append(numbers[~np.isnan(numbers)])
+            elif isinstance(value, np.ndarray):
+                arrays.append(value.astype(np.float64).ravel())
+            else:
+                arrays.append(np.array([self._to_num(value)]))
+        return np.concatenate(arrays) if arrays else np.zeros(0)
+
+    # ---- 函数实现 ----
+
+    def _fn_sum(self, args):
+        return float(self._ranges_and_scalars(args).sum())
+
+    def _fn_average(self, args):
+        values = self._ranges_and_scalars(args)
+        if not values.size:
+            raise ExcelError("#DIV/0!")
+        return float(values.mean())
+
+    def _fn_count(self, args):
+        count = 0
+        for arg in args:
+            value = self.eval_node(arg)
+            if isinstance(value, RangeValue):
+                count += int(np.count_nonzero(~np.isnan(value.numbers())))
+            elif isinstance(value, float) or (isinstance(value, str) and _to_number(value) is not None):
+                count += 1
+        return float(count)
+
+    def _range_arg(self, node):
+        """必须是范围的参数"""
+        value = self.eval_node(node)
+        if not isinstance(value, RangeValue):
+            raise ExcelError("#VALUE!")
+        return value
+
+    def _fn_countif(self, args):
+        if len(args) != 2:
+            raise ExcelError("#VALUE!")
+        value_range = self._range_arg(args[0])
+        criteria = self._scalar(self.eval_node(args[1]))
+        return float(np.count_nonzero(criteria_mask(value_range, criteria)))
+
+    def _fn_sumif(self, args):
+        if len(args) not in (2, 3):
+            raise ExcelError("#VALUE!")
+        value_range = self._range_arg(args[0])
+        criteria = self._scalar(self.eval_node(args[1]))
+        mask = criteria_mask(value_range, criteria)
+        if len(args) == 3 and args[2][0] != "missing":
+            sum_range = self._range_arg(args[2]).offset_shape(value_range.ref)
+            numbers = sum_range.numbers()
+        else:
+            numbers = value_range.numbers()
+        # 超出数据范围的部分按空单元格处理
+        rows = min(mask.shape[0], numbers.shape[0])
+        cols = min(mask.shape[1], numbers.shape[1])
+        selected = numbers[:rows, :cols][mask[:rows, :cols]]
+        return float(np.nansum(selected))
+
+    def _ifs(self, args, sum_range):
+        """SUMIFS/COUNTIFS：各条件范围大小必须相同；一个条件为多单元格范围时按每个条件单元格分别计算，结果为数组"""
+        if len(args) < 2 or len(args) % 2:
+            raise ExcelError("#VALUE!")
+        ranges = [self._range_arg(node) for node in args[0::2]]
+        shape = (ranges[0].ref.height, ranges[0].ref.width)
+        if any((value_range.ref.height, value_range.ref.width) != shape for value_range in ranges) or \
+                (sum_range is not None and (sum_range.ref.height, sum_range.ref.width) != shape):
+            raise ExcelError("#VALUE!")
+        criteria = [self.eval_node(node) for node in args[1::2]]
+        spread = [i for i, value in enumerate(criteria) if isinstance(value, RangeValue) and not value.ref.is_cell]
+        if len(spread) > 1:
+            raise ExcelError("#VALUE!")
+        numbers = sum_range.numbers() if sum_range is not None else None
+
+        def compute(values):
+            masks = [criteria_mask(value_range, value) for value_range, value in zip(ranges, values)]
+            rows = min(mask.shape[0] for mask in masks)
+            cols = min(mask.shape[1] for mask in masks)
+            if numbers is not None:
+                rows, cols = min(rows, numbers.shape[0]), min(cols, numbers.shape[1])
+            mask = masks[0][:rows, :cols]
+            for other in masks[1:]:
+                mask = mask & other[:rows, :cols]
+            if numbers is None:
+                return float(np.count_nonzero(mask))
+            return float(np.nansum(numbers[:rows, :cols][mask]))
+
+        scalars = [self._scalar(value) for value in criteria]
+        if not spread:
+            return compute(scalars)
+        index = spread[0]
+        ref = criteria[index].ref
+        result = np.zeros((ref.height, ref.width))
+        for r in range(ref.height):
+            for c in range(ref.width):
+                scalars[index] = self.sheet.cell(ref.row0 + r, ref.col0 + c)
+                result[r, c] = compute(scalars)
+        return result
+
+    def _fn_sumifs(self, args):
+        if len(args) < 3:
+            raise ExcelError("#VALUE!")
+        return self._ifs(args[1:], self._range_arg(args[0]))
+
+    def _fn_countifs(self, args):
+        return self._ifs(args, None)
+
+    def _line_arg(self, node):
+        """查找用的单行或单列范围，返回 (范围, 是否横向)"""
+        value_range = self._range_arg(node)
+        if value_range.ref.width == 1:
+            return value_range, False
+        if value_range.ref.height == 1:
+            return value_range, True
+        raise ExcelError("#N/A")
+
+    def _find(self, value, line, horizontal, approximate=False, wildcard=True):
+        """在单行或单列中查找，返回从0开始的位置，找不到时返回None"""
+        if not wildcard and isinstance(value, str) and any(ch in value for ch in "*?~"):
+            # 不按通配符匹配：逐个比较（不区分大小写）
+            texts = line.lower_texts().ravel()
+            positions = np.flatnonzero(texts == value.lower())
+            return int(positions[0]) if positions.size else None
+        position = self.lookups.index(line.ref, horizontal).find(value, approximate)
+        return None if position == NOT_FOUND else int(position)
+
+    def _fn_xlookup(self, args):
+        """XLOOKUP(值,查找范围,返回范围,[未找到],[匹配方式])：支持精确匹配（0）和通配符匹配（2）"""
+        if not 3 <= len(args) <= 6:
+            raise ExcelError("#VALUE!")
+        value = self._scalar(self.eval_node(args[0]))
+        line, horizontal = self._line_arg(args[1])
+        results = self._range_arg(args[2])
+        mode = 0.0
+        if len(args) > 4 and args[4][0] != "missing":
+            mode = self._to_num(self.eval_node(args[4]))
+        if mode not in (0.0, 2.0):
+            raise ExcelError("#VALUE!")
+        position = self._find(value, line, horizontal, wildcard=mode == 2.0)
+        if position is None:
+            if len(args) > 3 and args[3][0] != "missing":
+                return self._scalar(self.eval_node(args[3]))
+            raise ExcelError("#N/A")
+        if horizontal:
+            return self.sheet.cell(results.ref.row0, results.ref.col0 + position)
+        return self.sheet.cell(results.ref.row0 + position, results.ref.col0)
+
+    def _fn_match(self, args):
+        """MATCH(值,范围,[匹配类型])：支持精确匹配（0）和升序近似匹配（1，默认）"""
+        if len(args) not in (2, 3):
+            raise ExcelError("#VALUE!")
+        value = self._scalar(self.eval_node(args[0]))
+        line, horizontal = self._line_arg(args[1])
+        match_type = self._to_num(self.eval_node(args[2])) if len(args) == 3 and args[2][0] != "missing" else 1.0
+        if match_type not in (0.0, 1.0):
+            raise ExcelError("#N/A")
+        position = self._find(value, line, horizontal, approximate=match_type == 1.0)
+        if position is None:
+            raise ExcelError("#N/A")
+        return float(position + 1)
+
+    def _fn_index(self, args):
+        """INDEX(范围,行,[列])：单行或单列范围只给一个序号时按该方向取值"""
+        if len(args) not in (2, 3):
+            raise ExcelError("#VALUE!")
+        table = self._range_arg(args[0])
+        ref = table.ref
+        first = int(self._to_num(self.eval_node(args[1])))
+        second = int(self._to_num(self.eval_node(args[2]))) if len(args) == 3 and args[2][0] != "missing" else None
+        if second is None:
+            row, col = (1, first) if ref.height == 1 else (first, 1)
+        else:
+            row, col = first, second
+        if row < 0 or col < 0 or row > ref.height or col > ref.width:
+            raise ExcelError("#REF!")
+        if row == 0 or col == 0:
+            # 0 表示整行或整列
+            return RangeValue(self.sheet, Reference(ref.row0 + max(row - 1, 0), ref.col0 + max(col - 1, 0),
+                                                    ref.row1 if row == 0 else ref.row0 + row - 1,
+                                                    ref.col1 if col == 0 else ref.col0 + col - 1))
+        return self.sheet.cell(ref.row0 + row - 1, ref.col0 + col - 1)
+
+    def _join_texts(self, args):
+        """CONCAT/TEXTJOIN 的各段文本：范围按行展开（空单元格为空文本）"""
+        texts = []
+        for arg in args:
+            if arg[0] == "missing":
+                texts.append("")
+                continue
+            value = self.eval_node(arg)
+            if isinstance(value, RangeValue):
+                ref = value.ref
+                if ref.height * ref.width > _MAX_TEXT:
+                    raise ExcelError("#VALUE!")
+                texts.extend(self._to_text(self.sheet.cell(row, col))
+                             for row in range(ref.row0, ref.row1 + 1) for col in range(ref.col0, ref.col1 + 1))
+            elif isinstance(value, np.ndarray):
+                texts.extend(self._to_text(float(item) if isinstance(item, np.floating) else str(item))
+                             for item in value.ravel())
+            else:
+                texts.append(self._to_text(value))
+        return texts
+
+    def _fn_concat(self, args):
+        result = "".join(self._join_texts(args))
+        if len(result) > _MAX_TEXT:
+            raise ExcelError("#VALUE!")
+        return result
+
+    def _fn_textjoin(self, args):
+        """TEXTJOIN(分隔符,是否忽略空文本,文本...)"""
+        if len(args) < 3:
+            raise ExcelError("#VALUE!")
+        delimiter = self._to_text(self.eval_node(args[0]))
+        ignore_empty = self._scalar(self.eval_node(args[1]))
+        if isinstance(ignore_empty, str):
+            ignore_empty = ignore_empty.upper() == "TRUE"
+        texts = self._join_texts(args[2:])
+        if ignore_empty:
+            texts = [text for text in texts if text]
+        result = delimiter.join(texts)
+        if len(result) > _MAX_TEXT:
+            raise ExcelError("#VALUE!")
+        return result
+
+    def _fn_if(self, args):
+        if not 1 <= len(args) <= 3:
+            raise ExcelError("#VALUE!")
+        condition = self._scalar(self.eval_node(args[0]))
+        if isinstance(condition, str):
+            if condition.upper() not in ("TRUE", "FALSE"):
+                raise ExcelError("#VALUE!")
+            condition = condition.upper() == "TRUE"
+        branch = args[1] if condition else (args[2] if len(args) > 2 else ("bool", False))
+        if branch[0] == "missing":
+            return 0.0
+        return self._scalar(self.eval_node(branch))
+
+    def _fn_left(self, args):
+        if len(args) not in (1, 2):
+            raise ExcelError("#VALUE!")
+        text = self._to_text(self.eval_node(args[0]))
+        count = int(self._to_num(self.eval_node(args[1]))) if len(args) > 1 else 1
+        if count < 0:
+            raise ExcelError("#VALUE!")
+        return text[:count]
+
+    def _fn_right(self, args):
+        if len(args) not in (1, 2):
+            raise ExcelError("#VALUE!")
+        text = self._to_text(self.eval_node(args[0]))
+        count = int(self._to_num(self.eval_node(args[1]))) if len(args) > 1 else 1
+        if count < 0:
+            raise ExcelError("#VALUE!")
+        return text[-count:] if count else ""
+
+    def _fn_mid(self, args):
+        if len(args) != 3:
+            raise ExcelError("#VALUE!")
+        text = self._to_text(self.eval_node(args[0]))
+        start = int(self._to_num(self.eval_node(args[1])))
+        count = int(self._to_num(self.eval_node(args[2])))
+        if start < 1 or count < 0:
+            raise ExcelError("#VALUE!")
+        return text[start - 1:start - 1 + count]
+
+    def _fn_concatenate(self, args):
+        return "".join(self._to_text(self.eval_node(arg)) for arg in args)
+
+    def _fn_len(self, args):
+        if len(args) != 1:
+            raise ExcelError("#VALUE!")
+        inner = args[0]
+        if inner[0] == "call" and inner[1] == "SUBSTITUTE" and len(inner[2]) == 3 and inner[2][2] == ("str", ""):
+            # LEN(SUBSTITUTE(x,c,"")) = LEN(x) - 出现次数*LEN(c)，不生成替换后的字符串
+            text_node, old_node, _ = inner[2]
+            return self._fn_len([text_node]) - self._count_occurrences(text_node, old_node)
+        value = self._text_array(self.eval_node(args[0]))
+        if isinstance(value, np.ndarray):
+            return np.char.str_len(value).astype(np.float64)
+        return float(len(value))
+
+    def _fn_substitute(self, args):
+        if len(args) not in (3, 4):
+            raise ExcelError("#VALUE!")
+        value = self._text_array(self.eval_node(args[0]))
+        old = self._to_text(self.eval_node(args[1]))
+        new = self._to_text(self.eval_node(args[2]))
+        if not old:
+            return value
+        if isinstance(value, np.ndarray):
+            return np.char.replace(value, old, new)
+        return value.replace(old, new)
+
+    def _fn_sumproduct(self, args):
+        if not args:
+            raise ExcelError("#VALUE!")
+        arrays = []
+        for arg in args:
+            value = self.eval_node(arg)
+            if isinstance(value, RangeValue):
+                # 直接传入的范围中非数字按0计算
+                arrays.append(np.nan_to_num(value.numbers(), nan=0.0))
+            else:
+                arrays.append(self._num_array(value))
+        product = arrays[0]
+        for array in arrays[1:]:
+            if np.shape(array) != np.shape(product):
+                raise ExcelError("#VALUE!")
+            product = product * array
+        return float(np.sum(product))
+
+    def _fn_let(self, args):
+        """LET(名称1,值1,...,计算式)：每个值只计算一次"""
+        if len(args) < 3 or len(args) % 2 == 0:
+            raise ExcelError("#VALUE!")
+        scope = {}
+        self._scopes.append(scope)
+        try:
+            for name_node, value_node in zip(args[:-1:2], args[1:-1:2]):
+                if name_node[0] != "name":
+                    raise ExcelError("#VALUE!")
+                scope[name_node[1].lower()] = self.eval_node(value_node)
+            return self.eval_node(args[-1])
+        finally:
+            self._scopes.pop()
+
+    def _lookup(self, args, horizontal):
+        """VLOOKUP/HLOOKUP：使用缓存的查找索引"""
+        if len(args) not in (3, 4):
+            raise ExcelError("#VALUE!")
+        value = self._scalar(self.eval_node(args[0]))
+        table = self._range_arg(args[1])
+        offset = int(self._to_num(self.eval_node(args[2])))
+        if len(args) == 3:
+            approximate = True
+        elif args[3][0] == "missing":
+            approximate = False
+        else:
+            flag = self._scalar(self.eval_node(args[3]))
+            approximate = flag.upper() == "TRUE" if isinstance(flag, str) else bool(flag)
+        if offset < 1:
+            raise ExcelError("#VALUE!")
+        if offset > (table.ref.height if horizontal else table.ref.width):
+            raise ExcelError("#REF!")
+        result = self.lookups.lookup(value, table.ref, offset, approximate, horizontal)
+        if result is None:
+            raise ExcelError("#N/A")
+        return result
+
+    def _fn_vlookup(self, args):
+        return self._lookup(args, horizontal=False)
+
+    def _fn_hlookup(self, args):
+        return self._lookup(args, horizontal=True)
+
+
+def evaluate(formula, sheet):
+    """在工作表上计算单个公式"""
+    return Evaluator(sheet).evaluate(formula)
+
+
+def format_value(value):
+    """把求值结果格式化为显示文本"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        return _format_number(value)
+    return str(value)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式填充（向下/向右复制，相对引用随位置偏移）
+Fill engine: replicates a formula across rows or columns like Excel's fill handle
+
+公式只做一次词法分析，得到由固定文本和可偏移的行号/列号组成的模板；
+之后每个位置只需整数加法和一次 str.format，不会重新分析或拼接引用。
+相对引用随偏移移动，带 $ 的部分保持不变，移出工作表范围的引用变为 #REF!。
+The formula is tokenized once into a template of literal text and offsettable
+row/column slots; every further position costs integer additions and one
+str.format call. Relative parts shift, $-anchored parts stay fixed, and
+references shifted off the sheet become #REF! as in Excel.
+"""
+
+import functools
+import itertools
+import re
+
+from excel_function_maker.formula import MAX_COLUMNS, MAX_ROWS, column_index, column_letters, iter_tokens
+
+# 模板片段类别
+_TEXT = 0
+_ROW = 1
+_COLUMN = 2
+
+# 单个A1端点：可选的列（$A）和可选的行（$1）；R1C1 引用不匹配，填充时保持原样
+_ENDPOINT_RE = re.compile(r"(?:(\$?)([A-Za-z]{1,3}))?(?:(\$?)([0-9]+))?")
+
+
+@functools.lru_cache(maxsize=None)
+def _column_table():
+    """全部列字母，按从0开始的列号索引"""
+    return [column_letters(index) for index in range(MAX_COLUMNS)]
+
+
+class FillTemplate:
+    """公式的填充模板：只分析一次，可反复生成偏移后的公式"""
+
+    __slots__ = ("formula", "_parts")
+
+    def __init__(self, formula):
+        """公式无法分析时抛出 FormulaSyntaxError"""
+        self.formula = formula
+        # (类别, 值, 所属引用序号)；文本的值为字符串，行为从1开始的行号，列为从0开始的列号
+        # 不属于可偏移引用的片段序号为 -1
+        parts = []
+        body = formula
+        if formula.startswith("="):
+            parts.append((_TEXT, "=", -1))
+            body = formula[1:]
+        ref = 0
+        for kind, text in iter_tokens(body):
+            if kind != "ref":
+                parts.append((_TEXT, text, -1))
+                continue
+            sheet, bang, area = text.rpartition("!")
+            if bang:
+                parts.append((_TEXT, sheet + bang, -1))
+            ends = [_ENDPOINT_RE.fullmatch(end) for end in area.split(":")]
+            if not all(ends):
+                # R1C1 引用本身就是相对写法，填充时文本不变
+                parts.append((_TEXT, area, -1))
+                continue
+            for i, end in enumerate(ends):
+                if i:
+                    parts.append((_TEXT, ":", ref))
+                column_fixed, letters, row_fixed, digits = end.groups()
+                if letters:
+                    if column_fixed:
+                        parts.append((_TEXT, "$" + letters.upper(), ref))
+                    else:
+                        parts.append((_COLUMN, column_index(letters), ref))
+                if digits:
+                    if row_fixed:
+                        parts.append((_TEXT, "$" + digits, ref))
+                    else:
+                        parts.append((_ROW, int(digits), ref))
+            ref += 1
+        self._parts = parts
+
+    @property
+    def slot_count(self):
+        """可偏移的行号和列号个数"""
+        return sum(1 for kind, _, _ in self._parts if kind != _TEXT)
+
+    def at(self, rows=0, columns=0):
+        """偏移 rows 行、columns 列后的公式（逐个片段计算，用于越界等少数情况）"""
+        broken = set()
+        for kind, value, ref in self._parts:
+            if kind == _ROW and not 1 <= value + rows <= MAX_ROWS:
+                broken.add(ref)
+            elif kind == _COLUMN and not 0 <= value + columns < MAX_COLUMNS:
+                broken.add(ref)
+        letters = _column_table()
+        out = []
+        written = set()
+        for kind, value, ref in self._parts:
+            if ref in broken:
+                # 整个引用替换为一个 #REF!
+                if ref not in written:
+                    written.add(ref)
+                    out.append("#REF!")
+            elif kind == _TEXT:
+                out.append(value)
+            elif kind == _ROW:
+                out.append(str(value + rows))
+            else:
+                out.append(letters[value + columns])
+        return "".join(out)
+
+    def _format(self, shifted):
+        """编译为 str.format 格式串，返回 (格式串, 偏移片段的基准值列表)；不偏移的一类直接写成文本
+
+        基准值相同的片段共用一个位置参数（如 CHAR_COUNT 中重复出现的同一范围）。
+        """
+        letters = _column_table()
+        pieces = []
+        positions = {}
+        for kind, value, _ in self._parts:
+            if kind == shifted:
+                pieces.append(f"{{{positions.setdefault(value, len(positions))}}}")
+            elif kind == _TEXT:
+                pieces.append(value.replace("{", "{{").replace("}", "}}"))
+            elif kind == _ROW:
+                pieces.append(str(value))
+            else:
+                pieces.append(letters[value])
+        return "".join(pieces), list(positions)
+
+    def _fill(self, shifted, count, start):
+        fmt, bases = self._format(shifted)
+        stop = start + count
+        if not bases:
+            yield from itertools.repeat(fmt.format(), max(count, 0))
+            return
+        # 所有引用都在工作表范围内的偏移区间 [low, high)，区间内走 map(str.format) 快速路径
+        if shifted == _ROW:
+            low, high = 1 - min(bases), MAX_ROWS + 1 - max(bases)
+        else:
+            low, high = -min(bases), MAX_COLUMNS - max(bases)
+        fast_start = min(max(start, low), stop)
+        fast_stop = max(min(stop, high), fast_start)
+        rows = shifted == _ROW
+        for offset in range(start, fast_start):
+            yield self.at(offset, 0) if rows else self.at(0, offset)
+        if rows:
+            yield from map(fmt.format, *[range(base + fast_start, base + fast_stop) for base in bases])
+        else:
+            letters = _column_table()
+            yield from map(fmt.format, *[letters[base + fast_start:base + fast_stop] for base in bases])
+        for offset in range(fast_stop, stop):
+            yield self.at(offset, 0) if rows else self.at(0, offset)
+
+    def fill_down(self, count, start=0):
+        """逐个生成向下偏移 start .. start+count-1 行的公式（生成器，不在内存中保存结果）"""
+        return self._fill(_ROW, count, start)
+
+    def fill_right(self, count, start=0):
+        """逐个生成向右偏移 start .. start+count-1 列的公式（生成器）"""
+        return self._fill(_COLUMN, count, start)
+
+    def __repr__(self):
+        return f"FillTemplate({self.formula!r}, slots={self.slot_count})"
+
+
+def fill_down(formula, count, start=0):
+    """把公式向下填充 count 行（第一行即原公式所在行）"""
+    return FillTemplate(formula).fill_down(count, start)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式词法分析和语法分析
+Formula tokenizer and parser producing a small tuple-based syntax tree
+
+语法树节点 / Syntax tree nodes:
+    ("num", 1.5)  ("str", "abc")  ("bool", True)
+    ("ref", Reference)                       单元格或范围引用 / cell or range
+    ("name", "Sales")                        名称或结构化引用 / name or table reference
+    ("call", "SUM", [args])                  函数调用 / function call
+    ("binop", "+", left, right)              二元运算 / binary operator
+    ("neg", operand)                         取负 / unary minus
+"""
+
+import functools
+import re
+import sys
+
+# 最大行列数（Excel工作表上限）
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+# ---- 引用语法（不区分大小写）----
+# 列 A..XFD、行 1..1048576 的范围直接写在正则里，匹配成功即为有效引用，无需再逐段校验
+_COL = r"\$?(?:X(?:F[A-D]|[A-E][A-Z])|[A-W][A-Z]{2}|[A-Z]{1,2})"
+_ROW = r"\$?(?:104857[0-6]|10485[0-6][0-9]|1048[0-4][0-9]{2}|104[0-7][0-9]{3}|10[0-3][0-9]{4}|[1-9][0-9]{0,5})"
+_CELL = _COL + _ROW
+# A1、A1:B10、A:A、1:1（列字母只匹配一次，减少回溯）
+_AREA = rf"{_COL}(?:{_ROW}(?::{_CELL})?|:{_COL})|{_ROW}:{_ROW}"
+# 最常见的写法：1-2个列字母、不超过6位的行号，这部分一定在工作表范围内，可以用很短的正则直接确认
+_SHORT_CELL = r"\$?[A-Za-z]{1,2}\$?[1-9][0-9]{0,5}"
+# R1C1、R[-1]C[2]、RC
+_R1C1_CELL = r"R(?:\[-?[0-9]+\]|[0-9]+)?C(?:\[-?[0-9]+\]|[0-9]+)?"
+_R1C1 = rf"{_R1C1_CELL}(?::{_R1C1_CELL})?"
+# 名称：字母或下划线开头，可包含字母、数字、下划线和点（支持中文）
+_NAME = r"[^\W\d][\w.]*"
+# 工作表前缀：Sheet1!、'Sales 2024'!、[Book1.xlsx]Sheet1!
+_SHEET = rf"(?:\[[^\[\]]+\])?(?:'(?:[^']|'')+'|{_NAME})!"
+# 表格结构化引用：Table1[Col]、Table1[[#This Row],[Col]]、[@Col]
+_STRUCTURED = rf"(?:{_NAME})?\[(?:[^\[\]]|\[[^\[\]]*\])*\]"
+
+# 引用类别
+REFERENCE_A1 = "a1"
+REFERENCE_R1C1 = "r1c1"
+REFERENCE_STRUCTURED = "structured"
+REFERENCE_NAME = "name"
+
+# 常见单元格/范围的短正则（编译很快，直接在导入时编译）
+_SHORT_REFERENCE_RE = re.compile(rf"{_SHORT_CELL}(?::{_SHORT_CELL})?")
+
+
+# 较大的正则在第一次使用时才编译（编译需要几毫秒，不影响命令行启动）
+@functools.lru_cache(maxsize=None)
+def _value_reference_patterns():
+    """单个参数值的引用识别（整串匹配）：(无前缀引用, 工作表名, 名称, 含方括号)"""
+    return (re.compile(rf"(?P<a1>{_AREA})|(?P<r1c1>{_R1C1})", re.IGNORECASE),
+            re.compile(rf"'(?:[^']|'')+'|{_NAME}"),
+            re.compile(_NAME),
+            re.compile(rf"(?P<a1>{_SHEET}(?:{_AREA}))|(?P<r1c1>(?:{_SHEET})?{_R1C1})|(?P<structured>{_STRUCTURED})",
+                       re.IGNORECASE))
+
+
+@functools.lru_cache(maxsize=None)
+def _token_re():
+    """公式记号；引用后面不能紧跟名称字符、括号或感叹号（如 LOG10( 是函数，Q1!A1 是带工作表的引用）"""
+    return re.compile(rf"""
+        (?P<ws>\s+)
+      | (?P<str>"(?:[^"]|"")*")
+      | (?P<ref>(?:{_SHEET})?(?:{_AREA}|{_R1C1})(?![\w(\[.!]))
+      | (?P<num>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+      | (?P<func>{_NAME}(?=\())
+      | (?P<table>{_STRUCTURED}|{_SHEET}{_NAME})
+      | (?P<name>{_NAME})
+      | (?P<op><>|<=|>=|[-+*/^&=<>])
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<comma>,)
+    """, re.VERBOSE | re.IGNORECASE)
+
+
+# 二元运算符优先级（数值越大结合越紧）
+_PRECEDENCE = {
+    "=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1,
+    "&": 2,
+    "+": 3, "-": 3,
+    "*": 4, "/": 4,
+    "^": 5,
+}
+
+
+class FormulaSyntaxError(ValueError):
+    """公式语法错误"""
+
+
+class Expression(str):
+    """作为参数的公式表达式（不带等号，如嵌套的函数调用），原样插入、不加引号
+
+    普通字符串参数即使以等号开头也是文本值（如条件 "=apple"），只有这个类型的参数按公式处理。
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"Expression({str.__repr__(self)})"
+
+
+def column_index(letters):
+    """列字母转为从0开始的列号（A -> 0）"""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def column_letters(index):
+    """从0开始的列号转为列字母（0 -> A）"""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class Reference:
+    """单元格或范围引用（行列号从0开始，包含两端），sheet 为工作表名（未指定时为None）"""
+
+    __slots__ = ("row0", "col0", "row1", "col1", "sheet")
+
+    def __init__(self, row0, col0, row1, col1, sheet=None):
+        self.row0 = min(row0, row1)
+        self.col0 = min(col0, col1)
+        self.row1 = max(row0, row1)
+        self.col1 = max(col0, col1)
+        self.sheet = sheet
+
+    @property
+    def is_cell(self):
+        return self.row0 == self.row1 and self.col0 == self.col1
+
+    @property
+    def height(self):
+        return self.row1 - self.row0 + 1
+
+    @property
+    def width(self):
+        return self.col1 - self.col0 + 1
+
+    def __eq__(self, other):
+        return isinstance(other, Reference) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        return (self.row0, self.col0, self.row1, self.col1, self.sheet)
+
+    def __repr__(self):
+        start = f"{column_letters(self.col0)}{self.row0 + 1}"
+        prefix = f"{self.sheet}!" if self.sheet is not None else ""
+        if self.is_cell:
+            return f"Reference({prefix}{start})"
+        return f"Reference({prefix}{start}:{column_letters(self.col1)}{self.row1 + 1})"
+
+
+def reference_kind(text):
+    """判断整个文本是否为引用，返回引用类别（REFERENCE_*），不是引用时返回None"""
+    if _SHORT_REFERENCE_RE.fullmatch(text):
+        return REFERENCE_A1
+    plain, sheet_name, name, bracketed = _value_reference_patterns()
+    # 按特殊字符选择较小的模式，普通文本不必尝试工作表前缀和结构化引用
+    if "[" in text:
+        match = bracketed.fullmatch(text)
+        return match.lastgroup if match else None
+    if "!" in text:
+        # 工作表名和引用部分分开匹配（引用部分不含感叹号，按最后一个拆分）
+        sheet, _, text = text.rpartition("!")
+        if not sheet_name.fullmatch(sheet):
+            return None
+        if _SHORT_REFERENCE_RE.fullmatch(text):
+            return REFERENCE_A1
+        match = plain.fullmatch(text)
+        if match:
+            return match.lastgroup
+        return REFERENCE_NAME if name.fullmatch(text) else None
+    if text.isalpha():
+        # 只含字母的文本只可能是 RC（当前单元格）
+        return REFERENCE_R1C1 if text.upper() == "RC" else None
+    match = plain.fullmatch(text)
+    return match.lastgroup if match else None
+
+
+@functools.lru_cache(maxsize=None)
+def _endpoint_patterns():
+    """引用端点的正则：(单元格, 整列, 整行, 绝对R1C1)"""
+    return (re.compile(rf"^{_COL}{_ROW}$", re.IGNORECASE),
+            re.compile(rf"^{_COL}$", re.IGNORECASE),
+            re.compile(rf"^{_ROW}$"),
+            re.compile(r"^R([0-9]+)C([0-9]+)$", re.IGNORECASE))
+
+
+def _split_sheet(text):
+    """拆分工作表前缀，返回 (工作表名或None, 引用部分)"""
+    sheet, bang, area = text.rpartition("!")
+    if not bang:
+        return None, text
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, area
+
+
+def _parse_cell(part):
+    """解析单个端点，返回 (行, 列)，整列时行为None，整行时列为None"""
+    cell_re, column_re, row_re, r1c1_re = _endpoint_patterns()
+    if cell_re.match(part):
+        clean = part.replace("$", "")
+        letters = clean.rstrip("0123456789")
+        return int(clean[len(letters):]) - 1, column_index(letters)
+    if column_re.match(part):
+        return None, column_index(part.replace("$", ""))
+    if row_re.match(part):
+        return int(part.replace("$", "")) - 1, None
+    match = r1c1_re.match(part)
+    if match:
+        row, col = int(match.group(1)) - 1, int(match.group(2)) - 1
+        if 0 <= row < MAX_ROWS and 0 <= col < MAX_COLUMNS:
+            return row, col
+    raise ValueError(part)
+
+
+def parse_reference(text):
+    """解析 A1、A1:B10、A:A、1:1、R2C3、Sheet1!A1 等引用，无法解析（如相对R1C1）时返回None"""
+    sheet, area = _split_sheet(text)
+    parts = area.split(":")
+    if len(parts) > 2:
+        return None
+    try:
+        ends = [_parse_cell(part) for part in parts]
+    except ValueError:
+        return None
+    (row0, col0), (row1, col1) = ends[0], ends[-1]
+    if (row0 is None) != (row1 is None) or (col0 is None) != (col1 is None):
+        return None
+    if len(ends) == 1 and (row0 is None or col0 is None):
+        # 单独的列字母或行号不是引用
+        return None
+    if row0 is None:
+        # 整列引用
+        return Reference(0, col0, MAX_ROWS - 1, col1, sheet)
+    if col0 is None:
+        # 整行引用
+        return Reference(row0, 0, row1, MAX_COLUMNS - 1, sheet)
+    return Reference(row0, col0, row1, col1, sheet)
+
+
+def iter_tokens(text):
+    """逐个产生 (类型, 文本) 记号，包括空白（ws）；所有记号文本依次相接即为原文"""
+    pos = 0
+    token_re = _token_re()
+    while pos < len(text):
+        match = token_re.match(text, pos)
+        if match is None:
+            raise FormulaSyntaxError(f"unexpected character {text[pos]!r} at {pos + 1}")
+        yield match.lastgroup, match.group()
+        pos = match.end()
+
+
+def tokenize(formula):
+    """把公式拆分为 (类型, 文本) 记号列表，开头的等号会被忽略
+
+    记号文本经过 sys.intern，相同的引用、名称在各公式之间共用同一个字符串对象。
+    """
+    text = formula[1:] if formula.startswith("=") else formula
+    intern = sys.intern
+    return [(kind, intern(value)) for kind, value in iter_tokens(text) if kind != "ws"]
+
+
+class _Parser:
+    """按运算符优先级的递归下降语法分析器"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind):
+            raise FormulaSyntaxError(f"expected {kind or 'token'}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def expression(self, min_precedence=1):
+        left = self.unary()
+        while True:
+            kind, text = self.peek()
+            precedence = _PRECEDENCE.get(text) if kind == "op" else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.pos += 1
+            # ^ 为右结合，其余左结合
+            right = self.expression(precedence if text == "^" else precedence + 1)
+            left = ("binop", text, left, right)
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == "op" and text in "+-":
+            self.pos += 1
+            operand = self.unary()
+            return ("neg", operand) if text == "-" else operand
+        return self.primary()
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == "num":
+            return ("num", float(text))
+        if kind == "str":
+            return ("str", text[1:-1].replace('""', '"'))
+        if kind == "ref":
+            return ("ref", parse_reference(text))
+        if kind == "table":
+            # 结构化引用和带工作表的名称，本地无法求值
+            return ("name", text)
+        if kind == "name":
+            upper = text.upper()
+            if upper in ("TRUE", "FALSE"):
+                return ("bool", upper == "TRUE")
+            return ("name", text)
+        if kind == "func":
+            self.take("lparen")
+            args = []
+            if self.peek()[0] != "rparen":
+                while True:
+                    # 允许省略参数，如 =SUMIF(A1:A10,)
+                    if self.peek()[0] in ("comma", "rparen"):
+                        args.append(("missing",))
+                    else:
+                        args.append(self.expression())
+                    if self.peek()[0] != "comma":
+                        break
+                    self.pos += 1
+            self.take("rparen")
+            return ("call", text.upper(), args)
+        if kind == "lparen":
+            node = self.expression()
+            self.take("rparen")
+            return node
+        raise FormulaSyntaxError(f"unexpected {text!r}")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_formula(formula):
+    """把公式解析为语法树（结果缓存）"""
+    parser = _Parser(tokenize(formula))
+    node = parser.expression()
+    if parser.pos != len(parser.tokens):
+        raise FormulaSyntaxError(f"unexpected {parser.peek()[1]!r}")
+    return node
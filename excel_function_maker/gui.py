@@ -0,0 +1,1084 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel函数制作器图形界面 / Excel Function Maker GUI
+只有启动图形界面时才会导入本模块（以及tkinter），复制使用Tk自己的剪贴板
+Only imported when the GUI is launched, so tkinter stays out of the CLI;
+copying uses Tk's own clipboard
+"""
+
+import sqlite3
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+
+from excel_function_maker.clipboard import copy_rows, copy_text
+from excel_function_maker.compose import Composer, Formula
+from excel_function_maker.cost import COST_HIGH, COST_MEDIUM, analyze
+from excel_function_maker.engine import CHAR_COUNT_COMPAT, CHAR_COUNT_LET, FormulaEngine, is_cell_reference
+from excel_function_maker.formula import FormulaSyntaxError
+from excel_function_maker.history import HistoryStore
+from excel_function_maker.language import LanguageManager
+from excel_function_maker.optimize import EXCEL_VERSIONS, optimize
+from excel_function_maker.search import FunctionIndex, FunctionSearch
+from excel_function_maker.tracing import TRACER
+from excel_function_maker.worker import BackgroundRunner
+
+# 成功提示在状态行显示的时间（毫秒）
+STATUS_DELAY = 4000
+# 调试面板的刷新间隔（毫秒）
+DEBUG_REFRESH = 1000
+# 后台任务超过这个时间（毫秒）仍未完成时才显示忙碌状态，避免闪烁
+BUSY_DELAY = 200
+# 预览和生成共用的后台任务 key（新的任务取代旧的）
+RENDER_JOB = "render"
+
+
+class RenderedFormula:
+    """后台生成的结果：公式、改写前的公式（没有改写目标时为None）、开销估算（无法解析时为None）和输入"""
+
+    __slots__ = ("formula", "original", "cost", "inputs")
+
+    def __init__(self, formula, original, cost, inputs):
+        self.formula = formula
+        self.original = original
+        self.cost = cost
+        self.inputs = inputs
+
+
+class PreviewScheduler:
+    """实时预览调度器：合并连续按键，输入未变化时不重新生成；生成在后台线程中进行"""
+
+    def __init__(self, root, runner, get_inputs, render, on_result, on_error, delay=150):
+        self.root = root
+        self.runner = runner
+        self.get_inputs = get_inputs
+        self.render = render
+        self.on_result = on_result
+        self.on_error = on_error
+        self.delay = delay
+        self._after_id = None
+        self._last_inputs = None
+
+    def schedule(self):
+        """安排一次预览；在延迟时间内的新请求会合并为一次"""
+        self.cancel()
+        self._after_id = self.root.after(self.delay, self._run)
+
+    def cancel(self):
+        """取消尚未执行的预览"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def reset(self):
+        """忘记上次的输入并丢弃进行中的预览，下次预览一定重新生成"""
+        self.cancel()
+        self.runner.cancel(RENDER_JOB)
+        self._last_inputs = None
+
+    def _run(self):
+        """执行预览（仅当输入发生变化时）"""
+        self._after_id = None
+        inputs = self.get_inputs()
+        if inputs is None or inputs == self._last_inputs:
+            TRACER.count("gui.preview_unchanged")
+            return
+        self._last_inputs = inputs
+        # 继续输入时新的预览取代旧的，旧结果不再显示
+        self.runner.submit(RENDER_JOB, self._render, (inputs,), self.on_result, self._failed)
+
+    def _render(self, inputs):
+        """生成预览（在工作线程中执行）"""
+        with TRACER.span("gui.preview", function=inputs[0]):
+            return self.render(inputs)
+
+    def _failed(self, error):
+        TRACER.count("gui.preview_errors")
+        self.on_error(error)
+
+
+class ExcelFunctionMaker:
+    """Excel函数制作器主类"""
+    
+    def __init__(self):
+        self.lang_manager = LanguageManager()
+        self.engine = FormulaEngine(self.lang_manager)
+        self.root = tk.Tk()
+        # 加入列表、等待一次复制的公式
+        self.collected = []
+        self._status_after = None
+        # 历史记录库在第一次使用时打开；打开失败后不再重试
+        self._history = None
+        self._history_failed = False
+        self.history_window = None
+        # 隐藏的调试面板（Ctrl+Shift+D）
+        self.debug_window = None
+        self._debug_after = None
+        # 函数搜索索引在第一次输入搜索内容时建立
+        self._function_search = None
+        # 嵌套编辑：上层的 (函数名, 参数值, 参数节点, 正在编辑的参数序号)；当前层由嵌套编辑填入的参数节点
+        self.compose_stack = []
+        self.param_nodes = {}
+        self.composer = Composer(self.engine)
+        # 工作线程按任务携带的设置使用自己的引擎和 Composer：生成设置 -> (引擎, Composer)，不与界面线程共用
+        self._render_engines = {}
+        # 按版本优化改写前的公式（没有选择目标版本时为None）和生成它时的目标版本
+        self.original_formula = None
+        self.original_target = None
+        # 生成和预览在后台线程中进行，界面线程只读取输入和显示结果
+        self.runner = BackgroundRunner(self.root, self.on_busy_changed)
+        self._busy_after = None
+        self.preview = PreviewScheduler(self.root, self.runner, self.get_preview_inputs, self.render_inputs,
+                                        self.show_result, self.show_preview_error)
+        self.setup_window()
+        self.setup_ui()
+        
+    def setup_window(self):
+        """设置窗口"""
+        self.root.title(self.lang_manager.get_text("title"))
+        self.root.geometry("850x650")
+        self.root.resizable(True, True)
+        self.root.configure(bg='#f0f0f0')
+        # Ctrl+Shift+D 打开调试面板（不在界面上显示入口）
+        self.root.bind('<Control-D>', self.open_debug_panel)
+        
+    def setup_ui(self):
+        """设置用户界面（只构建一次，语言切换时原地更新文本）"""
+        # 创建主框架
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # 配置网格权重
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(1, weight=1)
+        main_frame.rowconfigure(4, weight=1)
+        
+        # 顶部框架（标题和语言切换）
+        top_frame = ttk.Frame(main_frame)
+        top_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 20))
+        top_frame.columnconfigure(0, weight=1)
+        
+        # 标题
+        self.title_label = ttk.Label(top_frame, font=("Microsoft YaHei", 16, "bold"))
+        self.title_label.grid(row=0, column=0, sticky=tk.W)
+        
+        # 语言切换按钮
+        language_frame = ttk.Frame(top_frame)
+        language_frame.grid(row=0, column=1, sticky=tk.E)
+        
+        self.language_label = ttk.Label(language_frame)
+        self.language_label.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.language_var = tk.StringVar()
+        self.language_combo = ttk.Combobox(language_frame, textvariable=self.language_var, 
+                                          state="readonly", width=10)
+        self.language_combo.pack(side=tk.LEFT)
+        self.language_combo.bind('<<ComboboxSelected>>', self.on_language_changed)
+        
+        # 函数选择区域
+        self.func_frame = ttk.LabelFrame(main_frame, padding="10")
+        self.func_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        self.func_frame.columnconfigure(1, weight=1)
+        
+        # 函数搜索框（按函数名、两种语言的名称和描述查找，下拉列表只显示匹配的函数）
+        self.function_search_label = ttk.Label(self.func_frame)
+        self.function_search_label.grid(row=0, column=0, sticky=tk.W, padx=(0, 10), pady=(0, 5))
+        self.function_search_entry = ttk.Entry(self.func_frame, width=30)
+        self.function_search_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=(0, 5))
+        self.function_search_entry.bind('<KeyRelease>', self.on_function_search)
+        self.function_search_entry.bind('<Return>', self.select_search_result)
+        
+        self.function_type_label = ttk.Label(self.func_frame)
+        self.function_type_label.grid(row=1, column=0, sticky=tk.W, padx=(0, 10))
+        self.function_var = tk.StringVar()
+        self.function_combo = ttk.Combobox(self.func_frame, textvariable=self.function_var, 
+                                          values=list(self.lang_manager.get_functions().keys()), 
+                                          state="readonly", width=30)
+        self.function_combo.grid(row=1, column=1, sticky=(tk.W, tk.E))
+        self.function_combo.bind('<<ComboboxSelected>>', self.on_function_selected)
+        
+        # 函数描述标签
+        self.description_label = ttk.Label(self.func_frame, foreground="blue", font=("Microsoft YaHei", 9))
+        self.description_label.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        # CHAR_COUNT生成模式（只在选择CHAR_COUNT时显示）
+        self.char_count_let_var = tk.BooleanVar(value=False)
+        self.char_count_let_check = ttk.Checkbutton(self.func_frame, variable=self.char_count_let_var,
+                                                    command=self.on_char_count_mode_changed)
+        self.char_count_let_check.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        self.char_count_let_check.grid_remove()
+        
+        # 生成选项：把重复的函数调用提取为LET绑定，按目标Excel版本改写为更快的写法
+        options_frame = ttk.Frame(self.func_frame)
+        options_frame.grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        self.share_let_var = tk.BooleanVar(value=False)
+        self.share_let_check = ttk.Checkbutton(options_frame, variable=self.share_let_var,
+                                               command=self.on_share_let_changed)
+        self.share_let_check.pack(side=tk.LEFT, padx=(0, 20))
+        self.target_label = ttk.Label(options_frame)
+        self.target_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.target_combo = ttk.Combobox(options_frame, state="readonly", width=12)
+        self.target_combo.pack(side=tk.LEFT)
+        self.target_combo.bind('<<ComboboxSelected>>', self.on_target_changed)
+        
+        # 嵌套编辑提示行（正在编辑哪个公式的哪个参数，只在嵌套编辑时显示）
+        self.nest_frame = ttk.Frame(self.func_frame)
+        self.nest_frame.grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        self.nest_label = ttk.Label(self.nest_frame, foreground="blue", font=("Microsoft YaHei", 9))
+        self.nest_label.pack(side=tk.LEFT, padx=(0, 10))
+        self.nest_done_btn = ttk.Button(self.nest_frame, command=self.finish_nested)
+        self.nest_done_btn.pack(side=tk.LEFT, padx=(0, 5))
+        self.nest_cancel_btn = ttk.Button(self.nest_frame, command=self.cancel_nested)
+        self.nest_cancel_btn.pack(side=tk.LEFT)
+        self.nest_frame.grid_remove()
+        
+        # 参数输入区域
+        self.param_frame = ttk.LabelFrame(main_frame, padding="10")
+        self.param_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        self.param_frame.columnconfigure(1, weight=1)
+        
+        # 参数行控件池（标签、输入框、说明、嵌套按钮），切换函数时复用而不是重建
+        self.param_rows = []
+        # 当前显示的参数输入控件列表
+        self.param_entries = []
+        self.param_labels = []
+        self.param_desc_labels = []
+        
+        # 结果显示区域
+        self.result_frame = ttk.LabelFrame(main_frame, padding="10")
+        self.result_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        self.result_frame.columnconfigure(0, weight=1)
+        self.result_frame.rowconfigure(1, weight=1)
+        
+        # 示例标签
+        self.example_label = ttk.Label(self.result_frame, font=("Microsoft YaHei", 9), foreground="gray")
+        self.example_label.grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        
+        # 结果文本框
+        self.result_text = scrolledtext.ScrolledText(self.result_frame, height=8, width=70,
+                                                    font=("Consolas", 11))
+        self.result_text.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # 预览状态行（显示错误，不弹出对话框）
+        self.status_label = ttk.Label(self.result_frame, text="", foreground="red", 
+                                     font=("Microsoft YaHei", 9))
+        self.status_label.grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        
+        # 开销估算行
+        self.cost_label = ttk.Label(self.result_frame, text="", foreground="gray",
+                                   font=("Microsoft YaHei", 9))
+        self.cost_label.grid(row=3, column=0, sticky=tk.W)
+        
+        # 改写说明行（原公式和每处改写的开销变化，只在按版本优化改写了公式时显示）
+        self.rewrite_label = ttk.Label(self.result_frame, text="", foreground="green",
+                                      font=("Microsoft YaHei", 9), justify=tk.LEFT)
+        self.rewrite_label.grid(row=4, column=0, sticky=tk.W)
+        self.rewrite_label.grid_remove()
+        
+        # 按钮框架
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=4, column=0, columnspan=2, pady=(10, 0))
+        
+        # 生成按钮
+        self.generate_btn = ttk.Button(button_frame, command=self.generate_function, state="disabled")
+        self.generate_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # 复制按钮
+        self.copy_btn = ttk.Button(button_frame, command=self.copy_to_clipboard, state="disabled")
+        self.copy_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # 加入列表和复制列表按钮（多个公式一次复制）
+        self.collect_btn = ttk.Button(button_frame, command=self.add_to_list, state="disabled")
+        self.collect_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.copy_list_btn = ttk.Button(button_frame, command=self.copy_list, state="disabled")
+        self.copy_list_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # 导出按钮
+        self.export_btn = ttk.Button(button_frame, command=self.export_xlsx, state="disabled")
+        self.export_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # 历史记录按钮
+        self.history_btn = ttk.Button(button_frame, command=self.open_history)
+        self.history_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # 清空按钮
+        self.clear_btn = ttk.Button(button_frame, command=self.clear_all)
+        self.clear_btn.pack(side=tk.LEFT)
+        
+        # 忙碌状态（后台生成较久时显示）
+        self.busy_frame = ttk.Frame(button_frame)
+        self.busy_label = ttk.Label(self.busy_frame, foreground="gray", font=("Microsoft YaHei", 9))
+        self.busy_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.busy_bar = ttk.Progressbar(self.busy_frame, mode="indeterminate", length=80)
+        self.busy_bar.pack(side=tk.LEFT)
+        
+        self.refresh_texts()
+        
+        # 设置默认选择
+        functions = self.lang_manager.get_functions()
+        if functions:
+            self.function_combo.set(list(functions.keys())[0])
+            self.on_function_selected(None)
+    
+    def refresh_texts(self):
+        """按当前语言原地更新所有界面文本"""
+        get_text = self.lang_manager.get_text
+        self.root.title(get_text("title"))
+        self.title_label.config(text=get_text("title"))
+        self.language_label.config(text=get_text("language") + ":")
+        self.language_combo.config(values=[get_text("chinese"), get_text("english")])
+        
+        # 设置当前语言显示
+        if self.lang_manager.current_language == "zh":
+            self.language_combo.set(get_text("chinese"))
+        else:
+            self.language_combo.set(get_text("english"))
+        
+        self.func_frame.config(text=get_text("select_function"))
+        self.function_search_label.config(text=get_text("function_search"))
+        self.function_type_label.config(text=get_text("function_type"))
+        self.char_count_let_check.config(text=get_text("char_count_let"))
+        self.share_let_check.config(text=get_text("share_let"))
+        self.target_label.config(text=get_text("optimize_target"))
+        self.target_combo.config(values=[get_text("optimize_off")] + [f"Excel {version}" for version in EXCEL_VERSIONS])
+        target = self.engine.target
+        self.target_combo.current(EXCEL_VERSIONS.index(target) + 1 if target is not None else 0)
+        self.nest_cancel_btn.config(text=get_text("nest_cancel"))
+        self.update_nest_texts()
+        self.param_frame.config(text=get_text("parameter_settings"))
+        self.result_frame.config(text=get_text("generated_function"))
+        self.generate_btn.config(text=get_text("generate_function"))
+        self.copy_btn.config(text=get_text("copy_to_clipboard"))
+        self.collect_btn.config(text=get_text("add_to_list"))
+        self.copy_list_btn.config(text=get_text("copy_list").format(len(self.collected)))
+        self.export_btn.config(text=get_text("export_xlsx"))
+        self.clear_btn.config(text=get_text("clear"))
+        self.history_btn.config(text=get_text("history"))
+        self.busy_label.config(text=get_text("busy"))
+        if self.history_window is not None:
+            self.refresh_history_texts()
+        if self.debug_window is not None:
+            self.refresh_debug_texts()
+        self.update_function_texts()
+        if self.original_formula is not None:
+            self.show_rewrites()
+    
+    def update_function_texts(self):
+        """更新当前函数的描述、示例和参数说明"""
+        functions = self.lang_manager.get_functions()
+        func_info = functions.get(self.function_var.get())
+        if func_info is None:
+            self.description_label.config(text=self.lang_manager.get_text("please_select"))
+            self.example_label.config(text=self.lang_manager.get_text("example"))
+            return
+        
+        # 更新描述
+        self.description_label.config(text=f"{func_info['name']}: {func_info['description']}")
+        
+        # 更新示例
+        self.example_label.config(text=f"{self.lang_manager.get_text('example')}{func_info['example']}")
+        
+        # 更新参数标签和说明（可重复参数追加的行没有单独的说明文本）
+        params = func_info['params']
+        for i in range(len(self.param_entries)):
+            label, entry, desc_label, nest_btn = self.param_rows[i]
+            label.config(text=f"{self.lang_manager.get_text('parameter')}{i+1}:")
+            desc_label.config(text=params[i] if i < len(params) else self.lang_manager.get_text("more_chars").format(i))
+    
+    def _ensure_param_rows(self, count):
+        """确保控件池中至少有 count 行参数控件"""
+        while len(self.param_rows) < count:
+            i = len(self.param_rows)
+            label = ttk.Label(self.param_frame)
+            label.grid(row=i, column=0, sticky=tk.W, pady=2, padx=(0, 10))
+            
+            entry = ttk.Entry(self.param_frame, width=50)
+            entry.grid(row=i, column=1, sticky=(tk.W, tk.E), pady=2)
+            entry.bind('<KeyRelease>', self.on_param_change)
+            
+            # 嵌套按钮：用另一个函数生成这个参数
+            nest_btn = ttk.Button(self.param_frame, text="ƒx", width=3, command=lambda i=i: self.edit_nested(i))
+            nest_btn.grid(row=i, column=2, padx=(5, 0), pady=2)
+            
+            # 添加参数说明
+            desc_label = ttk.Label(self.param_frame, font=("Microsoft YaHei", 8), foreground="gray")
+            desc_label.grid(row=i, column=3, sticky=tk.W, padx=(10, 0), pady=2)
+            self.param_rows.append((label, entry, desc_label, nest_btn))
+    
+    def on_language_changed(self, event):
+        """语言切换回调（原地更新文本，保留已输入的参数）"""
+        self.lang_manager.switch_language()
+        self.refresh_texts()
+        
+        # 结果中可能包含语言相关的提示文本，重新生成预览
+        if self.result_text.get('1.0', 'end-1c'):
+            self.preview.reset()
+            self.preview.schedule()
+    
+    def on_function_search(self, event):
+        """搜索框内容改变时，下拉列表只保留匹配的函数（按匹配程度排序）"""
+        if self._function_search is None:
+            self._function_search = FunctionSearch(FunctionIndex(self.lang_manager))
+        matches = self._function_search.update(self.function_search_entry.get())
+        # 没有匹配时保留全部函数，避免下拉列表为空
+        self.function_combo.config(values=matches or list(self.lang_manager.get_functions().keys()))
+    
+    def select_search_result(self, event):
+        """回车选择最匹配的函数"""
+        if self._function_search is None or not self._function_search.text:
+            return
+        matches = self._function_search.results(1)
+        if matches and matches[0] != self.function_var.get():
+            self.function_combo.set(matches[0])
+            self.on_function_selected(None)
+    
+    def on_function_selected(self, event):
+        """当函数被选择时的回调"""
+        selected_func = self.function_var.get()
+        functions = self.lang_manager.get_functions()
+        
+        if selected_func in functions:
+            count = len(functions[selected_func]['params'])
+            self._ensure_param_rows(count)
+            
+            # 显示需要的参数行并清空内容，隐藏多余的行
+            for i, row in enumerate(self.param_rows):
+                if i < count:
+                    row[1].delete(0, tk.END)
+                    for widget in row:
+                        widget.grid()
+                else:
+                    for widget in row:
+                        widget.grid_remove()
+            
+            self.param_nodes = {}
+            visible = self.param_rows[:count]
+            self.param_labels = [row[0] for row in visible]
+            self.param_entries = [row[1] for row in visible]
+            self.param_desc_labels = [row[2] for row in visible]
+            self.update_function_texts()
+            
+            if functions[selected_func].get('layout') == 'char_count':
+                self.char_count_let_check.grid()
+            else:
+                self.char_count_let_check.grid_remove()
+            
+            # 启用生成按钮
+            self.generate_btn.config(state="normal")
+            
+            # 清空结果
+            self.preview.reset()
+            self.result_text.delete('1.0', tk.END)
+            self.status_label.config(text="")
+            self.cost_label.config(text="")
+            self.original_formula = None
+            self.rewrite_label.grid_remove()
+            self.copy_btn.config(state="disabled")
+            self.collect_btn.config(state="disabled")
+            self.export_btn.config(state="disabled")
+    
+    def on_param_change(self, event):
+        """参数输入改变时安排预览（连续按键合并为一次生成）"""
+        self._extend_repeat_param()
+        self.preview.schedule()
+    
+    def _extend_repeat_param(self):
+        """可重复的最后一个参数填写后，追加一个空输入行（如CHAR_COUNT的字符数量不限）"""
+        func_info = self.lang_manager.get_functions().get(self.function_var.get())
+        if func_info is None or not self.param_entries or not func_info['args'][-1].get('repeat'):
+            return
+        if not self.param_entries[-1].get().strip():
+            return
+        count = len(self.param_entries) + 1
+        self._ensure_param_rows(count)
+        row = self.param_rows[count - 1]
+        label, entry, desc_label = row[:3]
+        entry.delete(0, tk.END)
+        for widget in row:
+            widget.grid()
+        self.param_labels.append(label)
+        self.param_entries.append(entry)
+        self.param_desc_labels.append(desc_label)
+        self.update_function_texts()
+    
+    def on_char_count_mode_changed(self):
+        """切换CHAR_COUNT生成模式并刷新预览"""
+        self.engine.char_count_mode = CHAR_COUNT_LET if self.char_count_let_var.get() else CHAR_COUNT_COMPAT
+        self.preview.reset()
+        self.preview.schedule()
+    
+    def on_share_let_changed(self):
+        """切换是否把重复的函数调用提取为LET并刷新预览"""
+        self.engine.share_subexpressions = self.composer.let = self.share_let_var.get()
+        self.preview.reset()
+        self.preview.schedule()
+    
+    def on_target_changed(self, event=None):
+        """切换改写的目标Excel版本并刷新预览"""
+        index = self.target_combo.current()
+        self.engine.target = EXCEL_VERSIONS[index - 1] if index > 0 else None
+        self.preview.reset()
+        self.preview.schedule()
+    
+    def current_node(self):
+        """当前函数和参数组成的公式节点；嵌套编辑得到的参数（内容未被手动修改时）保留为子节点"""
+        inputs = self.get_current_inputs()
+        if inputs is None:
+            return None
+        selected_func, values = inputs
+        params = []
+        for i, value in enumerate(values):
+            node = self.param_nodes.get(i)
+            if node is not None and value == "=" + self.composer.expression(node):
+                params.append(node)
+            else:
+                params.append(value)
+        return Formula(selected_func, params)
+    
+    def edit_nested(self, index):
+        """用另一个函数生成第 index 个参数：保存当前公式，切换到子公式的编辑"""
+        node = self.current_node()
+        if node is None or index >= len(node.params):
+            return
+        inputs = self.get_current_inputs()
+        self.compose_stack.append((inputs[0], inputs[1], self.param_nodes, index))
+        child = node.params[index]
+        if isinstance(child, Formula) and child.function is not None:
+            # 再次编辑已经嵌套的参数：恢复子公式的函数和参数
+            self.restore_inputs(child.function, [param if not isinstance(param, Formula)
+                                                 else "=" + self.composer.expression(param)
+                                                 for param in child.params])
+            self.param_nodes = {i: param for i, param in enumerate(child.params) if isinstance(param, Formula)}
+        else:
+            self.restore_inputs(inputs[0], ())
+        self.nest_frame.grid()
+        self.update_nest_texts()
+    
+    def finish_nested(self):
+        """把正在编辑的子公式填入上层公式的参数"""
+        node = self.current_node()
+        if not self.compose_stack or node is None:
+            return
+        try:
+            expression = self.composer.expression(node)
+        except Exception as e:
+            self.show_preview_error(e)
+            return
+        index = self._leave_nested()
+        self.param_nodes[index] = node
+        entry = self.param_entries[index]
+        entry.delete(0, tk.END)
+        entry.insert(0, "=" + expression)
+        self.preview.schedule()
+    
+    def cancel_nested(self):
+        """放弃子公式，回到上层公式"""
+        if self.compose_stack:
+            self._leave_nested()
+            self.preview.schedule()
+    
+    def _leave_nested(self):
+        """恢复上层公式的函数和参数，返回正在编辑的参数序号"""
+        selected_func, values, nodes, index = self.compose_stack.pop()
+        self.restore_inputs(selected_func, values)
+        self.param_nodes = nodes
+        if not self.compose_stack:
+            self.nest_frame.grid_remove()
+        self.update_nest_texts()
+        return index
+    
+    def update_nest_texts(self):
+        """嵌套编辑提示：从最外层到当前参数的路径"""
+        if not self.compose_stack:
+            return
+        get_text = self.lang_manager.get_text
+        path = " › ".join(f"{selected_func}[{index + 1}]" for selected_func, _, _, index in self.compose_stack)
+        self.nest_label.config(text=get_text("nest_path").format(path))
+        self.nest_done_btn.config(text=get_text("nest_done").format(self.compose_stack[-1][0]))
+    
+    def restore_inputs(self, selected_func, values):
+        """选择函数并填入参数（可重复参数按需追加输入行）"""
+        self.function_combo.set(selected_func)
+        self.on_function_selected(None)
+        for i, value in enumerate(values):
+            if i >= len(self.param_entries):
+                # 可重复参数：上一行填写后才会追加新行
+                self._extend_repeat_param()
+                if i >= len(self.param_entries):
+                    break
+            self.param_entries[i].insert(0, value)
+    
+    def get_current_inputs(self):
+        """获取当前函数名和参数值"""
+        selected_func = self.function_var.get()
+        if selected_func not in self.lang_manager.get_functions():
+            return None
+        return (selected_func, tuple(entry.get() for entry in self.param_entries))
+    
+    def get_render_settings(self):
+        """生成设置的快照：(CHAR_COUNT模式, 是否提取LET, 目标版本)"""
+        engine = self.engine
+        return engine.char_count_mode, engine.share_subexpressions, engine.target
+    
+    def get_preview_inputs(self):
+        """生成用的输入：函数名、参数值、嵌套编辑得到的公式节点（没有时为None）和生成设置，在界面线程中读取"""
+        inputs = self.get_current_inputs()
+        if inputs is None:
+            return None
+        return inputs + (self.current_node() if self.param_nodes else None, self.get_render_settings())
+    
+    def render_tools(self, settings):
+        """一组生成设置对应的引擎和 Composer（只在工作线程中使用，界面线程修改设置不影响进行中的任务）"""
+        tools = self._render_engines.get(settings)
+        if tools is None:
+            char_count_mode, share_let, target = settings
+            engine = FormulaEngine(self.lang_manager, char_count_mode, share_subexpressions=share_let, target=target)
+            tools = self._render_engines[settings] = (engine, Composer(engine))
+        return tools
+    
+    def render_inputs(self, inputs):
+        """根据输入生成公式和开销估算（在工作线程中执行，不访问控件和界面线程的引擎），返回 RenderedFormula"""
+        selected_func, values, node, settings = inputs
+        engine, composer = self.render_tools(settings)
+        # 改写前的公式，用于显示改写说明
+        original = None
+        if node is None:
+            if engine.target is not None:
+                original = engine.format(selected_func, values)
+            formula = engine.generate(selected_func, values)
+        else:
+            # 有嵌套编辑的参数：按节点生成，未修改的子公式使用缓存
+            if engine.target is not None:
+                original = "=" + composer.expression(node)
+            formula = composer.render(node)
+        try:
+            cost = analyze(formula)
+        except (FormulaSyntaxError, RecursionError):
+            # 嵌套过深（远超Excel公式长度限制的CHAR_COUNT等）时不显示开销估算
+            cost = None
+        return RenderedFormula(formula, original, cost, inputs)
+    
+    def show_result(self, rendered):
+        """显示后台生成的结果（内容未变化时不重写文本框）"""
+        function_result = rendered.formula
+        self.original_formula = rendered.original
+        self.original_target = rendered.inputs[3][2]
+        with TRACER.span("gui.widget_update", chars=len(function_result)) as span:
+            if self.result_text.get('1.0', 'end-1c') != function_result:
+                self.result_text.delete('1.0', tk.END)
+                self.result_text.insert('1.0', function_result)
+            else:
+                span.set(unchanged=True)
+        self.show_cost(rendered.cost)
+        self.show_rewrites()
+        self.status_label.config(text="")
+        
+        # 启用复制和导出按钮
+        self.copy_btn.config(state="normal")
+        self.collect_btn.config(state="normal")
+        self.export_btn.config(state="normal")
+    
+    def show_cost(self, cost):
+        """在预览下方显示公式的开销估算（None 时清空）"""
+        if cost is None:
+            self.cost_label.config(text="")
+            return
+        get_text = self.lang_manager.get_text
+        text = get_text("cost_summary").format(level=get_text(f"cost_level_{cost.level}"),
+                                               cells=f"{cost.cells:,}", scans=cost.scans)
+        if cost.open_refs:
+            text += get_text("cost_open_refs").format(cost.open_refs)
+        for code, detail in cost.flags:
+            text += "; " + get_text(f"cost_{code}").format(detail)
+        color = {COST_HIGH: "red", COST_MEDIUM: "#b36b00"}.get(cost.level, "gray")
+        self.cost_label.config(text=text, foreground=color)
+    
+    def show_rewrites(self):
+        """显示按版本优化前的原公式和每处改写前后的开销，没有改写时隐藏"""
+        if self.original_formula is None or self.original_target is None:
+            self.rewrite_label.grid_remove()
+            return
+        optimization = optimize(self.original_formula, self.original_target)
+        if not optimization.rewrites:
+            self.rewrite_label.grid_remove()
+            return
+        get_text = self.lang_manager.get_text
+        lines = [get_text("optimize_original").format(optimization.original)]
+        for rewrite in optimization.rewrites:
+            before, after = rewrite.costs()
+            lines.append(get_text("optimize_rewrite").format(
+                source=rewrite.source, target=rewrite.target, since=rewrite.since,
+                cells_before=f"{before.cells:,}", cells_after=f"{after.cells:,}",
+                scans_before=before.scans, scans_after=after.scans))
+        self.rewrite_label.config(text="\n".join(lines))
+        self.rewrite_label.grid()
+    
+    def show_preview_error(self, error):
+        """在状态行显示预览错误"""
+        self.status_label.config(text=f"{self.lang_manager.get_text('generate_error')}{error}", foreground="red")
+    
+    def generate_function(self):
+        """生成Excel函数（在后台生成，完成后显示并记录到历史）"""
+        inputs = self.get_preview_inputs()
+        if inputs is None:
+            return
+        # 取代尚未执行的预览
+        self.preview.cancel()
+        self.runner.submit(RENDER_JOB, self._generate, (inputs,), self._show_generated, self._generate_failed)
+    
+    def _generate(self, inputs):
+        """生成函数（在工作线程中执行）"""
+        with TRACER.span("gui.generate", function=inputs[0]):
+            return self.render_inputs(inputs)
+    
+    def _show_generated(self, rendered):
+        """显示生成的函数并记录生成时的输入"""
+        self.show_result(rendered)
+        self.record_history(rendered.formula, rendered.inputs[:2])
+    
+    def _generate_failed(self, error):
+        """生成失败时弹出错误"""
+        TRACER.count("gui.generate_errors")
+        messagebox.showerror(self.lang_manager.get_text("error"), 
+                           f"{self.lang_manager.get_text('generate_error')}{str(error)}")
+    
+    def on_busy_changed(self, busy):
+        """后台任务开始或全部完成；超过 BUSY_DELAY 毫秒仍未完成时才显示忙碌状态"""
+        if self._busy_after is not None:
+            self.root.after_cancel(self._busy_after)
+            self._busy_after = None
+        if busy:
+            self._busy_after = self.root.after(BUSY_DELAY, self._show_busy)
+        else:
+            self.busy_bar.stop()
+            self.busy_frame.pack_forget()
+    
+    def _show_busy(self):
+        """显示忙碌状态"""
+        self._busy_after = None
+        self.busy_frame.pack(side=tk.LEFT, padx=(10, 0))
+        self.busy_bar.start(20)
+    
+    def is_cell_reference(self, text):
+        """检查是否是单元格引用"""
+        return is_cell_reference(text)
+    
+    def show_status(self, text, error=False):
+        """在状态行显示提示（不弹出对话框），成功提示几秒后自动消失"""
+        if self._status_after is not None:
+            self.root.after_cancel(self._status_after)
+            self._status_after = None
+        self.status_label.config(text=text, foreground="red" if error else "green")
+        if not error:
+            self._status_after = self.root.after(STATUS_DELAY, self._clear_status, text)
+    
+    def _clear_status(self, text):
+        """清除自动消失的提示（状态行已显示其他内容时不动）"""
+        self._status_after = None
+        if self.status_label.cget("text") == text:
+            self.status_label.config(text="", foreground="red")
+    
+    def copy_to_clipboard(self):
+        """复制结果到剪贴板"""
+        result = self.result_text.get('1.0', tk.END).strip()
+        if not result:
+            return
+        try:
+            copy_text(result, self.root)
+        except (tk.TclError, RuntimeError) as e:
+            self.show_status(f"{self.lang_manager.get_text('copy_error')}{e}", error=True)
+            return
+        self.show_status(self.lang_manager.get_text("copy_success"))
+        self.record_history(result)
+    
+    def add_to_list(self):
+        """把当前公式加入待复制的列表"""
+        result = self.result_text.get('1.0', tk.END).strip()
+        if not result:
+            return
+        self.collected.append(result)
+        self.record_history(result)
+        get_text = self.lang_manager.get_text
+        self.copy_list_btn.config(text=get_text("copy_list").format(len(self.collected)), state="normal")
+        self.show_status(get_text("list_added").format(len(self.collected)))
+    
+    def copy_list(self):
+        """把列表中的全部公式作为一列一次复制到剪贴板，成功后清空列表"""
+        if not self.collected:
+            return
+        get_text = self.lang_manager.get_text
+        try:
+            copy_rows(self.collected, self.root)
+        except (tk.TclError, RuntimeError) as e:
+            self.show_status(f"{get_text('copy_error')}{e}", error=True)
+            return
+        count = len(self.collected)
+        self.collected.clear()
+        self.copy_list_btn.config(text=get_text("copy_list").format(0), state="disabled")
+        self.show_status(get_text("list_copied").format(count))
+    
+    def export_xlsx(self):
+        """把结果写入新的 .xlsx 文件（A1单元格）"""
+        result = self.result_text.get('1.0', tk.END).strip()
+        if not result:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".xlsx",
+                                            filetypes=[("Excel", "*.xlsx")])
+        if not path:
+            return
+        # xlsx 模块只在导出时导入
+        from excel_function_maker.xlsx import write_formulas
+        try:
+            write_formulas(path, [result])
+        except (OSError, ValueError) as e:
+            messagebox.showerror(self.lang_manager.get_text("error"),
+                               f"{self.lang_manager.get_text('export_error')}{e}")
+            return
+        self.show_status(self.lang_manager.get_text("export_success").format(path))
+        self.record_history(result)
+    
+    def clear_all(self):
+        """清空所有输入和结果"""
+        self.preview.reset()
+        self.param_nodes = {}
+        for entry in self.param_entries:
+            entry.delete(0, tk.END)
+        self.result_text.delete('1.0', tk.END)
+        self.status_label.config(text="")
+        self.cost_label.config(text="")
+        self.original_formula = None
+        self.rewrite_label.grid_remove()
+        self.copy_btn.config(state="disabled")
+        self.collect_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
+    
+    def history_store(self):
+        """历史记录库（第一次调用时打开），无法打开时返回None"""
+        if self._history is None and not self._history_failed:
+            try:
+                self._history = HistoryStore()
+            except (OSError, sqlite3.Error) as e:
+                self._history_failed = True
+                self.show_status(f"{self.lang_manager.get_text('history_error')}{e}", error=True)
+        return self._history
+    
+    def record_history(self, formula, inputs=None):
+        """记录函数、参数（默认为当前输入）和结果（后台写入，不等待磁盘）"""
+        if inputs is None:
+            inputs = self.get_current_inputs()
+        store = self.history_store()
+        if inputs is None or store is None:
+            return
+        selected_func, values = inputs
+        # 可重复参数末尾的空输入行不记录
+        values = list(values)
+        while values and not values[-1].strip():
+            values.pop()
+        store.add(selected_func, values, formula)
+    
+    def open_history(self):
+        """打开历史记录窗口（已打开时切换到前面）"""
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.deiconify()
+            self.history_window.lift()
+            self.history_search.focus_set()
+            self.refresh_history()
+            return
+        window = self.history_window = tk.Toplevel(self.root)
+        window.geometry("640x400")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
+        
+        search_frame = ttk.Frame(window, padding=(10, 10, 10, 5))
+        search_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        search_frame.columnconfigure(1, weight=1)
+        self.history_search_label = ttk.Label(search_frame)
+        self.history_search_label.grid(row=0, column=0, padx=(0, 5))
+        self.history_search = ttk.Entry(search_frame)
+        self.history_search.grid(row=0, column=1, sticky=(tk.W, tk.E))
+        # 边输入边搜索（每次查询只需几毫秒，不需要延迟合并）
+        self.history_search.bind('<KeyRelease>', lambda event: self.refresh_history())
+        self.history_search.bind('<Return>', lambda event: self.use_selected_history())
+        self.history_favorites_var = tk.BooleanVar(value=False)
+        self.history_favorites_check = ttk.Checkbutton(search_frame, variable=self.history_favorites_var,
+                                                       command=self.refresh_history)
+        self.history_favorites_check.grid(row=0, column=2, padx=(10, 0))
+        
+        self.history_list = tk.Listbox(window, font=("Consolas", 10), activestyle="none")
+        self.history_list.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10)
+        self.history_list.bind('<Double-Button-1>', lambda event: self.use_selected_history())
+        self.history_entries = []
+        
+        buttons = ttk.Frame(window, padding=10)
+        buttons.grid(row=2, column=0, sticky=tk.E)
+        self.history_use_btn = ttk.Button(buttons, command=self.use_selected_history)
+        self.history_use_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.history_favorite_btn = ttk.Button(buttons, command=self.toggle_history_favorite)
+        self.history_favorite_btn.pack(side=tk.LEFT)
+        
+        self.refresh_history_texts()
+        self.history_search.focus_set()
+        self.refresh_history()
+    
+    def refresh_history_texts(self):
+        """按当前语言更新历史记录窗口的文本"""
+        if not self.history_window.winfo_exists():
+            return
+        get_text = self.lang_manager.get_text
+        self.history_window.title(get_text("history"))
+        self.history_search_label.config(text=get_text("history_search"))
+        self.history_favorites_check.config(text=get_text("favorites_only"))
+        self.history_use_btn.config(text=get_text("history_use"))
+        self.history_favorite_btn.config(text=get_text("history_favorite"))
+    
+    def refresh_history(self):
+        """按搜索框内容刷新历史记录列表"""
+        store = self.history_store()
+        if store is None:
+            return
+        self.history_entries = store.search(self.history_search.get(),
+                                            favorites_only=self.history_favorites_var.get())
+        self.history_list.delete(0, tk.END)
+        for entry in self.history_entries:
+            self.history_list.insert(tk.END, f"{'★' if entry.favorite else '  '} {entry.formula}")
+        if self.history_entries:
+            self.history_list.selection_set(0)
+    
+    def _selected_history(self):
+        """历史记录列表中选中的记录"""
+        selection = self.history_list.curselection()
+        if not selection or selection[0] >= len(self.history_entries):
+            return None
+        return self.history_entries[selection[0]]
+    
+    def use_selected_history(self):
+        """把选中的记录填回主窗口"""
+        entry = self._selected_history()
+        if entry is not None:
+            self.use_history_entry(entry)
+    
+    def use_history_entry(self, entry):
+        """恢复记录中的函数和参数，并重新生成预览"""
+        if entry.function not in self.lang_manager.get_functions():
+            return
+        self.restore_inputs(entry.function, entry.params)
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.root.lift()
+        self.preview.schedule()
+    
+    def toggle_history_favorite(self):
+        """收藏或取消收藏选中的记录"""
+        entry = self._selected_history()
+        store = self.history_store()
+        if entry is None or store is None:
+            return
+        index = self.history_entries.index(entry)
+        entry.favorite = not entry.favorite
+        store.set_favorite(entry.id, entry.favorite)
+        # 只更新这一行，不等待后台写入
+        self.history_list.delete(index)
+        self.history_list.insert(index, f"{'★' if entry.favorite else '  '} {entry.formula}")
+        self.history_list.selection_set(index)
+    
+    def open_debug_panel(self, event=None):
+        """打开调试面板：跟踪开关、各阶段的耗时统计和计数器、导出 Chrome trace"""
+        if self.debug_window is not None and self.debug_window.winfo_exists():
+            self.debug_window.deiconify()
+            self.debug_window.lift()
+            self.refresh_debug_panel()
+            return
+        window = self.debug_window = tk.Toplevel(self.root)
+        window.geometry("780x360")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
+        
+        controls = ttk.Frame(window, padding=(10, 10, 10, 5))
+        controls.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.debug_enabled_var = tk.BooleanVar(value=TRACER.enabled)
+        self.debug_enabled_check = ttk.Checkbutton(controls, variable=self.debug_enabled_var,
+                                                   command=self.on_debug_toggled)
+        self.debug_enabled_check.pack(side=tk.LEFT, padx=(0, 20))
+        self.debug_reset_btn = ttk.Button(controls, command=self.reset_trace)
+        self.debug_reset_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.debug_export_btn = ttk.Button(controls, command=self.export_trace)
+        self.debug_export_btn.pack(side=tk.LEFT)
+        
+        self.debug_text = scrolledtext.ScrolledText(window, height=14, font=("Consolas", 9))
+        self.debug_text.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(0, 10))
+        
+        self.refresh_debug_texts()
+        self.refresh_debug_panel()
+    
+    def refresh_debug_texts(self):
+        """按当前语言更新调试面板的文本"""
+        if not self.debug_window.winfo_exists():
+            return
+        get_text = self.lang_manager.get_text
+        self.debug_window.title(get_text("debug_title"))
+        self.debug_enabled_check.config(text=get_text("debug_enable"))
+        self.debug_reset_btn.config(text=get_text("debug_reset"))
+        self.debug_export_btn.config(text=get_text("debug_export"))
+    
+    def refresh_debug_panel(self):
+        """刷新统计（面板打开期间每秒一次，关闭后停止）"""
+        if self._debug_after is not None:
+            self.root.after_cancel(self._debug_after)
+            self._debug_after = None
+        if self.debug_window is None or not self.debug_window.winfo_exists():
+            return
+        if TRACER.enabled or TRACER.histograms or TRACER.counters:
+            text = TRACER.summary()
+        else:
+            text = self.lang_manager.get_text("debug_disabled")
+        # 内容未变化时不重写，不影响正在进行的选择和滚动
+        if self.debug_text.get('1.0', 'end-1c') != text:
+            self.debug_text.delete('1.0', tk.END)
+            self.debug_text.insert('1.0', text)
+        self._debug_after = self.root.after(DEBUG_REFRESH, self.refresh_debug_panel)
+    
+    def on_debug_toggled(self):
+        """打开或关闭跟踪"""
+        if self.debug_enabled_var.get():
+            TRACER.enable()
+        else:
+            TRACER.disable()
+        self.refresh_debug_panel()
+    
+    def reset_trace(self):
+        """清空已记录的统计和事件"""
+        TRACER.reset()
+        self.refresh_debug_panel()
+    
+    def export_trace(self):
+        """把记录的事件保存为 Chrome trace JSON（chrome://tracing 或 Perfetto 中打开）"""
+        path = filedialog.asksaveasfilename(parent=self.debug_window, defaultextension=".json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if not path:
+            return
+        try:
+            TRACER.export(path)
+        except OSError as e:
+            self.show_status(f"{self.lang_manager.get_text('debug_export_error')}{e}", error=True)
+            return
+        self.show_status(self.lang_manager.get_text("debug_export_success").format(path))
+    
+    def run(self):
+        """运行应用程序"""
+        try:
+            self.root.mainloop()
+        finally:
+            self.runner.close()
+            # 写完尚在队列中的历史记录
+            if self._history is not None:
+                self._history.close()
+
+
+def main():
+    """主函数"""
+    try:
+        app = ExcelFunctionMaker()
+        app.run()
+    except Exception as e:
+        print(f"应用程序启动失败: {e}")
+        messagebox.showerror("错误", f"应用程序启动失败: {e}")
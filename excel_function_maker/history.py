@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式历史和收藏（SQLite + FTS5全文索引）
+Formula history and favorites stored in SQLite with an FTS5 index
+
+数据库位于每个用户自己的数据目录（不是当前工作目录）。写入交给后台线程，调用方只是把记录放进队列，
+界面不会因为磁盘写入而卡住；后台线程把积累的记录合并为一个事务。
+搜索使用 trigram 分词的 FTS5 索引，可匹配函数名、参数和公式中的任意子串；结果按最近使用排序，
+十万条记录中边输入边搜索也只需几毫秒。同一公式再次记录时移到最前面，收藏标记保留。
+The database lives in the per-user data directory, not the working
+directory. Writes go through a background thread: callers only enqueue, so
+the UI never waits on disk, and queued records are committed in one
+transaction. Search uses a trigram FTS5 index, so any substring of the
+function name, parameters or formula matches; results come newest first and
+stay within milliseconds at 100k+ entries. Recording a formula again moves it
+to the top and keeps its favorite flag.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+# 数据目录名
+APP_DIR_NAME = "ExcelFunctionMaker"
+# 设置此环境变量时数据目录使用它的值（便于便携使用和测试）
+DATA_DIR_ENV = "EXCEL_FUNCTION_MAKER_HOME"
+# 默认数据库文件名
+HISTORY_FILE = "history.sqlite3"
+# 默认搜索结果条数
+SEARCH_LIMIT = 50
+# trigram 索引只能匹配至少3个字符的子串，更短的查询按 LIKE 逐行查找
+_TRIGRAM_MIN = 3
+# 1～2个字符的查询只查找最近的这么多条记录（保证边输入边搜索的延迟）
+SHORT_QUERY_SCAN = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    function TEXT NOT NULL,
+    params TEXT NOT NULL,
+    formula TEXT NOT NULL UNIQUE,
+    favorite INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS history_favorite ON history (favorite, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5 (
+    function, params, formula, content='history', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, function, params, formula) VALUES (new.id, new.function, new.params, new.formula);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, function, params, formula)
+    VALUES ('delete', old.id, old.function, old.params, old.formula);
+END;
+"""
+
+_COLUMNS = "id, created, function, params, formula, favorite"
+_QUALIFIED_COLUMNS = "h.id, h.created, h.function, h.params, h.formula, h.favorite"
+
+# 写入队列中的操作
+_ADD = 0
+_FAVORITE = 1
+_DELETE = 2
+_CLEAR = 3
+
+
+def data_dir():
+    """当前用户的数据目录（Windows为 %APPDATA%，macOS为 Application Support，其他系统遵循XDG）"""
+    override = os.environ.get(DATA_DIR_ENV)
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser(r"~\AppData\Roaming")
+        return os.path.join(base, APP_DIR_NAME)
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Application Support"), APP_DIR_NAME)
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "excel-function-maker")
+
+
+class HistoryEntry:
+    """一条历史记录"""
+
+    __slots__ = ("id", "created", "function", "params", "formula", "favorite")
+
+    def __init__(self, id, created, function, params, formula, favorite):
+        self.id = id
+        # 最近一次记录的时间（Unix时间戳）
+        self.created = created
+        self.function = function
+        # 参数值元组
+        self.params = tuple(json.loads(params)) if isinstance(params, str) else tuple(params)
+        self.formula = formula
+        self.favorite = bool(favorite)
+
+    def __repr__(self):
+        star = "*" if self.favorite else ""
+        return f"HistoryEntry({self.id}{star}, {self.formula!r})"
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=30)
+    # WAL 模式下读取不会被后台写入阻塞
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _fts_phrase(text):
+    """把输入文本作为一个FTS短语（双引号转义）"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _like_pattern(text):
+    """LIKE 子串匹配模式（转义 % 和 _）"""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class HistoryStore:
+    """公式历史和收藏；写入在后台线程中进行，搜索在调用线程中直接读取"""
+
+    def __init__(self, path=None):
+        """path 为None时使用用户数据目录中的默认文件，":memory:" 不适用（读写线程需要共享同一文件）"""
+        if path is None:
+            directory = data_dir()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, HISTORY_FILE)
+        self.path = path
+        self._reader = _connect(path)
+        self._reader.executescript(_SCHEMA)
+        self._reader.commit()
+        self._queue = queue.Queue()
+        self._errors = []
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        """后台写入线程：取出队列中已有的全部操作，在一个事务中执行"""
+        connection = _connect(self.path)
+        try:
+            while True:
+                operations = [self._queue.get()]
+                while True:
+                    try:
+                        operations.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in operations
+                try:
+                    with connection:
+                        for operation in operations:
+                            if operation is not None:
+                                self._apply(connection, operation)
+                except sqlite3.Error as e:
+                    self._errors.append(e)
+                finally:
+                    for _ in operations:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _apply(connection, operation):
+        kind = operation[0]
+        if kind == _ADD:
+            _, created, function, params, formula = operation
+            # 再次记录的公式换用新的id，使id顺序就是最近使用顺序（搜索按id倒序即可提前结束）
+            row = connection.execute("SELECT favorite FROM history WHERE formula = ?", (formula,)).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM history WHERE formula = ?", (formula,))
+            connection.execute("INSERT INTO history (created, function, params, formula, favorite) VALUES (?, ?, ?, ?, ?)",
+                               (created, function, params, formula, row[0] if row else 0))
+        elif kind == _FAVORITE:
+            connection.execute("UPDATE history SET favorite = ? WHERE id = ?", (int(operation[2]), operation[1]))
+        elif kind == _DELETE:
+            connection.execute("DELETE FROM history WHERE id = ?", (operation[1],))
+        elif kind == _CLEAR:
+            connection.execute("DELETE FROM history WHERE favorite = 0" if operation[1] else "DELETE FROM history")
+
+    def _submit(self, operation):
+        if not self._writer.is_alive():
+            raise RuntimeError("history store is closed")
+        self._queue.put(operation)
+
+    def add(self, function, params, formula):
+        """记录一次生成结果（立即返回，由后台线程写入）"""
+        self._submit((_ADD, time.time(), function, json.dumps(list(params), ensure_ascii=False), formula))
+
+    def set_favorite(self, entry_id, favorite=True):
+        """设置或取消收藏"""
+        self._submit((_FAVORITE, entry_id, favorite))
+
+    def delete(self, entry_id):
+        """删除一条记录"""
+        self._submit((_DELETE, entry_id))
+
+    def clear(self, keep_favorites=True):
+        """清空历史（默认保留收藏）"""
+        self._submit((_CLEAR, keep_favorites))
+
+    def flush(self):
+        """等待已提交的写入全部完成，返回并清空期间发生的数据库错误"""
+        self._queue.join()
+        errors, self._errors = self._errors, []
+        return errors
+
+    def search(self, text="", limit=SEARCH_LIMIT, favorites_only=False):
+        """按子串搜索（不区分大小写），最近使用的在前；text 为空时返回最近的记录
+
+        1～2个字符的查询只查找最近 SHORT_QUERY_SCAN 条记录（收藏除外）。
+        尚在写入队列中的记录不会出现在结果中（需要时先调用 flush）。
+        """
+        text = text.strip()
+        if not text:
+            where, args = "", ()
+        elif favorites_only or len(text) < _TRIGRAM_MIN:
+            # 收藏通常很少，按收藏索引逐条比较比全文检索更快
+            where = "(formula LIKE ?1 ESCAPE '\\' OR function LIKE ?1 ESCAPE '\\' OR params LIKE ?1 ESCAPE '\\')"
+            args = (_like_pattern(text),)
+            if not favorites_only:
+                where += f" AND id > (SELECT max(id) FROM history) - {SHORT_QUERY_SCAN}"
+        else:
+            # 全文索引按 rowid 倒序产生结果，取满 limit 条即停止
+            sql = (f"SELECT {_QUALIFIED_COLUMNS} FROM history_fts JOIN history h ON h.id = history_fts.rowid "
+                   f"WHERE history_fts MATCH ? ORDER BY history_fts.rowid DESC LIMIT ?")
+            return [HistoryEntry(*row) for row in self._reader.execute(sql, (_fts_phrase(text), limit))]
+        if favorites_only:
+            where = "favorite = 1" + (" AND " + where if where else "")
+        sql = f"SELECT {_COLUMNS} FROM history {'WHERE ' + where if where else ''} ORDER BY id DESC LIMIT {int(limit)}"
+        return [HistoryEntry(*row) for row in self._reader.execute(sql, args)]
+
+    def favorites(self, limit=SEARCH_LIMIT):
+        """最近的收藏"""
+        return self.search("", limit, favorites_only=True)
+
+    def __len__(self):
+        return self._reader.execute("SELECT count(*) FROM history").fetchone()[0]
+
+    def close(self):
+        """写完队列中的记录并关闭数据库"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语言管理器和函数目录
+Language manager and function catalog
+"""
+
+import collections.abc
+import functools
+import json
+import os
+
+from excel_function_maker.tracing import TRACER
+
+
+# 函数目录和语言包所在目录
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog")
+# 支持的语言
+LANGUAGES = ("zh", "en")
+# 语言包缺少某个函数时使用的语言
+FALLBACK_LANGUAGE = "en"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_json(path):
+    """读取JSON数据文件（每个文件只读取一次）"""
+    with TRACER.span("config.catalog_load", file=os.path.basename(path)):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+class _LanguageMap(collections.abc.Mapping):
+    """按语言代码懒加载的只读映射"""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getitem__(self, language):
+        if language not in LANGUAGES:
+            raise KeyError(language)
+        return self._loader(language)
+
+    def __iter__(self):
+        return iter(LANGUAGES)
+
+    def __len__(self):
+        return len(LANGUAGES)
+
+
+class FunctionTable(collections.abc.Mapping):
+    """某种语言的函数定义表：模板和参数元数据来自函数目录，显示文本来自语言包，访问时才合并"""
+
+    def __init__(self, catalog, pack_functions, fallback_loader=None):
+        self._catalog = catalog
+        self._pack_functions = pack_functions
+        self._fallback_loader = fallback_loader
+        self._merged = {}
+
+    def __getitem__(self, key):
+        info = self._merged.get(key)
+        if info is None:
+            spec = self._catalog[key]
+            display = self._pack_functions.get(key)
+            if display is None and self._fallback_loader is not None:
+                display = self._fallback_loader().get(key)
+            info = dict(display or {})
+            info.setdefault('name', key)
+            info.setdefault('description', '')
+            info.setdefault('params', [arg['kind'] for arg in spec['args']])
+            info.setdefault('example', '')
+            info['template'] = spec['template']
+            info['args'] = spec['args']
+            info['layout'] = spec.get('layout', 'template')
+            self._merged[key] = info
+        return info
+
+    def __contains__(self, key):
+        return key in self._catalog
+
+    def __iter__(self):
+        return iter(self._catalog)
+
+    def __len__(self):
+        return len(self._catalog)
+
+
+class LanguageManager:
+    """语言管理器（函数目录和语言包在首次使用时才加载）"""
+    
+    def __init__(self, catalog_dir=None):
+        self.current_language = "zh"  # 默认中文
+        self.config_file = "language_config.json"
+        self.catalog_dir = catalog_dir or CATALOG_DIR
+        self._tables = {}
+        self.load_language_preference()
+    
+    @property
+    def catalog(self):
+        """与语言无关的函数目录（模板和参数元数据）"""
+        return _load_json(os.path.join(self.catalog_dir, "functions.json"))
+    
+    @property
+    def texts(self):
+        """各语言的界面文本"""
+        return _LanguageMap(lambda language: self._load_pack(language).get("texts", {}))
+    
+    @property
+    def functions(self):
+        """各语言的函数定义表"""
+        return _LanguageMap(self.get_function_table)
+    
+    def _load_pack(self, language):
+        """加载语言包（只包含显示文本）"""
+        if language not in LANGUAGES:
+            return {}
+        return _load_json(os.path.join(self.catalog_dir, f"{language}.json"))
+    
+    def get_function_table(self, language):
+        """获取指定语言的函数定义表"""
+        table = self._tables.get(language)
+        if table is None:
+            fallback = None
+            if language != FALLBACK_LANGUAGE:
+                fallback = lambda: self._load_pack(FALLBACK_LANGUAGE).get("functions", {})
+            table = self._tables[language] = FunctionTable(
+                self.catalog, self._load_pack(language).get("functions", {}), fallback)
+        return table
+    
+    def load_language_preference(self):
+        """加载语言偏好设置"""
+        try:
+            with TRACER.span("config.load"):
+                if os.path.exists(self.config_file):
+                    with open(self.config_file, 'r', encoding='utf-8') as f:
+                        config = json.load(f)
+                        self.current_language = config.get('language', 'zh')
+        except:
+            self.current_language = 'zh'
+    
+    def save_language_preference(self):
+        """保存语言偏好设置"""
+        try:
+            with TRACER.span("config.save"):
+                config = {'language': self.current_language}
+                with open(self.config_file, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, ensure_ascii=False, indent=2)
+        except:
+            pass
+    
+    def get_text(self, key):
+        """获取当前语言的文本"""
+        return self._load_pack(self.current_language).get("texts", {}).get(key, key)
+    
+    def get_functions(self):
+        """获取当前语言的函数定义"""
+        if self.current_language not in LANGUAGES:
+            return {}
+        return self.get_function_table(self.current_language)
+    
+    def switch_language(self):
+        """切换语言"""
+        self.current_language = "en" if self.current_language == "zh" else "zh"
+        self.save_language_preference()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+VLOOKUP/HLOOKUP 查找索引
+Lookup indexes for evaluating VLOOKUP/HLOOKUP against a loaded sheet
+
+精确匹配（FALSE）使用哈希索引，近似匹配（TRUE）使用排序键数组加二分查找。
+索引按查找键所在的行/列范围缓存，数据列发生变化时才重建。
+Exact match (FALSE) uses a hash index; approximate match (TRUE) uses sorted
+key arrays with binary search. Indexes are cached per key vector and only
+rebuilt when the underlying columns change.
+"""
+
+import re
+
+try:
+    import numpy as np
+except ImportError:  # 只有求值功能需要numpy
+    np = None
+
+from excel_function_maker.formula import Reference
+
+# 查找失败时返回的位置
+NOT_FOUND = -1
+
+
+def _normalize(value):
+    """查找值规范化：数字为float，文本小写（Excel查找不区分大小写）"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return str(value).lower()
+
+
+def _wildcard_pattern(text):
+    """把含 * ? 的查找文本转为正则（~ 为转义符），没有通配符时返回None"""
+    if "*" not in text and "?" not in text:
+        return None
+    parts = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "~" and i + 1 < len(text):
+            parts.append(re.escape(text[i + 1]))
+            i += 2
+            continue
+        parts.append(".*" if ch == "*" else "." if ch == "?" else re.escape(ch))
+        i += 1
+    return re.compile("^" + "".join(parts) + "$", re.DOTALL)
+
+
+class LookupIndex:
+    """一个查找键向量（表格首列或首行）上的索引"""
+
+    def __init__(self, numbers, lower_texts):
+        count = len(numbers)
+        positions = np.arange(count)
+        is_number = ~np.isnan(numbers)
+        is_text = ~is_number & (lower_texts != "")
+
+        # 数字键和文本键分开索引（Excel中数字和文本不会互相匹配）
+        self._number_keys = numbers[is_number]
+        self._number_positions = positions[is_number]
+        self._text_keys = lower_texts[is_text]
+        self._text_positions = positions[is_text]
+        self._exact = None
+        self._sorted = None
+
+    def _exact_index(self):
+        """哈希索引：键 -> 第一次出现的位置"""
+        if self._exact is None:
+            exact = {}
+            for keys, positions in ((self._number_keys, self._number_positions),
+                                    (self._text_keys, self._text_positions)):
+                if keys.size:
+                    unique, first = np.unique(keys, return_index=True)
+                    exact.update(zip(unique.tolist(), positions[first].tolist()))
+            self._exact = exact
+        return self._exact
+
+    def _sorted_index(self):
+        """排序键数组：(数字键, 位置, 文本键, 位置)"""
+        if self._sorted is None:
+            number_order = np.argsort(self._number_keys, kind="stable")
+            text_order = np.argsort(self._text_keys, kind="stable")
+            self._sorted = (self._number_keys[number_order], self._number_positions[number_order],
+                            self._text_keys[text_order], self._text_positions[text_order])
+        return self._sorted
+
+    def find(self, value, approximate=False):
+        """查找单个值，返回位置或 NOT_FOUND"""
+        key = _normalize(value)
+        if not approximate:
+            if isinstance(key, str):
+                pattern = _wildcard_pattern(key)
+                if pattern is not None:
+                    return self._find_wildcard(pattern)
+            return self._exact_index().get(key, NOT_FOUND)
+        number_keys, number_positions, text_keys, text_positions = self._sorted_index()
+        keys, positions = (number_keys, number_positions) if isinstance(key, float) else (text_keys, text_positions)
+        # 小于等于查找值的最大键（重复键取最后一个，与Excel在有序数据上的结果一致）
+        i = int(np.searchsorted(keys, key, side="right")) - 1
+        return int(positions[i]) if i >= 0 else NOT_FOUND
+
+    def find_many(self, values, approximate=False):
+        """批量查找，返回位置数组"""
+        keys = [_normalize(v) for v in values]
+        if not approximate:
+            exact = self._exact_index()
+            result = np.empty(len(keys), dtype=np.int64)
+            for i, key in enumerate(keys):
+                if isinstance(key, str) and ("*" in key or "?" in key):
+                    result[i] = self.find(key)
+                else:
+                    result[i] = exact.get(key, NOT_FOUND)
+            return result
+
+        number_keys, number_positions, text_keys, text_positions = self._sorted_index()
+        result = np.full(len(keys), NOT_FOUND, dtype=np.int64)
+        is_number = np.fromiter((isinstance(k, float) for k in keys), dtype=bool, count=len(keys))
+        for mask, sorted_keys, positions, dtype in ((is_number, number_keys, number_positions, np.float64),
+                                                    (~is_number, text_keys, text_positions, str)):
+            if not mask.any() or not sorted_keys.size:
+                continue
+            wanted = np.asarray([k for k, m in zip(keys, mask) if m], dtype=dtype)
+            found = np.searchsorted(sorted_keys, wanted, side="right") - 1
+            hit = found >= 0
+            block = np.full(len(wanted), NOT_FOUND, dtype=np.int64)
+            block[hit] = positions[found[hit]]
+            result[mask] = block
+        return result
+
+    def _find_wildcard(self, pattern):
+        """通配符精确匹配：按原始顺序找第一个匹配的文本键"""
+        for key, position in zip(self._text_keys.tolist(), self._text_positions.tolist()):
+            if pattern.match(key):
+                return position
+        return NOT_FOUND
+
+
+class LookupCache:
+    """按查找键向量缓存索引，对应的列变化后自动重建"""
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self._indexes = {}
+        self.builds = 0
+
+    def index(self, ref, horizontal=False):
+        """获取表格范围的查找索引（VLOOKUP用首列，HLOOKUP用首行）"""
+        sheet = self.sheet
+        if horizontal:
+            key_ref = Reference(ref.row0, ref.col0, ref.row0, ref.col1)
+        else:
+            key_ref = Reference(ref.row0, ref.col0, ref.row1, ref.col0)
+        cache_key = (horizontal, key_ref.key())
+        versions = tuple(sheet.column_version(c) for c in range(key_ref.col0, key_ref.col1 + 1))
+        cached = self._indexes.get(cache_key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        numbers = sheet.block(key_ref, "numbers")
+        texts = sheet.block(key_ref, "lower")
+        index = LookupIndex(numbers.ravel(), texts.ravel())
+        self._indexes[cache_key] = (versions, index)
+        self.builds += 1
+        return index
+
+    def _result_cell(self, ref, position, offset, horizontal):
+        """根据找到的位置取返回行/列中的值"""
+        if horizontal:
+            return self.sheet.cell(ref.row0 + offset - 1, ref.col0 + position)
+        return self.sheet.cell(ref.row0 + position, ref.col0 + offset - 1)
+
+    def lookup(self, value, ref, offset, approximate=True, horizontal=False):
+        """执行一次VLOOKUP/HLOOKUP，找不到时返回None"""
+        position = self.index(ref, horizontal).find(value, approximate)
+        if position == NOT_FOUND:
+            return None
+        return self._result_cell(ref, position, offset, horizontal)
+
+    def lookup_many(self, values, ref, offset, approximate=True, horizontal=False):
+        """批量查找，找不到的位置为None"""
+        positions = self.index(ref, horizontal).find_many(values, approximate)
+        return [None if p == NOT_FOUND else self._result_cell(ref, int(p), offset, horizontal)
+                for p in positions.tolist()]
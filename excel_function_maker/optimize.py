@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公式改写优化：按目标Excel版本把旧写法换成更快、更稳的等价写法
+Rewrite optimizer: replaces legacy forms with faster equivalents available in the target Excel version
+
+规则 / Rules:
+    VLOOKUP/HLOOKUP 精确匹配    -> XLOOKUP(值,查找列,返回列)（2021+），更早版本 INDEX(返回列,MATCH(值,查找列,0))
+    CONCATENATE                  -> 固定分隔符时 TEXTJOIN(分隔符,FALSE,...)，相邻单元格可合并为范围时 CONCAT(...)（2019+）
+    SUMPRODUCT 的条件乘积        -> SUMIFS / COUNTIFS（2007+）
+    相加的同范围 SUMIF/COUNTIF  -> SUM(SUMIFS(...,条件单元格范围))（2021+，动态数组）
+按记号改写：没有改写的部分保留原文（空白、$、大小写都不变），每条改写记录改写前后的文本，可以比较开销。
+Lookups stop scanning unused table columns and survive inserted columns,
+concatenation accepts ranges, and criteria products no longer evaluate whole
+arrays. Rewriting works on tokens, so everything outside a rewrite keeps its
+exact text, and each rewrite records its before/after text for the cost delta.
+"""
+
+import functools
+import re
+
+from excel_function_maker.formula import FormulaSyntaxError, column_index, column_letters, iter_tokens, \
+    parse_reference
+
+# 可选的目标版本（从旧到新）
+EXCEL_VERSIONS = ("2007", "2010", "2013", "2016", "2019", "2021", "2024", "365")
+
+RULE_XLOOKUP = "xlookup"
+RULE_INDEX_MATCH = "index_match"
+RULE_TEXTJOIN = "textjoin"
+RULE_CONCAT = "concat"
+RULE_SUMIFS = "sumifs"
+RULE_COUNTIFS = "countifs"
+RULE_SUM_IFS = "sum_ifs"
+
+# 规则 -> (改写后的写法, 需要的最低版本)
+RULES = {
+    RULE_XLOOKUP: ("XLOOKUP", "2021"),
+    RULE_INDEX_MATCH: ("INDEX/MATCH", "2007"),
+    RULE_TEXTJOIN: ("TEXTJOIN", "2019"),
+    RULE_CONCAT: ("CONCAT", "2019"),
+    RULE_SUMIFS: ("SUMIFS", "2007"),
+    RULE_COUNTIFS: ("COUNTIFS", "2007"),
+    RULE_SUM_IFS: ("SUM(SUMIFS)", "2021"),
+}
+
+# 不含这些函数的公式不需要分析
+_TRIGGER_RE = re.compile(r"(?:VLOOKUP|HLOOKUP|CONCATENATE|SUMPRODUCT|SUMIF|COUNTIF)\(", re.IGNORECASE)
+_CELL_RE = re.compile(r"^(\$?)([A-Za-z]{1,3})(\$?)([0-9]+)$")
+_COLUMN_RE = re.compile(r"^(\$?)([A-Za-z]{1,3})$")
+_ROW_RE = re.compile(r"^(\$?)([0-9]+)$")
+_COMPARISONS = ("=", "<>", "<", ">", "<=", ">=")
+# 比较方向交换（常量在左边时）
+_FLIPPED = {"=": "=", "<>": "<>", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+class Rewrite:
+    """一次改写：source 为原来的函数（如 VLOOKUP），before/after 为改写前后的表达式文本"""
+
+    __slots__ = ("rule", "source", "before", "after")
+
+    def __init__(self, rule, source, before, after):
+        self.rule = rule
+        self.source = source
+        self.before = before
+        self.after = after
+
+    @property
+    def target(self):
+        return RULES[self.rule][0]
+
+    @property
+    def since(self):
+        return RULES[self.rule][1]
+
+    def costs(self):
+        """改写前后的开销估算 (FormulaCost, FormulaCost)"""
+        # 开销模块只在需要显示时导入
+        from excel_function_maker.cost import analyze
+        return analyze("=" + self.before), analyze("=" + self.after)
+
+    def summary(self):
+        """单行说明（命令行输出用）"""
+        before, after = self.costs()
+        return (f"{self.source} -> {self.target} (Excel {self.since}+): cells {before.cells}->{after.cells}, "
+                f"scans {before.scans}->{after.scans}")
+
+    def __repr__(self):
+        return f"Rewrite({self.rule}, {self.before!r} -> {self.after!r})"
+
+
+class Optimization:
+    """一个公式的改写结果：original 原公式，formula 改写后的公式，rewrites 为 Rewrite 列表"""
+
+    __slots__ = ("original", "formula", "rewrites")
+
+    def __init__(self, original, formula, rewrites=()):
+        self.original = original
+        self.formula = formula
+        self.rewrites = rewrites
+
+    def __repr__(self):
+        return f"Optimization({self.formula!r}, {len(self.rewrites)} rewrites)"
+
+
+class _Node:
+    """函数调用（name 为函数名）或括号分组（name 为None）；parts 为各参数的项列表，项是记号或子节点"""
+
+    __slots__ = ("name", "head", "parts", "text", "rewritten")
+
+    def __init__(self, name, head):
+        self.name = name
+        self.head = head
+        self.parts = [[]]
+        self.text = None
+        self.rewritten = False
+
+
+def _build(tokens):
+    """记号转为嵌套结构，返回 (顶层项列表, 按闭合顺序排列的节点)；子节点总在父节点之前"""
+    root = []
+    items = root
+    stack = []
+    closed = []
+    previous = None
+    for kind, text in tokens:
+        if kind == "lparen":
+            if previous is not None and previous[0] == "func":
+                node = _Node(previous[1].upper(), previous[1] + "(")
+            else:
+                node = _Node(None, "(")
+            items.append(node)
+            stack.append((node, items))
+            items = node.parts[0]
+        elif kind == "rparen":
+            if not stack:
+                raise FormulaSyntaxError("unbalanced )")
+            node, items = stack.pop()
+            closed.append(node)
+        elif kind == "comma" and stack and stack[-1][0].name is not None:
+            node = stack[-1][0]
+            node.parts.append([])
+            items = node.parts[-1]
+        elif kind != "func":
+            items.append((kind, text))
+        previous = (kind, text)
+    if stack:
+        raise FormulaSyntaxError("unbalanced (")
+    return root, closed
+
+
+def _text(items):
+    return "".join(item[1] if isinstance(item, tuple) else item.text for item in items)
+
+
+def _significant(items):
+    return [item for item in items if not (isinstance(item, tuple) and item[0] == "ws")]
+
+
+def _single(items, kind):
+    """项列表只有一个指定类型的记号时返回其文本"""
+    items = _significant(items)
+    if len(items) == 1 and isinstance(items[0], tuple) and items[0][0] == kind:
+        return items[0][1]
+    return None
+
+
+def _split_sheet(text):
+    """拆分工作表前缀（含感叹号）和引用部分"""
+    bang = text.rfind("!")
+    return text[:bang + 1], text[bang + 1:]
+
+
+def _line(text, offset, horizontal):
+    """表格引用中的一列（horizontal 时为一行），保留工作表前缀和 $；无法处理时返回None"""
+    prefix, area = _split_sheet(text)
+    ends = area.split(":")
+    if len(ends) != 2:
+        return None
+    first, last = _CELL_RE.match(ends[0]), _CELL_RE.match(ends[1])
+    if first and last:
+        col_anchor, col, row_anchor0, row0 = first.groups()
+        _, col1, row_anchor1, row1 = last.groups()
+        if horizontal:
+            row = int(row0) + offset
+            if not int(row0) <= row <= int(row1):
+                return None
+            return f"{prefix}{col_anchor}{col.upper()}{row_anchor0}{row}:{last.group(1)}{col1.upper()}{row_anchor0}{row}"
+        index = column_index(col) + offset
+        if not column_index(col) <= index <= column_index(col1):
+            return None
+        letters = column_letters(index)
+        return f"{prefix}{col_anchor}{letters}{row_anchor0}{row0}:{col_anchor}{letters}{row_anchor1}{row1}"
+    first, last = (_ROW_RE.match(ends[0]), _ROW_RE.match(ends[1])) if horizontal else \
+        (_COLUMN_RE.match(ends[0]), _COLUMN_RE.match(ends[1]))
+    if not (first and last):
+        return None
+    anchor, start = first.groups()
+    if horizontal:
+        row = int(start) + offset
+        return f"{prefix}{anchor}{row}:{anchor}{row}" if row <= int(last.group(2)) else None
+    index = column_index(start) + offset
+    if index > column_index(last.group(2)):
+        return None
+    return f"{prefix}{anchor}{column_letters(index)}:{anchor}{column_letters(index)}"
+
+
+def _rewrite_lookup(node, target):
+    """VLOOKUP/HLOOKUP(值,表格,序号,FALSE) -> XLOOKUP 或 INDEX/MATCH"""
+    if len(node.parts) != 4:
+        return None
+    match_type = _text(node.parts[3]).strip().upper()
+    table = _single(node.parts[1], "ref")
+    number = _single(node.parts[2], "num")
+    value = _text(node.parts[0]).strip()
+    if match_type not in ("FALSE", "0") or table is None or number is None or not number.isdigit() or not value:
+        return None
+    ref = parse_reference(table)
+    offset = int(number) - 1
+    if ref is None or offset < 0:
+        return None
+    horizontal = node.name == "HLOOKUP"
+    keys, results = _line(table, 0, horizontal), _line(table, offset, horizontal)
+    if keys is None or results is None:
+        return None
+    # VLOOKUP 和 MATCH(...,0) 把查找值中的 *、?、~ 当作通配符，XLOOKUP 当作普通字符：
+    # 只有查找值是数字、逻辑值或不含这些字符的文本常量时才改为 XLOOKUP
+    literal = _single(node.parts[0], "str")
+    constant = literal is not None and not any(ch in literal for ch in "*?~") or \
+        _single(node.parts[0], "num") is not None or \
+        (_single(node.parts[0], "name") or "").upper() in ("TRUE", "FALSE")
+    if constant and _version(target) >= _version(RULES[RULE_XLOOKUP][1]):
+        return RULE_XLOOKUP, f"XLOOKUP({value},{keys},{results})"
+    return RULE_INDEX_MATCH, f"INDEX({results},MATCH({value},{keys},0))"
+
+
+def _is_range(items):
+    """参数中是否有多单元格范围、结构化引用或无法解析的引用"""
+    for item in _significant(items):
+        if isinstance(item, tuple) and item[0] in ("ref", "table"):
+            ref = parse_reference(item[1]) if item[0] == "ref" else None
+            if ref is None or not ref.is_cell:
+                return True
+    return False
+
+
+def _merge_cells(texts):
+    """相邻的单元格引用（同一行或同一列、依次相连）合并为范围，返回新的参数文本列表"""
+    merged = []
+    run = []
+
+    def flush():
+        if len(run) > 1:
+            merged.append(f"{run[0][0]}:{_split_sheet(run[-1][0])[1]}")
+        elif run:
+            merged.append(run[0][0])
+        run.clear()
+
+    for text in texts:
+        ref = parse_reference(text) if _CELL_RE.match(_split_sheet(text)[1]) else None
+        if ref is None:
+            flush()
+            merged.append(text)
+            continue
+        if run:
+            last = run[-1][1]
+            step = (ref.row0 - last.row0, ref.col0 - last.col0)
+            direction = run[1][2] if len(run) > 1 else step
+            if ref.sheet != last.sheet or step != direction or step not in ((0, 1), (1, 0)):
+                flush()
+                step = None
+            run.append((text, ref, step))
+        else:
+            run.append((text, ref, None))
+    flush()
+    return merged
+
+
+def _rewrite_concatenate(node, target):
+    """CONCATENATE -> TEXTJOIN（参数之间是同一个分隔符）或 CONCAT（相邻单元格合并为范围）"""
+    if _version(target) < _version(RULES[RULE_CONCAT][1]):
+        return None
+    # CONCATENATE 的范围参数按隐式交集取一个单元格，CONCAT/TEXTJOIN 会连接整个范围
+    if any(_is_range(part) for part in node.parts):
+        return None
+    texts = [_text(part).strip() for part in node.parts]
+    if not all(texts):
+        return None
+    separators = texts[1::2]
+    if len(texts) >= 5 and len(texts) % 2 == 1 and len(set(separators)) == 1 \
+            and _single(node.parts[1], "str") is not None:
+        values = _merge_cells(texts[0::2])
+        return RULE_TEXTJOIN, f"TEXTJOIN({separators[0]},FALSE,{','.join(values)})"
+    values = _merge_cells(texts)
+    if len(values) < len(texts):
+        return RULE_CONCAT, f"CONCAT({','.join(values)})"
+    return None
+
+
+def _criteria(op, other):
+    """比较 范围 op other 对应的 SUMIFS 条件文本；结果可能不同时返回None
+
+    只改写等于和不等于：SUMPRODUCT 中空单元格按0比较、文本大于任何数字，而 SUMIFS 的大小条件跳过它们。
+    与0或空文本比较时空单元格的结果也不同，不改写。
+    """
+    kind, text = other
+    if op not in ("=", "<>"):
+        return None
+    if kind == "num":
+        # 空单元格等于0，但条件 0 不匹配空单元格、条件 <>0 匹配空单元格
+        if float(text) == 0:
+            return None
+        return text if op == "=" else f'"<>{text}"'
+    if kind == "str":
+        value = text[1:-1].replace('""', '"')
+        # 条件 "<>" 匹配返回空文本的公式单元格，而 SUMPRODUCT 中它们等于 ""
+        if not value and op == "<>":
+            return None
+        if any(ch in value for ch in "*?~=<>"):
+            return None
+        try:
+            float(value)
+            # 数字文本在条件中会匹配数字
+            return None
+        except ValueError:
+            pass
+        return text if op == "=" else f'"<>{text[1:]}'
+    return None
+
+
+def _comparison(node):
+    """括号中的 范围 比较 常量，返回 (范围文本, 条件文本)"""
+    if node.name is not None or len(node.parts) != 1:
+        return None
+    items = _significant(node.parts[0])
+    if len(items) == 4 and items[2] == ("op", "-") and isinstance(items[3], tuple) and items[3][0] == "num":
+        items = items[:2] + [("num", "-" + items[3][1])]
+    elif len(items) == 4 and items[0] == ("op", "-") and isinstance(items[1], tuple) and items[1][0] == "num":
+        items = [("num", "-" + items[1][1])] + items[2:]
+    if len(items) != 3 or not all(isinstance(item, tuple) for item in items):
+        return None
+    left, (kind, op), right = items
+    if kind != "op" or op not in _COMPARISONS:
+        return None
+    for range_side, other, operator in ((left, right, op), (right, left, _FLIPPED[op])):
+        ref = parse_reference(range_side[1]) if range_side[0] == "ref" else None
+        if ref is not None and not ref.is_cell:
+            criteria = _criteria(operator, other)
+            return (range_side[1], ref, criteria) if criteria is not None else None
+    return None
+
+
+def _rewrite_sumproduct(node, target):
+    """SUMPRODUCT((A="x")*(B<>5)*C) 或 SUMPRODUCT(--(A="x"),--(B<>5),C) -> SUMIFS / COUNTIFS"""
+    conditions = []
+    values = None
+    for part in node.parts:
+        items = _significant(part)
+        factors = [[]]
+        for item in items:
+            if item == ("op", "*"):
+                factors.append([])
+            else:
+                factors[-1].append(item)
+        for factor in factors:
+            if len(factor) == 3 and factor[0] == factor[1] == ("op", "-"):
+                factor = factor[2:]
+            if len(factor) != 1:
+                return None
+            item = factor[0]
+            if isinstance(item, _Node):
+                condition = _comparison(item)
+                if condition is None or item.rewritten:
+                    return None
+                conditions.append(condition)
+            elif item[0] == "ref" and values is None:
+                values = (item[1], parse_reference(item[1]))
+                if values[1] is None:
+                    return None
+            else:
+                return None
+    if not conditions:
+        return None
+    shape = (conditions[0][1].height, conditions[0][1].width)
+    refs = [ref for _, ref, _ in conditions] + ([values[1]] if values else [])
+    if any((ref.height, ref.width) != shape for ref in refs):
+        return None
+    pairs = ",".join(f"{text},{criteria}" for text, _, criteria in conditions)
+    if values is not None:
+        return RULE_SUMIFS, f"SUMIFS({values[0]},{pairs})"
+    return RULE_COUNTIFS, f"COUNTIFS({pairs})"
+
+
+_CALL_RULES = {
+    "VLOOKUP": _rewrite_lookup,
+    "HLOOKUP": _rewrite_lookup,
+    "CONCATENATE": _rewrite_concatenate,
+    "SUMPRODUCT": _rewrite_sumproduct,
+}
+
+
+def _rewrite_sum(items, target, rewrites):
+    """A+B+... 中条件范围相同、条件为相邻单元格的多个 SUMIF/COUNTIF 合并为一个 SUM(SUMIFS(...))，返回新文本或None"""
+    if _version(target) < _version(RULES[RULE_SUM_IFS][1]):
+        return None
+    items = _significant(items)
+    if len(items) < 3 or len(items) % 2 == 0 or any(item != ("op", "+") for item in items[1::2]):
+        return None
+    terms = items[0::2]
+    groups = {}
+    for position, term in enumerate(terms):
+        if not isinstance(term, _Node) or term.rewritten or (term.name, len(term.parts)) not in (("SUMIF", 3),
+                                                                                                ("COUNTIF", 2)):
+            continue
+        cell = _single(term.parts[1], "ref")
+        ref = parse_reference(cell) if cell is not None and _CELL_RE.match(_split_sheet(cell)[1]) else None
+        if ref is None:
+            continue
+        key = (term.name,) + tuple(_text(part).strip().upper().replace(" ", "") for part in term.parts[::2])
+        groups.setdefault(key, []).append((position, ref, cell))
+    replaced = {}
+    for key, members in groups.items():
+        if len(members) < 2:
+            continue
+        cells = sorted(members, key=lambda member: (member[1].row0, member[1].col0))
+        merged = _merge_cells([cell for _, _, cell in cells])
+        if len(merged) != 1 or len({ref for _, ref, _ in cells}) != len(cells):
+            continue
+        first = terms[members[0][0]]
+        ranges = [_text(part).strip() for part in first.parts]
+        if first.name == "SUMIF":
+            after = f"SUM(SUMIFS({ranges[2]},{ranges[0]},{merged[0]}))"
+        else:
+            after = f"SUM(COUNTIFS({ranges[0]},{merged[0]}))"
+        before = "+".join(terms[position].text for position, _, _ in members)
+        rewrites.append(Rewrite(RULE_SUM_IFS, f"{first.name} x{len(members)}", before, after))
+        replaced[members[0][0]] = after
+        for position, _, _ in members[1:]:
+            replaced[position] = None
+    if not replaced:
+        return None
+    texts = [replaced.get(position, _text([term]).strip()) for position, term in enumerate(terms)]
+    return "+".join(text for text in texts if text is not None)
+
+
+@functools.lru_cache(maxsize=None)
+def _version(name):
+    return EXCEL_VERSIONS.index(name)
+
+
+def check_target(target):
+    """检查目标版本名称，无效时抛出ValueError"""
+    if target not in EXCEL_VERSIONS:
+        raise ValueError(f"unknown Excel version {target!r}, expected one of {', '.join(EXCEL_VERSIONS)}")
+    return target
+
+
+@functools.lru_cache(maxsize=1024)
+def optimize(formula, target):
+    """按目标版本 target（EXCEL_VERSIONS 之一）改写公式，返回 Optimization；无法解析时原样返回"""
+    check_target(target)
+    if not _TRIGGER_RE.search(formula):
+        return Optimization(formula, formula)
+    body = formula[1:] if formula.startswith("=") else formula
+    try:
+        root, closed = _build(iter_tokens(body))
+    except FormulaSyntaxError:
+        return Optimization(formula, formula)
+    rewrites = []
+    # 子节点先于父节点处理，父节点看到的是子节点改写后的文本
+    for node in closed:
+        texts = []
+        for part in node.parts:
+            text = _rewrite_sum(part, target, rewrites)
+            texts.append(text if text is not None else _text(part))
+        node.text = node.head + ",".join(texts) + ")"
+        rule = _CALL_RULES.get(node.name)
+        result = rule(node, target) if rule is not None else None
+        if result is not None:
+            rewrites.append(Rewrite(result[0], node.name, node.text, result[1]))
+            node.text = result[1]
+            node.rewritten = True
+    text = _rewrite_sum(root, target, rewrites)
+    if not rewrites:
+        return Optimization(formula, formula)
+    optimized = "=" + (text if text is not None else _text(root))
+    return Optimization(formula, optimized, tuple(rewrites))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+函数搜索（前缀树 + 二元组索引，逐键增量更新）
+Function search: prefix trie plus bigram index, updated incrementally per keystroke
+
+索引在创建时一次性建立，覆盖函数名（如 VLOOKUP）以及两种语言的显示名称和描述：
+    前缀树    函数名、名称和描述中每个词（中文为整段）的前缀，每个节点记录经过它的函数及最高权重
+    二元组    所有文本中相邻两个字符的倒排表，用于匹配词中间的片段和拼写错误
+FunctionSearch 保存每个已输入字符的状态：输入一个字符只需在前缀树上走一步，并合并一个二元组的倒排表；
+删除字符时弹出状态，不需要重新计算。每次按键的耗时与函数目录大小基本无关。
+The index is built once over the function keys (such as VLOOKUP) and the
+localized names and descriptions of every language pack: a prefix trie of
+every key, word and (for Chinese) phrase, where each node keeps the best
+weight of each function passing through it, and a bigram inverted index for
+fragments inside words and typos. FunctionSearch keeps one state per typed
+character, so a keystroke costs one trie step plus merging one bigram
+posting list, and backspace pops states instead of recomputing.
+"""
+
+import re
+
+from excel_function_maker.language import LANGUAGES
+
+# 匹配权重：完全等于函数名 > 函数名前缀 > 名称中的词 > 描述中的词 > 片段匹配
+WEIGHT_EXACT = 100
+WEIGHT_KEY = 90
+WEIGHT_NAME = 70
+WEIGHT_DESCRIPTION = 40
+# 片段匹配按命中的二元组比例计分，最高为此值
+WEIGHT_FRAGMENT = 30
+# 命中的二元组少于查询二元组的这个比例时不算匹配
+FRAGMENT_THRESHOLD = 0.6
+
+# 英文等按单词切分，中日韩文字按连续的一段切分
+_WORD_RE = re.compile(r"[^\W_]+|_")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text):
+    """搜索用的规范化文本：忽略大小写，连续空白合并为一个空格"""
+    return _SPACE_RE.sub(" ", text.casefold()).strip()
+
+
+def _words(text):
+    """文本中的词（下划线也作为分隔符，如 CHAR_COUNT 得到 char 和 count）"""
+    return [word for word in _WORD_RE.findall(text) if word != "_"]
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class _Node:
+    """前缀树节点"""
+
+    __slots__ = ("children", "weights")
+
+    def __init__(self):
+        self.children = {}
+        # 函数序号 -> 经过本节点的最高权重
+        self.weights = {}
+
+
+class FunctionIndex:
+    """函数目录的搜索索引"""
+
+    def __init__(self, lang_manager):
+        self.keys = list(lang_manager.catalog)
+        # 规范化的函数名 -> 序号（完全相等时排在最前）
+        self.keys_folded = {normalize(key): index for index, key in enumerate(self.keys)}
+        self.root = _Node()
+        # 二元组 -> 含有它的函数序号列表
+        self.bigrams = {}
+        tables = [lang_manager.get_function_table(language) for language in LANGUAGES]
+        for index, key in enumerate(self.keys):
+            folded = normalize(key)
+            self._insert(folded, index, WEIGHT_KEY)
+            # 带下划线的函数名也可以按去掉下划线的写法或其中的词查找
+            self._insert(folded.replace("_", ""), index, WEIGHT_KEY)
+            for word in _words(folded):
+                self._insert(word, index, WEIGHT_NAME)
+            texts = {folded}
+            for table in tables:
+                info = table[key]
+                name, description = normalize(info['name']), normalize(info['description'])
+                for word in _words(name):
+                    self._insert(word, index, WEIGHT_NAME)
+                for word in _words(description):
+                    self._insert(word, index, WEIGHT_DESCRIPTION)
+                texts.update((name, description))
+            grams = set()
+            for text in texts:
+                grams |= _bigrams(text)
+            for gram in grams:
+                self.bigrams.setdefault(gram, []).append(index)
+
+    def _insert(self, word, index, weight):
+        node = self.root
+        for ch in word:
+            node = node.children.get(ch) or node.children.setdefault(ch, _Node())
+            if node.weights.get(index, 0) < weight:
+                node.weights[index] = weight
+
+    def search(self, text, limit=None):
+        """一次性搜索，返回按匹配程度排序的函数名列表"""
+        return FunctionSearch(self).update(text, limit)
+
+
+class FunctionSearch:
+    """一个搜索框的增量搜索状态"""
+
+    def __init__(self, index):
+        self.index = index
+        self.text = ""
+        # 每个已输入字符一个状态：(前缀树节点或None, 本字符新增的二元组)
+        self._states = []
+        # 函数序号 -> 命中的查询二元组个数
+        self._counts = {}
+        self._gram_total = 0
+
+    def _push(self, ch):
+        previous = self.text[-1] if self.text else ""
+        node = self._states[-1][0] if self._states else self.index.root
+        node = node.children.get(ch) if node is not None else None
+        gram = previous + ch if previous else None
+        if gram is not None:
+            counts = self._counts
+            for function in self.index.bigrams.get(gram, ()):
+                counts[function] = counts.get(function, 0) + 1
+            self._gram_total += 1
+        self._states.append((node, gram))
+        self.text += ch
+
+    def _pop(self):
+        node, gram = self._states.pop()
+        if gram is not None:
+            counts = self._counts
+            for function in self.index.bigrams.get(gram, ()):
+                count = counts[function] - 1
+                if count:
+                    counts[function] = count
+                else:
+                    del counts[function]
+            self._gram_total -= 1
+        self.text = self.text[:-1]
+
+    def update(self, text, limit=None):
+        """把搜索框内容更新为 text，返回按匹配程度排序的函数名列表（text 为空时返回全部函数）"""
+        text = normalize(text)
+        common = 0
+        for old, new in zip(self.text, text):
+            if old != new:
+                break
+            common += 1
+        while len(self.text) > common:
+            self._pop()
+        for ch in text[common:]:
+            self._push(ch)
+        return self.results(limit)
+
+    def results(self, limit=None):
+        """当前输入的搜索结果"""
+        keys = self.index.keys
+        if not self.text:
+            return keys[:limit] if limit else list(keys)
+        node = self._states[-1][0]
+        scores = dict(node.weights) if node is not None else {}
+        if self.text in self.index.keys_folded:
+            scores[self.index.keys_folded[self.text]] = WEIGHT_EXACT
+        if self._gram_total:
+            minimum = FRAGMENT_THRESHOLD * self._gram_total
+            for function, count in self._counts.items():
+                if count >= minimum:
+                    score = WEIGHT_FRAGMENT * count / self._gram_total
+                    if scores.get(function, 0) < score:
+                        scores[function] = score
+        ranked = sorted(scores, key=lambda function: (-scores[function], function))
+        if limit:
+            ranked = ranked[:limit]
+        return [keys[function] for function in ranked]
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地公式服务（asyncio HTTP/1.1，TCP或Unix套接字）
+Local formula service: asyncio HTTP/1.1 over a TCP or Unix socket
+
+让不能操作Tk窗口的其他工具使用同一套生成规则：
+    POST /generate   {"function": "VLOOKUP", "params": ["John", "A1:D10", "3", "FALSE"]}
+                     -> {"formula": "=VLOOKUP(\"John\",A1:D10,3,FALSE)"}
+    POST /batch      {"items": [{"function": ..., "params": [...]} 或 [函数名, 参数...], ...]}
+                     -> {"formulas": [...], "errors": [{"index": 2, "error": "..."}]}
+    GET  /functions  -> {"functions": ["SUM", ...]}
+    GET  /health     -> {"status": "ok"}
+连接默认保持（keep-alive），同一连接上可以连续发送多个请求而不等待响应（pipelining），
+响应按请求顺序返回。单个公式和小批量在事件循环中直接生成；较大的批量请求原样交给工作进程，
+JSON解析、生成和编码都不会阻塞其他连接。
+Other tools get formulas from the same rules without a Tk window. Connections
+are kept alive and may pipeline requests; responses come back in request
+order. Single formulas and small batches are generated on the event loop;
+larger batch requests are handed to a worker process as raw bytes, so JSON
+parsing, generation and encoding never block other connections.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+
+from excel_function_maker import batch
+from excel_function_maker.engine import CHAR_COUNT_COMPAT, FormulaEngine
+from excel_function_maker.language import LanguageManager
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 请求体不超过这个字节数（约300条公式）的批量直接在事件循环中生成，更大的整个交给工作进程
+INLINE_BODY = 16 * 1024
+# 请求体上限（字节）
+MAX_BODY = 16 * 1024 * 1024
+# 请求头上限（字节）
+MAX_HEADER = 64 * 1024
+# 一个连接上已读取、尚未发送响应的请求数上限
+PIPELINE_DEPTH = 64
+# 空闲连接在这么多秒后关闭
+IDLE_TIMEOUT = 60
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error", 501: "Not Implemented",
+}
+
+
+class HttpError(Exception):
+    """以HTTP状态码返回给客户端的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_address(address):
+    """解析监听地址："unix:/path"、"HOST:PORT"、":PORT" 或 "PORT"，返回 (host, port) 或 ("unix", path)"""
+    if address.startswith("unix:"):
+        return "unix", address[5:]
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"invalid address {address!r}, expected HOST:PORT or unix:PATH")
+    return host.strip("[]") or DEFAULT_HOST, int(port)
+
+
+def _encode(payload):
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _decode(body):
+    """解析请求体中的JSON"""
+    try:
+        return json.loads(body) if body else None
+    except ValueError as e:
+        raise HttpError(400, f"invalid JSON: {e}")
+
+
+def _response(status, body, keep_alive=True):
+    """组装一个响应，body 为已编码的JSON"""
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n")
+    if not keep_alive:
+        head += "Connection: close\r\n"
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+def _generate_batch(payload, engine):
+    """批量生成；单条出错时该位置为null，错误列在 errors 中"""
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise HttpError(400, 'expected {"items": [...]}')
+    formulas, errors = batch.generate_records(items, engine)
+    return {"formulas": formulas, "errors": [{"index": index, "error": error} for index, error in errors]}
+
+
+def _batch_in_worker(body):
+    """工作进程中处理整个批量请求（解析、生成、编码都不占用事件循环），返回 (状态码, 响应体)"""
+    try:
+        return 200, _encode(_generate_batch(_decode(body), batch._worker_engine))
+    except HttpError as e:
+        return e.status, _encode({"error": str(e)})
+
+
+class _Request:
+    __slots__ = ("method", "path", "body", "keep_alive")
+
+    def __init__(self, method, path, body, keep_alive):
+        self.method = method
+        self.path = path
+        self.body = body
+        self.keep_alive = keep_alive
+
+
+async def _read_request(reader):
+    """读取一个请求，连接在请求之间关闭时返回None"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "incomplete request")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "request header too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    # HTTP/1.1 默认保持连接，HTTP/1.0 需要显式要求
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(501, "chunked request bodies are not supported; send Content-Length")
+    length = headers.get("content-length", "0")
+    if not length.isdigit():
+        raise HttpError(400, "invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HttpError(413, f"request body larger than {MAX_BODY} bytes")
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except asyncio.IncompleteReadError:
+        raise HttpError(400, "incomplete request body")
+    return _Request(method.upper(), target.split("?", 1)[0], body, keep_alive)
+
+
+class FormulaServer:
+    """本地公式服务；生成规则与图形界面和命令行相同"""
+
+    def __init__(self, lang_manager=None, char_count_mode=CHAR_COUNT_COMPAT, defined_names=(), workers=1,
+                 share_subexpressions=False, target=None):
+        """workers 为批量工作进程数，0 使用全部核心；target 为改写公式的目标Excel版本"""
+        self.engine = FormulaEngine(lang_manager, char_count_mode, defined_names, share_subexpressions, target)
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._routes = {
+            ("POST", "/generate"): self.handle_generate,
+            ("POST", "/batch"): self.handle_batch,
+            ("GET", "/functions"): self.handle_functions,
+            ("GET", "/health"): self.handle_health,
+        }
+
+    def _executor(self):
+        """批量工作进程池（第一次需要时创建，每个进程只创建一次生成引擎）
+
+        使用 spawn 方式启动：fork 出的进程会继承已打开的连接，父进程关闭连接后客户端仍收不到EOF。
+        """
+        if self._pool is None:
+            engine = self.engine
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=batch._init_batch_worker,
+                initargs=(engine.lang_manager.current_language, engine.char_count_mode,
+                          tuple(engine.defined_names), engine.share_subexpressions, engine.target))
+        return self._pool
+
+    async def handle_generate(self, body):
+        """生成单个公式"""
+        payload = _decode(body)
+        if not isinstance(payload, dict):
+            raise HttpError(400, 'expected {"function": ..., "params": [...]}')
+        formulas, errors = batch.generate_records([payload], self.engine)
+        if errors:
+            raise HttpError(400, errors[0][1])
+        return 200, _encode({"formula": formulas[0]})
+
+    async def handle_batch(self, body):
+        """批量生成：小请求直接生成，大请求整个交给工作进程"""
+        if len(body) <= INLINE_BODY:
+            return 200, _encode(_generate_batch(_decode(body), self.engine))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), _batch_in_worker, body)
+
+    async def handle_functions(self, body):
+        return 200, _encode({"functions": list(self.engine.lang_manager.get_functions())})
+
+    async def handle_health(self, body):
+        return 200, _encode({"status": "ok"})
+
+    async def respond(self, request):
+        """处理一个请求，返回完整的响应字节"""
+        try:
+            handler = self._routes.get((request.method, request.path))
+            if handler is None:
+                if any(path == request.path for _, path in self._routes):
+                    raise HttpError(405, f"method {request.method} not allowed")
+                raise HttpError(404, f"no such endpoint {request.path}")
+            status, body = await handler(request.body)
+            return _response(status, body, request.keep_alive)
+        except HttpError as e:
+            return _response(e.status, _encode({"error": str(e)}), request.keep_alive)
+        except Exception as e:
+            return _response(500, _encode({"error": f"{type(e).__name__}: {e}"}), request.keep_alive)
+
+    async def _send(self, pending, writer):
+        """按请求顺序写出响应；连接断开后丢弃剩余的响应"""
+        broken = False
+        while True:
+            task = await pending.get()
+            if task is None:
+                return
+            if broken:
+                task.cancel()
+                continue
+            try:
+                writer.write(await task)
+                await writer.drain()
+            except ConnectionError:
+                broken = True
+                writer.transport.abort()
+
+    async def handle_connection(self, reader, writer):
+        """一个连接：持续读取请求（不等待前面的响应），响应由发送任务按顺序写出"""
+        pending = asyncio.Queue(PIPELINE_DEPTH)
+        sender = asyncio.create_task(self._send(pending, writer))
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), IDLE_TIMEOUT)
+                except HttpError as e:
+                    await pending.put(_done(_response(e.status, _encode({"error": str(e)}), keep_alive=False)))
+                    break
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                await pending.put(asyncio.create_task(self.respond(request)))
+                if not request.keep_alive:
+                    break
+        finally:
+            await pending.put(None)
+            await sender
+            writer.close()
+
+    async def serve(self, address=f"{DEFAULT_HOST}:{DEFAULT_PORT}", ready=None):
+        """在 address 上监听直到被取消；ready 为回调时在开始监听后以实际地址调用"""
+        host, port = parse_address(address)
+        if host == "unix":
+            server = await asyncio.start_unix_server(self.handle_connection, port, limit=MAX_HEADER)
+            bound = f"unix:{port}"
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER)
+            sockname = server.sockets[0].getsockname()
+            bound = f"{sockname[0]}:{sockname[1]}"
+        try:
+            async with server:
+                if ready is not None:
+                    ready(bound)
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """关闭工作进程"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _done(result):
+    """已经完成的 future（用于不需要处理的错误响应）"""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return future
+
+
+def serve(address=f"{DEFAULT_HOST}:{DEFAULT_PORT}", lang_manager=None, char_count_mode=CHAR_COUNT_COMPAT,
+          defined_names=(), workers=1, ready=None, share_subexpressions=False, target=None):
+    """运行本地公式服务直到被中断（Ctrl+C）"""
+    server = FormulaServer(lang_manager if lang_manager is not None else LanguageManager(),
+                           char_count_mode, defined_names, workers, share_subexpressions, target)
+    try:
+        asyncio.run(server.serve(address, ready))
+    except KeyboardInterrupt:
+        pass
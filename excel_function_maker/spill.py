@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+溢出模式：把向下填充N行的公式写成一个动态数组公式
+Spill mode: one dynamic-array formula instead of one formula per row
+
+向下填充时随行移动的引用（A2、A2:C2 这类相对行号）展开为覆盖全部行的范围：
+    所有移动的引用都是单个单元格、且只用在逐元素计算的位置（IF、LEFT、运算符、SUMIF 的条件、
+    VLOOKUP 的查找值等）    -> 直接换成整列范围，=LEFT(A2:A1001,3)（Excel 2021+）
+    都是单个单元格，但用在会汇总的位置（SUMPRODUCT 等） -> MAP(A2:A1001,LAMBDA(cell_1,...))
+    只有一个移动的行范围    -> BYROW(A2:C1001,LAMBDA(row_1,...))
+    其他组合                 -> MAP(SEQUENCE(N),LAMBDA(index_1,...INDEX(A2:C1001,index_1,0)...))
+LAMBDA/MAP/BYROW 需要 Excel 2024 或 365。目标版本更旧、引用是会移动或扩大的多行范围（滑动窗口、累计）时
+不能溢出，调用方按行填充。
+References whose row moves when filled down (relative rows such as A2 or
+A2:C2) become ranges covering every row. Single cells used only where Excel
+computes element by element are simply widened (Excel 2021+); other shapes
+are wrapped in MAP or BYROW with a LAMBDA (Excel 2024/365). Older targets and
+moving or growing multi-row windows cannot spill, and the caller falls back
+to per-row formulas.
+"""
+
+import re
+
+from excel_function_maker.formula import MAX_ROWS, FormulaSyntaxError, iter_tokens
+from excel_function_maker.optimize import EXCEL_VERSIONS, check_target
+
+# 溢出方式
+SPILL_NATIVE = "native"
+SPILL_MAP = "map"
+SPILL_BYROW = "byrow"
+SPILL_INDEX = "index"
+
+# 溢出方式 -> 需要的最低版本
+SPILL_SINCE = {
+    SPILL_NATIVE: "2021",
+    SPILL_MAP: "2024",
+    SPILL_BYROW: "2024",
+    SPILL_INDEX: "2024",
+}
+
+# 不带参数时返回公式所在位置的函数
+_POSITIONAL = frozenset(["ROW", "COLUMN"])
+
+# 单个A1端点：可选的列（$A）和可选的行（$1）
+_ENDPOINT_RE = re.compile(r"(?:(\$?)([A-Za-z]{1,3}))?(?:(\$?)([0-9]+))?")
+
+# 逐元素计算的函数参数：函数名 -> 参数序号（None 表示全部参数）；数组放在这些位置时结果按元素溢出
+_ELEMENTWISE = {
+    "IF": None, "IFERROR": None, "IFNA": None, "NOT": None,
+    "LEFT": None, "RIGHT": None, "MID": None, "LEN": None, "UPPER": None, "LOWER": None, "PROPER": None,
+    "TRIM": None, "SUBSTITUTE": None, "REPLACE": None, "REPT": None, "TEXT": None, "VALUE": None,
+    "CONCATENATE": None, "FIND": None, "SEARCH": None, "EXACT": None,
+    "ABS": None, "INT": None, "MOD": None, "ROUND": None, "ROUNDUP": None, "ROUNDDOWN": None, "SIGN": None,
+    "SQRT": None, "POWER": None,
+    "ISBLANK": None, "ISNUMBER": None, "ISTEXT": None, "ISERROR": None, "ISNA": None,
+    "DATE": None, "YEAR": None, "MONTH": None, "DAY": None, "WEEKDAY": None, "EDATE": None, "EOMONTH": None,
+    "SUMIF": (1,), "COUNTIF": (1,), "AVERAGEIF": (1,),
+    "VLOOKUP": (0,), "HLOOKUP": (0,), "XLOOKUP": (0,), "MATCH": (0,),
+}
+
+
+class Spill:
+    """向下填充 rows 行的溢出结果：formula 为一个动态数组公式；不能溢出时为None，reason 说明原因"""
+
+    __slots__ = ("source", "rows", "formula", "mode", "reason")
+
+    def __init__(self, source, rows, formula=None, mode=None, reason=None):
+        self.source = source
+        self.rows = rows
+        self.formula = formula
+        self.mode = mode
+        self.reason = reason
+
+    @property
+    def since(self):
+        """需要的最低Excel版本（不能溢出时为None）"""
+        return SPILL_SINCE.get(self.mode)
+
+    def __repr__(self):
+        if self.formula is None:
+            return f"Spill({self.source!r}, rows={self.rows}, reason={self.reason!r})"
+        return f"Spill({self.formula!r}, mode={self.mode})"
+
+
+class _Unspillable(Exception):
+    """公式不能写成溢出公式（消息为原因）"""
+
+
+def _elementwise(name, index):
+    """函数 name 的第 index 个参数是否逐元素计算"""
+    if name in ("SUMIFS", "AVERAGEIFS"):
+        return index >= 2 and index % 2 == 0
+    if name == "COUNTIFS":
+        return index % 2 == 1
+    positions = _ELEMENTWISE.get(name, ())
+    return positions is None or index in positions
+
+
+def _spill_reference(text, count):
+    """随行移动的引用展开为覆盖 count 行的范围，返回 (范围文本, 是否单个单元格)；不移动的引用返回None"""
+    sheet, bang, area = text.rpartition("!")
+    ends = [_ENDPOINT_RE.fullmatch(end) for end in area.split(":")]
+    if not all(ends) or len(ends) > 2:
+        # R1C1 引用本身就是相对写法，没有可以展开的行号
+        return None
+    moving = [int(end.group(4)) for end in ends if end.group(4) and not end.group(3)]
+    if not moving:
+        return None
+    column_fixed, letters, row_fixed, digits = ends[-1].groups()
+    if len(ends) == 1:
+        if not letters:
+            return None
+    elif len(moving) != 2 or moving[0] != moving[1]:
+        raise _Unspillable(f"range {text} grows or moves by more than one row")
+    last = int(digits) + count - 1
+    if last > MAX_ROWS:
+        raise _Unspillable(f"{text} would move past row {MAX_ROWS:,}")
+    first = area if len(ends) == 1 else area.rpartition(":")[0]
+    return f"{sheet}{bang}{first}:{column_fixed or ''}{letters or ''}{last}", len(ends) == 1
+
+
+def _fresh_name(prefix, taken):
+    """不与公式中已有名称冲突的新名称"""
+    number = 1
+    while f"{prefix}{number}".upper() in taken:
+        number += 1
+    name = f"{prefix}{number}"
+    taken.add(name.upper())
+    return name
+
+
+def _spill(body, count):
+    """返回 (溢出公式文本（不带等号）, 溢出方式)；不能溢出时抛出 _Unspillable"""
+    tokens = list(iter_tokens(body))
+    # 移动的引用：大写文本 -> (展开的范围, 是否单元格)，保持出现顺序
+    moving = {}
+    # 出现位置 -> 引用的大写文本
+    positions = {}
+    native = True
+    # 未闭合的括号：[函数名（分组为None）, 当前参数序号]
+    stack = []
+    for index, (kind, text) in enumerate(tokens):
+        if kind == "func":
+            name = text.upper()
+            if name in _POSITIONAL and [kind for kind, _ in tokens[index + 2:index + 4] if kind != "ws"][:1] == ["rparen"]:
+                raise _Unspillable(f"{name}() depends on the row the formula is in")
+            stack.append([name, 0])
+        elif kind == "table":
+            if "@" in text or "#THIS ROW" in text.upper():
+                raise _Unspillable(f"{text} refers to the formula's own table row")
+        elif kind == "lparen":
+            if not (index and tokens[index - 1][0] == "func"):
+                stack.append([None, 0])
+        elif kind == "rparen":
+            if stack:
+                stack.pop()
+        elif kind == "comma":
+            if stack:
+                stack[-1][1] += 1
+        elif kind == "ref":
+            spilled = _spill_reference(text, count)
+            in_elementwise = all(name is None or _elementwise(name, arg) for name, arg in stack)
+            if spilled is None:
+                # 固定的多单元格范围放在逐元素位置时，展开后会与移动的引用混在一起计算
+                if in_elementwise and ":" in text:
+                    native = False
+                continue
+            moving.setdefault(text.upper(), spilled)
+            positions[index] = text.upper()
+            native = native and spilled[1] and in_elementwise
+    if not moving:
+        raise _Unspillable("no reference moves from row to row")
+    taken = {text.upper() for kind, text in tokens if kind in ("name", "func")}
+
+    def rewrite(replacements):
+        return "".join(replacements[positions[index]] if index in positions else text
+                       for index, (_, text) in enumerate(tokens)).strip()
+
+    if native:
+        return rewrite({key: spilled for key, (spilled, _) in moving.items()}), SPILL_NATIVE
+    if all(cell for _, cell in moving.values()):
+        names = {key: _fresh_name("cell_", taken) for key in moving}
+        arrays = ",".join(spilled for spilled, _ in moving.values())
+        return f"MAP({arrays},LAMBDA({','.join(names.values())},{rewrite(names)}))", SPILL_MAP
+    if len(moving) == 1:
+        (key, (spilled, _)), = moving.items()
+        name = _fresh_name("row_", taken)
+        return f"BYROW({spilled},LAMBDA({name},{rewrite({key: name})}))", SPILL_BYROW
+    name = _fresh_name("index_", taken)
+    rows = {key: f"INDEX({spilled},{name},0)" for key, (spilled, _) in moving.items()}
+    return f"MAP(SEQUENCE({count}),LAMBDA({name},{rewrite(rows)}))", SPILL_INDEX
+
+
+def spill_down(formula, count, target=None):
+    """把 formula 向下填充 count 行写成一个溢出公式，返回 Spill
+
+    target 为目标Excel版本（EXCEL_VERSIONS 之一，None 表示最新）；版本不支持时 Spill.formula 为None。
+    """
+    if target is not None:
+        check_target(target)
+    if count < 2:
+        return Spill(formula, count, reason="a single row has nothing to spill")
+    if target is not None and EXCEL_VERSIONS.index(target) < EXCEL_VERSIONS.index(SPILL_SINCE[SPILL_NATIVE]):
+        return Spill(formula, count, reason=f"Excel {target} has no dynamic arrays")
+    body = formula[1:] if formula.startswith("=") else formula
+    try:
+        spilled, mode = _spill(body, count)
+    except FormulaSyntaxError as e:
+        return Spill(formula, count, reason=f"cannot parse formula: {e}")
+    except _Unspillable as e:
+        return Spill(formula, count, reason=str(e))
+    since = SPILL_SINCE[mode]
+    if target is not None and EXCEL_VERSIONS.index(target) < EXCEL_VERSIONS.index(since):
+        return Spill(formula, count, reason=f"needs LAMBDA (Excel {since}/365)")
+    return Spill(formula, count, "=" + spilled, mode)
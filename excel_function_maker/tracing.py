@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能跟踪：命名的耗时区间、计数器和延迟直方图，可导出为 Chrome trace JSON
+Tracing: named spans, counters and latency histograms, exported as Chrome trace JSON
+
+各阶段用 with TRACER.span("engine.format"): 包围。关闭时（默认）span() 返回共用的空对象，
+不读取时钟也不分配内存；生成公式这样的热点路径只检查一次 TRACER.enabled。
+打开后每个区间计入同名的直方图（对数分桶，每个2倍区间分4档），并保存最近 MAX_EVENTS 个事件，
+导出的JSON可以在 chrome://tracing 或 https://ui.perfetto.dev 中查看。
+Stages are wrapped in `with TRACER.span("engine.format"):`. While disabled
+(the default) span() returns a shared no-op object, so no clock is read and
+nothing is allocated; hot paths such as formula generation only test
+TRACER.enabled once. When enabled, every span feeds a log-bucketed histogram
+(four buckets per doubling) under its name, and the most recent MAX_EVENTS
+spans are kept for export. The JSON opens in chrome://tracing or
+https://ui.perfetto.dev.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+# 保存的事件个数上限（更早的事件丢弃，直方图和计数器不受影响）
+MAX_EVENTS = 100000
+
+
+class Histogram:
+    """耗时直方图（纳秒）：按2的幂分桶，每个桶再分4档，百分位误差不超过25%"""
+
+    __slots__ = ("count", "total", "min", "max", "_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._buckets = {}
+
+    @staticmethod
+    def _bucket(ns):
+        """桶序号：小于8纳秒时为值本身，否则按最高3位（指数和2位小数）"""
+        if ns < 8:
+            return ns
+        shift = ns.bit_length() - 3
+        return (shift << 2) + (ns >> shift)
+
+    @staticmethod
+    def _upper(bucket):
+        """桶的上界（纳秒）"""
+        if bucket < 8:
+            return bucket
+        shift, top = divmod(bucket - 4, 4)
+        return (top + 5) << shift
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        bucket = self._bucket(ns)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """百分位（纳秒，所在桶的上界，不超过最大值）"""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(self._upper(bucket), self.max)
+        return self.max
+
+    def as_dict(self):
+        """统计结果（微秒）"""
+        return {
+            "count": self.count,
+            "total_us": self.total / 1000,
+            "mean_us": self.total / self.count / 1000 if self.count else 0.0,
+            "min_us": (self.min or 0) / 1000,
+            "p50_us": self.percentile(0.5) / 1000,
+            "p90_us": self.percentile(0.9) / 1000,
+            "p99_us": self.percentile(0.99) / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class _NullSpan:
+    """关闭跟踪时使用的空区间"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """一个计时区间；set() 可以在区间内补充导出到事件中的参数"""
+
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._finish(self.name, self.start, end, self.args)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    """跟踪器：enabled 为False时所有记录都是空操作"""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+        self.events = collections.deque(maxlen=max_events)
+        # 因超过事件上限被丢弃的事件数
+        self.dropped = 0
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """清空计数器、直方图和事件（不改变是否启用）"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.events.clear()
+            self.dropped = 0
+            self._origin = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        """计时区间（上下文管理器），名称的第一段（点之前）作为导出的类别"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, value=1):
+        """计数器加 value"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name, start, end, **args):
+        """记录一个已知起止时间（perf_counter_ns）的区间，用于跨线程的等待时间"""
+        if self.enabled:
+            self._finish(name, start, end, args)
+
+    def _finish(self, name, start, end, args):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(end - start)
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append((name, start, end, threading.get_ident(), args))
+
+    def snapshot(self):
+        """计数器和各区间的统计（可直接转为JSON）"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "spans": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+                "dropped_events": self.dropped,
+            }
+
+    def summary(self):
+        """文本报表：每个区间一行（次数、平均、p50/p90/p99、最大、合计），随后是计数器"""
+        snapshot = self.snapshot()
+        lines = [f"{'span':24} {'count':>8} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'total':>10}"]
+        for name, stats in snapshot["spans"].items():
+            lines.append(f"{name:24} {stats['count']:>8,} " + " ".join(
+                _duration(stats[key]) for key in ("mean_us", "p50_us", "p90_us", "p99_us", "max_us"))
+                + f" {_duration(stats['total_us']):>10}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:24} {value:>8,}")
+        if snapshot["dropped_events"]:
+            lines.append(f"({snapshot['dropped_events']:,} oldest events dropped from the trace; statistics are complete)")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Chrome trace（JSON对象格式）：每个区间一个完整事件（ph "X"），统计放在 otherData 中"""
+        pid = os.getpid()
+        with self._lock:
+            origin = self._origin
+            events = [{"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                       "ts": (start - origin) / 1000, "dur": (end - start) / 1000, "args": args}
+                      for name, start, end, tid, args in self.events]
+            counters = dict(self.counters)
+        # 计数器的最终值也作为计数事件导出，在时间线上可见
+        end = max((event["ts"] + event["dur"] for event in events), default=0.0)
+        events.extend({"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": end, "args": {"value": value}}
+                      for name, value in sorted(counters.items()))
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.snapshot()}
+
+    def export(self, path):
+        """把 Chrome trace 写入文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False, default=str)
+
+
+def _duration(us):
+    """微秒数的简短文本"""
+    if us >= 1000000:
+        return f"{us / 1000000:7.2f} s"
+    if us >= 1000:
+        return f"{us / 1000:6.2f} ms"
+    return f"{us:6.1f} us"
+
+
+# 全进程共用的跟踪器
+TRACER = Tracer()
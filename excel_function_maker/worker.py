@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务：在工作线程中生成公式和预览，结果回到界面线程分发
+Background jobs: formulas and previews run on a worker thread, results are
+delivered back on the UI thread
+
+界面线程用 submit() 提交任务后立即返回；工作线程按顺序执行，完成的任务放入队列，
+由界面线程用 root.after 定时调用 poll() 取出并调用回调（Tk 控件只在界面线程中访问）。
+同一 key 的新任务会取代旧任务：尚未开始的旧任务不再执行，正在执行的旧任务结果被丢弃。
+只有存在未完成的任务时才轮询；on_busy 在开始忙碌和全部完成时调用。
+The UI thread submits a job and returns at once; the worker runs jobs in
+order and queues the finished ones, and poll(), scheduled with root.after,
+hands them to their callbacks on the UI thread (Tk widgets are only touched
+there). A new job with the same key supersedes the old one: if it has not
+started it never runs, and if it is running its result is dropped. Polling
+only happens while jobs are outstanding; on_busy is called when work starts
+and when everything has finished.
+"""
+
+import queue
+import threading
+import time
+
+from excel_function_maker.tracing import TRACER
+
+# 有未完成任务时的轮询间隔（毫秒）
+POLL_INTERVAL = 15
+
+
+class Job:
+    """一个后台任务；cancelled 为True时不会执行，已执行的结果也不分发"""
+
+    __slots__ = ("key", "function", "args", "on_result", "on_error", "submitted",
+                 "cancelled", "result", "error")
+
+    def __init__(self, key, function, args, on_result, on_error):
+        self.key = key
+        self.function = function
+        self.args = args
+        self.on_result = on_result
+        self.on_error = on_error
+        self.submitted = time.perf_counter_ns()
+        self.cancelled = False
+        self.result = None
+        self.error = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        """在工作线程中执行（已取消的任务跳过）"""
+        if self.cancelled:
+            return
+        try:
+            self.result = self.function(*self.args)
+        except Exception as e:
+            self.error = e
+
+
+class BackgroundRunner:
+    """单个工作线程的任务执行器；root 只需要提供 after/after_cancel（tk.Tk）"""
+
+    def __init__(self, root, on_busy=None, interval=POLL_INTERVAL):
+        self.root = root
+        self.on_busy = on_busy
+        self.interval = interval
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        # key -> 最新提交的任务
+        self._latest = {}
+        self._pending = 0
+        self._after_id = None
+        self._thread = None
+
+    @property
+    def busy(self):
+        """是否还有未完成的任务"""
+        return self._pending > 0
+
+    def submit(self, key, function, args=(), on_result=None, on_error=None):
+        """提交任务（界面线程），取代同一 key 的旧任务，返回 Job"""
+        self.cancel(key)
+        job = self._latest[key] = Job(key, function, args, on_result, on_error)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work_loop, name="gui-worker", daemon=True)
+            self._thread.start()
+        self._pending += 1
+        self._jobs.put(job)
+        if self._pending == 1:
+            if self.on_busy is not None:
+                self.on_busy(True)
+            self._after_id = self.root.after(self.interval, self.poll)
+        return job
+
+    def cancel(self, key):
+        """取消 key 的任务（结果不再分发）"""
+        job = self._latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def _work_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job.run()
+            self._done.put(job)
+
+    def poll(self):
+        """分发已完成的任务（界面线程）；还有未完成的任务时继续轮询"""
+        self._after_id = None
+        while True:
+            try:
+                job = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if job.cancelled:
+                TRACER.count("worker.superseded")
+                continue
+            del self._latest[job.key]
+            if TRACER.enabled:
+                # 从提交到结果回到界面线程的时间（包括排队等待）
+                TRACER.record(f"worker.{job.key}", job.submitted, time.perf_counter_ns())
+            if job.error is not None:
+                if job.on_error is not None:
+                    job.on_error(job.error)
+            elif job.on_result is not None:
+                job.on_result(job.result)
+        if self._pending:
+            self._after_id = self.root.after(self.interval, self.poll)
+        elif self.on_busy is not None:
+            self.on_busy(False)
+
+    def close(self):
+        """取消所有任务并停止工作线程（不等待正在执行的任务）"""
+        for key in list(self._latest):
+            self.cancel(key)
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread = None
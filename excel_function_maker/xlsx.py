@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 .xlsx 写入（只用标准库）
+Streaming .xlsx writer using only the standard library (zipfile + incremental XML)
+
+工作表XML逐行生成并分块压缩写入zip，内存占用与行数无关，百万行也不需要整表驻留内存。
+以 = 开头的字符串写为公式（不带缓存值，Excel打开时重新计算），数字和布尔值写为值，
+其他字符串写为内联文本；NaN 和无穷大写为 #NUM! 错误值。
+文件中 Excel 2010 以后新增的函数要写成 _xlfn.XLOOKUP 的形式，LET/LAMBDA 的参数名写成 _xlpm.rng，
+否则 Excel 打开时显示 #NAME?；公式在写入时自动加上这些前缀。
+Worksheet XML is generated row by row and compressed into the zip in chunks, so
+memory use does not grow with the number of rows. Strings starting with "=" are
+written as formulas (without cached values; Excel recalculates on open),
+numbers and booleans as values, other strings as inline text, and NaN or
+infinity as a #NUM! error. In the file format, functions added after Excel
+2007 are stored as _xlfn.XLOOKUP and LET/LAMBDA parameter names as
+_xlpm.rng, or Excel shows #NAME?; formulas get these prefixes on write.
+"""
+
+import math
+import re
+import zipfile
+
+from excel_function_maker.formula import MAX_COLUMNS, MAX_ROWS, FormulaSyntaxError, column_letters, iter_tokens
+
+# 每累计这么多行写入一次压缩流
+FLUSH_ROWS = 4096
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>')
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>')
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '<calcPr fullCalcOnLoad="1"/>'
+    '</workbook>')
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>')
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+# 工作表名不能包含的字符
+_INVALID_SHEET_CHARS = frozenset('[]:*?/\\')
+
+# Excel 2007 以后新增、在文件中要加 _xlfn. 前缀的函数
+FUTURE_FUNCTIONS = frozenset("""
+    AGGREGATE BETA.DIST BETA.INV BINOM.DIST BINOM.INV CEILING.PRECISE CHISQ.DIST CHISQ.DIST.RT CHISQ.INV
+    CHISQ.INV.RT CHISQ.TEST CONFIDENCE.NORM CONFIDENCE.T COVARIANCE.P COVARIANCE.S ERF.PRECISE ERFC.PRECISE
+    EXPON.DIST F.DIST F.DIST.RT F.INV F.INV.RT F.TEST FLOOR.PRECISE GAMMA.DIST GAMMA.INV GAMMALN.PRECISE
+    HYPGEOM.DIST LOGNORM.DIST LOGNORM.INV MODE.MULT MODE.SNGL NEGBINOM.DIST NETWORKDAYS.INTL NORM.DIST NORM.INV
+    NORM.S.DIST NORM.S.INV PERCENTILE.EXC PERCENTILE.INC PERCENTRANK.EXC PERCENTRANK.INC POISSON.DIST
+    QUARTILE.EXC QUARTILE.INC RANK.AVG RANK.EQ STDEV.P STDEV.S T.DIST T.DIST.2T T.DIST.RT T.INV T.INV.2T T.TEST
+    VAR.P VAR.S WEIBULL.DIST WORKDAY.INTL
+    ACOT ACOTH ARABIC BASE BINOM.DIST.RANGE BITAND BITLSHIFT BITOR BITRSHIFT BITXOR CEILING.MATH COMBINA COT
+    COTH CSC CSCH DAYS DECIMAL ENCODEURL FILTERXML FLOOR.MATH FORMULATEXT GAMMA GAUSS IFNA IMCOSH IMCOT IMCSC
+    IMCSCH IMSEC IMSECH IMSINH IMTAN ISFORMULA ISOWEEKNUM MUNIT NUMBERVALUE PDURATION PERMUTATIONA PHI RRI SEC
+    SECH SHEET SHEETS SKEW.P UNICHAR UNICODE WEBSERVICE XOR
+    CONCAT FORECAST.ETS FORECAST.ETS.CONFINT FORECAST.ETS.SEASONALITY FORECAST.ETS.STAT FORECAST.LINEAR IFS
+    MAXIFS MINIFS SWITCH TEXTJOIN
+    XLOOKUP XMATCH LET SEQUENCE SORTBY UNIQUE RANDARRAY
+    LAMBDA MAP BYROW BYCOL REDUCE SCAN MAKEARRAY ISOMITTED TEXTBEFORE TEXTAFTER TEXTSPLIT VSTACK HSTACK TOCOL
+    TOROW WRAPROWS WRAPCOLS TAKE DROP CHOOSECOLS CHOOSEROWS EXPAND ARRAYTOTEXT VALUETOTEXT
+""".split())
+# 动态数组中这两个函数的前缀是 _xlfn._xlws.
+_WORKSHEET_FUNCTIONS = frozenset(["FILTER", "SORT"])
+# 声明参数名的函数：LET 的奇数位置参数（最后一个除外）、LAMBDA 除最后一个以外的参数
+_PARAMETER_FUNCTIONS = frozenset(["LET", "LAMBDA"])
+# 公式中的函数调用（函数名和左括号之间不能有空格），用于快速判断是否需要加前缀
+_CALL_RE = re.compile(r"[A-Za-z_][\w.]*\(")
+_PREFIXED_CALLS = frozenset(name + "(" for name in FUTURE_FUNCTIONS | _WORKSHEET_FUNCTIONS)
+# 文件中的前缀（字符串常量中的文本原样保留）
+_STORED_PREFIX_RE = re.compile(r'("(?:[^"]|"")*")|(?<![\w.])_xl(?:fn\.(?:_xlws\.)?|pm\.)', re.IGNORECASE)
+
+
+def _escape(text):
+    """XML元素文本转义（公式中常见的双引号在元素文本里不需要转义）"""
+    if "&" in text or "<" in text or ">" in text:
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return text
+
+
+def _escape_attribute(text):
+    """XML属性值转义"""
+    return _escape(text).replace('"', "&quot;")
+
+
+def storage_formula(formula):
+    """公式在文件中的写法（不带等号）：新增函数加 _xlfn. 前缀，LET/LAMBDA 的参数名加 _xlpm. 前缀"""
+    body = formula[1:] if formula.startswith("=") else formula
+    if "(" not in body or _PREFIXED_CALLS.isdisjoint(map(str.upper, _CALL_RE.findall(body))):
+        return body
+    try:
+        tokens = list(iter_tokens(body))
+    except FormulaSyntaxError:
+        # 无法分析的公式原样写入，由 Excel 打开时报告
+        return body
+    parts = []
+    # 未闭合的括号：[函数名（分组为None）, 当前参数序号, 在这里声明的参数名]
+    stack = []
+    function = None
+    for index, (kind, text) in enumerate(tokens):
+        if kind == "func":
+            function = text.upper()
+            if function in _WORKSHEET_FUNCTIONS:
+                text = "_xlfn._xlws." + text
+            elif function in FUTURE_FUNCTIONS:
+                text = "_xlfn." + text
+        elif kind == "lparen":
+            stack.append([function, 0, set()])
+            function = None
+        elif kind == "rparen":
+            if stack:
+                stack.pop()
+        elif kind == "comma":
+            if stack:
+                stack[-1][1] += 1
+        elif kind == "name":
+            name = text.upper()
+            if stack and stack[-1][0] in _PARAMETER_FUNCTIONS and _declares(tokens, index, stack[-1]):
+                stack[-1][2].add(name)
+                text = "_xlpm." + text
+            elif any(name in declared for _, _, declared in stack):
+                text = "_xlpm." + text
+        parts.append(text)
+    return "".join(parts)
+
+
+def display_formula(stored):
+    """storage_formula 的逆操作：去掉文件中的 _xlfn.、_xlfn._xlws. 和 _xlpm. 前缀"""
+    if "_xl" not in stored.lower():
+        return stored
+    return _STORED_PREFIX_RE.sub(lambda match: match.group(1) or "", stored)
+
+
+def _declares(tokens, index, scope):
+    """tokens[index] 的名称是否是 LET/LAMBDA 声明的参数名（后面还有参数，LET 中位于奇数位置）"""
+    following = next((kind for kind, _ in tokens[index + 1:] if kind != "ws"), None)
+    if following != "comma":
+        return False
+    function, argument, _ = scope
+    return function == "LAMBDA" or argument % 2 == 0
+
+
+def _number(ref, value):
+    """数字单元格；NaN 和无穷大在 Excel 中不能作为数值，写为 #NUM! 错误值"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return f'<c r="{ref}" t="e"><v>#NUM!</v></c>'
+    return f'<c r="{ref}"><v>{value!r}</v></c>'
+
+
+def _cell(ref, value, formulas=True):
+    """单个单元格的XML，空值返回空字符串"""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, str):
+        if formulas and value.startswith("=") and len(value) > 1:
+            return f'<c r="{ref}"><f>{_escape(storage_formula(value))}</f></c>'
+        space = ' xml:space="preserve"' if value[0].isspace() or value[-1].isspace() else ""
+        return f'<c r="{ref}" t="inlineStr"><is><t{space}>{_escape(value)}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return _number(ref, value)
+    return _cell(ref, str(value), formulas)
+
+
+class XlsxWriter:
+    """逐行写入只有一个工作表的 .xlsx 文件（可用作上下文管理器）"""
+
+    def __init__(self, path, sheet_name="Sheet1", compresslevel=1, formulas=True):
+        """formulas 为False时所有字符串都写为文本（如报告中的公式原文）"""
+        if not sheet_name or len(sheet_name) > 31 or _INVALID_SHEET_CHARS.intersection(sheet_name):
+            raise ValueError(f"invalid sheet name {sheet_name!r}")
+        self.path = path
+        self.formulas = formulas
+        self.rows = 0
+        self._buffer = []
+        self._columns = []
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        try:
+            self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+            self._zip.writestr("_rels/.rels", _ROOT_RELS)
+            self._zip.writestr("xl/workbook.xml", _WORKBOOK.format(name=_escape_attribute(sheet_name)))
+            self._zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+            # 工作表数据最后写入，以流的方式压缩
+            self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+            self._sheet.write(_SHEET_HEAD.encode("utf-8"))
+        except BaseException:
+            self._zip.close()
+            raise
+
+    def _ensure_columns(self, count):
+        """列字母缓存扩充到 count 列"""
+        if count > MAX_COLUMNS:
+            raise ValueError(f"too many columns (Excel limit is {MAX_COLUMNS})")
+        columns = self._columns
+        while len(columns) < count:
+            columns.append(column_letters(len(columns)))
+        return columns
+
+    def write_row(self, values):
+        """写入一行（values 为单元格值序列，从A列开始）"""
+        if self.rows >= MAX_ROWS:
+            raise ValueError(f"too many rows (Excel limit is {MAX_ROWS:,})")
+        self.rows = row = self.rows + 1
+        values = tuple(values)
+        columns = self._columns
+        if len(values) > len(columns):
+            columns = self._ensure_columns(len(values))
+        parts = [f'<row r="{row}">']
+        for column, value in zip(columns, values):
+            # 公式是最常见的情况，直接拼接
+            if value.__class__ is str and value.startswith("=") and len(value) > 1 and self.formulas:
+                parts.append(f'<c r="{column}{row}"><f>{_escape(storage_formula(value))}</f></c>')
+            else:
+                parts.append(_cell(f"{column}{row}", value, self.formulas))
+        parts.append("</row>")
+        self._buffer.append("".join(parts))
+        if len(self._buffer) >= FLUSH_ROWS:
+            self.flush()
+
+    def write_rows(self, rows):
+        """依次写入多行，返回写入的行数"""
+        start = self.rows
+        for values in rows:
+            self.write_row(values)
+        return self.rows - start
+
+    def flush(self):
+        """把缓冲的行写入压缩流"""
+        if self._buffer:
+            self._sheet.write("".join(self._buffer).encode("utf-8"))
+            self._buffer.clear()
+
+    def close(self):
+        """写完工作表并关闭文件"""
+        if self._zip is None:
+            return
+        try:
+            self.flush()
+            self._sheet.write(_SHEET_TAIL.encode("utf-8"))
+            self._sheet.close()
+        finally:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_formulas(path, formulas, sheet_name="Sheet1"):
+    """把公式逐个写入A列，返回写入的行数"""
+    with XlsxWriter(path, sheet_name) as writer:
+        return writer.write_rows((formula,) for formula in formulas)
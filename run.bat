@@ -11,8 +11,8 @@ if %errorlevel% neq 0 (
     echo Error: Python not found!
     echo 错误：未找到Python！
     echo.
-    echo Please install Python 3.6+ from https://python.org
-    echo 请从 https://python.org 安装Python 3.6+
+    echo Please install Python 3.7+ from https://python.org
+    echo 请从 https://python.org 安装Python 3.7+
     pause
     exit /b 1
 )
@@ -38,7 +38,7 @@ echo Starting Excel Function Maker...
 echo 正在启动Excel函数制作器...
 echo.
 
-python excel_function_maker.py
+python -m excel_function_maker
 
 if %errorlevel% neq 0 (
     echo.
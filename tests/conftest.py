@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""测试共用的夹具：代替 Tk 主循环的定时器"""
+
+import itertools
+import time
+
+import pytest
+
+
+class FakeRoot:
+    """代替 tk.Tk 的 after/after_cancel；advance() 推进时间并按到期顺序执行回调"""
+
+    def __init__(self):
+        self.now = 0
+        self._timers = {}
+        self._order = itertools.count()
+
+    def after(self, delay, callback, *args):
+        after_id = f"after#{next(self._order)}"
+        self._timers[after_id] = (self.now + delay, after_id, callback, args)
+        return after_id
+
+    def after_cancel(self, after_id):
+        self._timers.pop(after_id, None)
+
+    @property
+    def pending(self):
+        return len(self._timers)
+
+    def advance(self, ms):
+        """推进 ms 毫秒，执行期间到期的回调（包括回调中新安排的）"""
+        end = self.now + ms
+        while True:
+            due = [timer for timer in self._timers.values() if timer[0] <= end]
+            if not due:
+                break
+            when, after_id, callback, args = min(due, key=lambda timer: (timer[0], int(timer[1][6:])))
+            del self._timers[after_id]
+            self.now = when
+            callback(*args)
+        self.now = end
+
+    def wait(self, predicate, timeout=5.0, step=15):
+        """推进时间直到 predicate() 为真（工作线程中的任务需要真实时间完成）"""
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                raise AssertionError("timed out waiting for the worker")
+            time.sleep(0.001)
+            self.advance(step)
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""工作簿公式审计：按目录检查公式、流式读取工作表、改写副本"""
+
+import zipfile
+
+import pytest
+
+from excel_function_maker.audit import AUDIT_MISMATCH, AUDIT_OK, AUDIT_STYLE, FormulaAuditor, audit_workbooks, \
+    rewrite_workbook
+from excel_function_maker.engine import CHAR_COUNT_LET, FormulaEngine
+from excel_function_maker.xlsx import write_formulas
+
+FORMULAS = [
+    "=SUM(A1:A10)",
+    "=sum( A1:A10 )",
+    "=SUMIF(A1:A10,apple)",
+    "=A1+1",
+    '=VLOOKUP("x",A:B,2,FALSE)',
+    "=sum( A3:A12 )",
+]
+
+
+@pytest.fixture(scope="module")
+def auditor():
+    return FormulaAuditor()
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("=SUM(A1:A10)", (AUDIT_OK, "SUM", "=SUM(A1:A10)")),
+    ("sum( A1:A10 )", (AUDIT_STYLE, "SUM", "=SUM(A1:A10)")),
+    ("=SUMIF(A1:A10,apple)", (AUDIT_MISMATCH, "SUMIF", '=SUMIF(A1:A10,"apple")')),
+    ('=COUNTIF(A:A,"x")', (AUDIT_OK, "COUNTIF", '=COUNTIF(A:A,"x")')),
+    ("=A1+1", None),
+    ("=SUM(A1:A10)+1", None),
+])
+def test_check(auditor, formula, expected):
+    assert auditor.check(formula) == expected
+
+
+@pytest.mark.parametrize("engine", [FormulaEngine(), FormulaEngine(char_count_mode=CHAR_COUNT_LET)])
+def test_char_count_formulas_are_recognized(auditor, engine):
+    formula = engine.generate("CHAR_COUNT", ["A1:C1", "a", "b"])
+    assert auditor.check(formula)[:2] == (AUDIT_OK, "CHAR_COUNT")
+
+
+def test_filled_column_reuses_the_first_verdict(auditor):
+    assert auditor.check_cell("=sum( B1:B10 )", 1, 0) == (AUDIT_STYLE, "SUM", "=SUM(B1:B10)")
+    assert auditor.check_cell("=sum( B5:B14 )", 5, 0) == (AUDIT_STYLE, "SUM", "=SUM(B5:B14)")
+    assert auditor.check_cell("=sum( $B$1:B9 )", 9, 0) == (AUDIT_STYLE, "SUM", "=SUM($B$1:B9)")
+
+
+def test_audit_and_rewrite_workbook(tmp_path):
+    path = tmp_path / "book.xlsx"
+    write_formulas(str(path), FORMULAS)
+    results = list(audit_workbooks([str(tmp_path)]))
+    assert len(results) == 1
+    result = results[0]
+    assert (result.sheet, result.formulas, result.error) == ("Sheet1", len(FORMULAS), None)
+    assert result.counts == {AUDIT_OK: 2, AUDIT_STYLE: 2, AUDIT_MISMATCH: 1}
+    assert [(cell, status) for cell, status, _, _, _ in result.findings] == \
+        [("A2", AUDIT_STYLE), ("A3", AUDIT_MISMATCH), ("A6", AUDIT_STYLE)]
+
+    fixes = {cell: suggestion for cell, (status, suggestion) in result.fixes.items() if status == AUDIT_STYLE}
+    out = tmp_path / "fixed" / "book.xlsx"
+    out.parent.mkdir()
+    assert rewrite_workbook(str(path), str(out), {result.part: fixes}) == 2
+    rewritten = next(audit_workbooks([str(out)]))
+    assert rewritten.counts == {AUDIT_OK: 4, AUDIT_STYLE: 0, AUDIT_MISMATCH: 1}
+    with zipfile.ZipFile(out) as zf:
+        assert b'fullCalcOnLoad="1"' in zf.read("xl/workbook.xml")
+
+
+def test_parallel_audit_matches_serial(tmp_path):
+    for i in range(3):
+        write_formulas(str(tmp_path / f"book{i}.xlsx"), FORMULAS[i:])
+    serial = [(r.path, r.counts) for r in audit_workbooks([str(tmp_path)])]
+    parallel = [(r.path, r.counts) for r in audit_workbooks([str(tmp_path)], workers=2)]
+    assert parallel == serial
+
+
+def test_unreadable_workbook_is_reported(tmp_path):
+    (tmp_path / "broken.xlsx").write_bytes(b"not a zip file")
+    errors = []
+    assert list(audit_workbooks([str(tmp_path)], errors=errors)) == []
+    assert len(errors) == 1 and errors[0][0].endswith("broken.xlsx")
+
+
+def test_prefixed_formulas_written_by_this_tool(tmp_path):
+    formula = FormulaEngine(char_count_mode=CHAR_COUNT_LET).generate("CHAR_COUNT", ["A1:C1", "a", "b"])
+    path = tmp_path / "book.xlsx"
+    write_formulas(str(path), FORMULAS[:3] + [formula, formula.replace("SUMPRODUCT", "sumproduct")])
+    result = next(audit_workbooks([str(path)]))
+    assert result.counts == {AUDIT_OK: 2, AUDIT_STYLE: 2, AUDIT_MISMATCH: 1}
+    assert [(cell, name) for cell, _, name, _, _ in result.findings][-1] == ("A5", "CHAR_COUNT")
+
+    fixes = {cell: suggestion for cell, (status, suggestion) in result.fixes.items() if status == AUDIT_STYLE}
+    out = tmp_path / "fixed.xlsx"
+    assert rewrite_workbook(str(path), str(out), {result.part: fixes}) == 2
+    with zipfile.ZipFile(out) as zf:
+        assert zf.read(result.part).count(b"<f>_xlfn.LET(_xlpm.rng,A1:C1,_xlpm.total,") == 2
+    assert next(audit_workbooks([str(out)])).counts == {AUDIT_OK: 4, AUDIT_STYLE: 0, AUDIT_MISMATCH: 1}
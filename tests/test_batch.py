@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""批量生成：CSV/JSONL 输入、多进程按顺序输出、行号和出错记录"""
+
+import io
+
+import pytest
+
+from excel_function_maker.batch import generate_batch, generate_batch_parallel, generate_records, iter_line_chunks, \
+    read_spec_rows
+
+
+def generate(text, fmt="csv"):
+    return list(generate_batch(read_spec_rows(io.StringIO(text), fmt)))
+
+
+def test_csv_rows():
+    assert generate("function,p1,p2\nSUM,A1:A10\n\nleft,hello,3\n") == ["=SUM(A1:A10)", '=LEFT("hello",3)']
+
+
+def test_jsonl_rows():
+    text = ('{"function": "SUM", "params": ["A1:A10"]}\n'
+            '["IF", {"function": "SUM", "params": ["A1:A3"]}, "big", "small"]\n')
+    assert generate(text, "jsonl") == ["=SUM(A1:A10)", '=IF(SUM(A1:A3),"big","small")']
+
+
+@pytest.mark.parametrize("text, fmt, message, cause", [
+    ("SUM,A1\nNOSUCH,1\n", "csv", "line 2: unknown function 'NOSUCH'", KeyError),
+    ('{"function": "SUM", "params": [{"function": "IF", "params": 5}]}\n', "jsonl",
+     'line 1: "params" of IF must be a list', ValueError),
+    ('["SUM", "A1"]\n{"function": "SUM", "params": "A1:A9"}\n', "jsonl",
+     'line 2: "params" of SUM must be a list', None),
+    ('["SUM", "A1"]\n\n"SUM"\n', "jsonl",
+     'line 3: expected {"function": ..., "params": [...]} or [function, params...]', None),
+    ('["SUM", "A1"]\n\n{bad\n', "jsonl", "line 3: invalid JSON: Expecting property name enclosed in double quotes: "
+     "line 1 column 2 (char 1)", ValueError),
+    ("SUM,A1,B1\n", "csv", "line 1: too many parameters for SUM (at most 1, got 2)", ValueError),
+])
+def test_errors_name_the_line(text, fmt, message, cause):
+    with pytest.raises(ValueError) as info:
+        generate(text, fmt)
+    assert str(info.value) == message
+    if cause is not None:
+        assert isinstance(info.value.__cause__, cause)
+
+
+def test_records_report_errors_per_record():
+    formulas, errors = generate_records([{"function": "SUM", "params": ["A1"]}, {"function": "NOSUCH"}, 5])
+    assert formulas == ["=SUM(A1)", None, None]
+    assert [index for index, _ in errors] == [1, 2]
+
+
+def test_malformed_records():
+    records = [{"function": "SUM", "params": "A1:A9"}, "SUM", ["SUM", "A1", "B1"], ["SUM", "A1", "", ""],
+               ["IF", ["SUM", "A1", "B1"], 1, 2], {"function": "SUM", "params": None}, [], [5, "A1"]]
+    formulas, errors = generate_records(records)
+    assert formulas == [None, None, None, "=SUM(A1)", None, "=SUM()", None, None]
+    assert [index for index, _ in errors] == [0, 1, 2, 4, 6, 7]
+    assert errors[0][1] == '"params" of SUM must be a list'
+    assert errors[2][1] == errors[3][1] == "too many parameters for SUM (at most 1, got 2)"
+
+
+def test_generation_is_lazy():
+    def rows():
+        line_no = 0
+        while True:
+            line_no += 1
+            yield line_no, "SUM", [f"A{line_no}"]
+
+    formulas = generate_batch(rows())
+    assert [next(formulas) for _ in range(3)] == ["=SUM(A1)", "=SUM(A2)", "=SUM(A3)"]
+    formulas.close()
+
+
+def test_csv_quoted_newline():
+    assert generate('CONCATENATE,"a\nb",A1\n') == ['=CONCATENATE("a\nb",A1)']
+
+
+@pytest.mark.parametrize("fmt, text", [
+    ("csv", "".join(f"SUM,A{i}:B{i}\n" for i in range(1, 301)) + 'CONCATENATE,"x\ny",A1\n'),
+    ("jsonl", "".join(f'{{"function": "SUM", "params": ["A{i}:B{i}"]}}\n' for i in range(1, 301))),
+])
+def test_parallel_matches_serial_order(fmt, text):
+    serial = generate(text, fmt)
+    parallel = list(generate_batch_parallel(io.StringIO(text), fmt, workers=2, chunk_size=7, max_in_flight=3))
+    assert parallel == serial
+
+
+def test_parallel_error_keeps_line_number():
+    text = "".join(f"SUM,A{i}\n" for i in range(1, 50)) + "NOSUCH,1\n"
+    with pytest.raises(ValueError, match="line 50: unknown function"):
+        list(generate_batch_parallel(io.StringIO(text), "csv", workers=2, chunk_size=10))
+
+
+def test_line_chunks_do_not_split_quoted_records():
+    chunks = list(iter_line_chunks(io.StringIO('A,"1\n2"\nB,3\nC,4\n'), "csv", chunk_size=1))
+    assert [(first, len(lines)) for first, lines in chunks] == [(1, 2), (3, 1), (4, 1)]
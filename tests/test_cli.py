@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""命令行：单个函数、批量生成、--eval 求值列和输入输出错误"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import excel_function_maker
+from excel_function_maker.cli import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    pytest.importorskip("numpy")
+    path = tmp_path / "data.csv"
+    path.write_text("apple,3\npear,5\n", encoding="utf-8")
+    return str(path)
+
+
+def test_single_formula(capsys):
+    assert main(["--func", "SUMIF", "--param", "A1:A10", "--param", "=apple"]) == 0
+    assert capsys.readouterr().out == '=SUMIF(A1:A10,"=apple")\n'
+
+
+def test_unknown_function(capsys):
+    assert main(["--func", "NOSUCH"]) == 2
+    assert "unknown function" in capsys.readouterr().err
+
+
+def test_fill(capsys):
+    assert main(["--func", "SUM", "--param", "A1:B1", "--fill", "3"]) == 0
+    assert capsys.readouterr().out == "=SUM(A1:B1)\n=SUM(A2:B2)\n=SUM(A3:B3)\n"
+
+
+@pytest.mark.parametrize("count", ["0", "-2", "x"])
+def test_fill_needs_at_least_one_row(capsys, count):
+    with pytest.raises(SystemExit) as info:
+        main(["--func", "SUM", "--param", "A1", "--fill", count])
+    assert info.value.code == 2
+    assert "--fill" in capsys.readouterr().err
+
+
+def test_eval_column(capsys, sheet):
+    assert main(["--func", "SUM", "--param", "B1:B2", "--eval", sheet]) == 0
+    assert capsys.readouterr().out == "=SUM(B1:B2)\t8\n"
+
+
+def test_eval_keeps_going_after_unparseable_formula(capsys, tmp_path, sheet):
+    specs = tmp_path / "specs.jsonl"
+    specs.write_text('{"function": "SUM", "params": ["B1:B2"]}\n'
+                     '{"function": "SUM", "params": [{"expression": "1+"}]}\n'
+                     '{"function": "LEFT", "params": ["A2", "2"]}\n', encoding="utf-8")
+    assert main([str(specs), "--eval", sheet]) == 0
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == ["=SUM(B1:B2)\t8", "=SUM(1+)\tvalue=unknown", "=LEFT(A2,2)\tpe"]
+    assert "row 2" in captured.err
+
+
+def test_batch(capsys, tmp_path):
+    specs = tmp_path / "specs.csv"
+    specs.write_text("function,p1,p2\nSUM,A1:A10\nLEFT,hello,3\n", encoding="utf-8")
+    out = tmp_path / "out.txt"
+    assert main([str(specs), "-o", str(out)]) == 0
+    assert out.read_text(encoding="utf-8") == '=SUM(A1:A10)\n=LEFT("hello",3)\n'
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_batch_missing_input(capsys, tmp_path, workers):
+    assert main([str(tmp_path / "missing.csv"), "-j", workers]) == 1
+    err = capsys.readouterr().err
+    assert err.startswith("error: ") and "missing.csv" in err
+    assert "Traceback" not in err
+
+
+def test_batch_unwritable_output(capsys, tmp_path):
+    specs = tmp_path / "specs.csv"
+    specs.write_text("SUM,A1:A10\n", encoding="utf-8")
+    assert main([str(specs), "-o", str(tmp_path / "no" / "out.xlsx")]) == 1
+    assert capsys.readouterr().err.startswith("error: ")
+
+
+def test_batch_error_has_line_number(capsys, tmp_path):
+    specs = tmp_path / "specs.csv"
+    specs.write_text("SUM,A1:A10\nNOSUCH,1\n", encoding="utf-8")
+    assert main([str(specs)]) == 1
+    assert capsys.readouterr().err == "error: line 2: unknown function 'NOSUCH'\n"
+
+
+@pytest.mark.parametrize("args", [
+    ["--func", "SUM", "--param", "A1:A10"],
+    ["-", "--cost", "--target", "2021", "-o", "{tmp}/out.xlsx"],
+])
+def test_command_line_never_imports_gui_modules(tmp_path, args):
+    # 新进程中运行，避免其他测试已经导入的模块影响结果
+    code = ("import sys\nfrom excel_function_maker.cli import main\nrc = main(sys.argv[1:])\n"
+            "print(sorted(m for m in ('tkinter', '_tkinter', 'pyperclip') if m in sys.modules))\nsys.exit(rc)")
+    result = subprocess.run([sys.executable, "-c", code] + [arg.format(tmp=tmp_path) for arg in args], cwd=ROOT,
+                            input="VLOOKUP,A2,D:F,2,FALSE\n", stdout=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_lazy_package_attributes():
+    assert excel_function_maker.generate_batch.__module__ == "excel_function_maker.batch"
+    with pytest.raises(AttributeError):
+        excel_function_maker.no_such_name
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""剪贴板输出：TSV 拼接和引号规则、有窗口时使用Tk的剪贴板"""
+
+import sys
+
+from excel_function_maker.clipboard import CLIPBOARD_PYPERCLIP, CLIPBOARD_TK, copy_rows, copy_text, to_tsv
+
+
+class FakeClipboard:
+    """代替 Tk 窗口的剪贴板"""
+
+    def __init__(self):
+        self.text = None
+        self.calls = 0
+
+    def clipboard_clear(self):
+        self.text = ""
+
+    def clipboard_append(self, text):
+        self.text += text
+        self.calls += 1
+
+
+def test_tsv_rows_and_cells():
+    rows = ["=SUM(A1:A10)", ["=A1", 3, None], '=IF(A1="x","y","")']
+    assert to_tsv(rows) == '=SUM(A1:A10)\n=A1\t3\t\n=IF(A1="x","y","")'
+
+
+def test_tsv_quotes_tabs_newlines_and_leading_quotes():
+    assert to_tsv(["a\tb", "line\nbreak", '"quoted"']) == '"a\tb"\n"line\nbreak"\n"""quoted"""'
+
+
+def test_many_formulas_in_one_copy():
+    root = FakeClipboard()
+    formulas = [f"=SUM(A{i}:B{i})" for i in range(1, 1001)]
+    assert copy_rows(formulas, root) == CLIPBOARD_TK
+    assert root.calls == 1
+    assert root.text.split("\n") == formulas
+
+
+def test_pyperclip_is_the_fallback(monkeypatch):
+    copied = []
+    fake = type(sys)("pyperclip")
+    fake.copy = copied.append
+    monkeypatch.setitem(sys.modules, "pyperclip", fake)
+    assert copy_text("=SUM(A1)") == CLIPBOARD_PYPERCLIP
+    assert copied == ["=SUM(A1)"]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""嵌套公式组合和 LET 提取"""
+
+from excel_function_maker.batch import generate_records
+from excel_function_maker.compose import Composer, Formula, share_let
+from excel_function_maker.engine import FormulaEngine
+from excel_function_maker.formula import Expression
+
+
+def lookup(cell):
+    return Formula("VLOOKUP", [cell, "$D$1:$F$9", "2", "FALSE"])
+
+
+def test_nested_formula_is_not_quoted():
+    node = Formula("IF", [Formula.expression("{0}>10", lookup("A2")), lookup("A2"), "none"])
+    assert Composer(FormulaEngine()).render(node) == \
+        '=IF(VLOOKUP(A2,$D$1:$F$9,2,FALSE)>10,VLOOKUP(A2,$D$1:$F$9,2,FALSE),"none")'
+
+
+def test_text_starting_with_equals_stays_text():
+    node = Formula("COUNTIF", ["A1:A10", "=apple"])
+    assert Composer(FormulaEngine()).render(node) == '=COUNTIF(A1:A10,"=apple")'
+
+
+def test_expression_parameter_becomes_leaf_node():
+    node = Formula("SUM", [Expression("{1,2,3}")])
+    assert node != Formula("SUM", ["{1,2,3}"])
+    assert Composer(FormulaEngine()).render(node) == "=SUM({1,2,3})"
+
+
+def test_update_rerenders_only_the_edited_path():
+    composer = Composer(FormulaEngine())
+    node = Formula("IF", [Formula.expression("{0}>0", lookup("A1")), lookup("A1"), lookup("A3")])
+    composer.render(node)
+    renders = composer.renders
+    edited = node.update([2, 0], "A4")
+    assert composer.render(edited).endswith("VLOOKUP(A4,$D$1:$F$9,2,FALSE))")
+    # 只有被修改的 VLOOKUP 和根节点重新生成
+    assert composer.renders - renders == 2
+
+
+def test_let_extracts_repeated_calls():
+    node = Formula("IF", [Formula.expression("{0}>10", lookup("A2")), lookup("A2"), "small"])
+    assert Composer(FormulaEngine(), let=True).render(node) == \
+        '=LET(sub_1,VLOOKUP(A2,$D$1:$F$9,2,FALSE),IF(sub_1>10,sub_1,"small"))'
+
+
+def test_let_leaves_volatile_calls():
+    assert share_let("=RAND()+RAND()") == "=RAND()+RAND()"
+
+
+def test_records_with_nested_and_plain_parameters():
+    formulas, errors = generate_records([
+        {"function": "IF", "params": [{"expression": "A2>1"}, ["LEFT", "A2", "3"], "=x"]},
+        ["NOPE"],
+    ])
+    assert formulas == ['=IF(A2>1,LEFT(A2,3),"=x")', None]
+    assert errors[0][0] == 1
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""公式开销估算：单元格数、整列引用、易失性函数和重复扫描"""
+
+import pytest
+
+from excel_function_maker.cost import COST_HIGH, COST_LOW, COST_MEDIUM, FLAG_REPEATED_SCAN, FLAG_VOLATILE, \
+    FLAG_WHOLE_COLUMN_ARRAY, analyze
+from excel_function_maker.engine import CHAR_COUNT_LET, FormulaEngine
+from excel_function_maker.formula import FormulaSyntaxError
+
+
+@pytest.mark.parametrize("formula, cells, scans, level", [
+    ("=A1", 1, 0, COST_LOW),
+    ("=SUM(A1:A10)", 10, 1, COST_LOW),
+    ("=SUM(A1:J1000)+B1", 10001, 1, COST_MEDIUM),
+    ("=SUMPRODUCT((A:A=1)*B:B)", 2 * 1048576, 2, COST_HIGH),
+])
+def test_cells_and_level(formula, cells, scans, level):
+    cost = analyze(formula)
+    assert (cost.cells, cost.scans, cost.level) == (cells, scans, level)
+
+
+def test_whole_column_outside_array_functions_is_open():
+    cost = analyze("=SUM(A:A)")
+    assert cost.cells == 0 and cost.open_refs == 1
+    assert cost.flags == [] and cost.level == COST_LOW
+
+
+def test_whole_column_in_array_function_is_flagged():
+    cost = analyze("=SUMPRODUCT((A:A=1)*B:B)")
+    assert cost.flags == [(FLAG_WHOLE_COLUMN_ARRAY, "A:A"), (FLAG_WHOLE_COLUMN_ARRAY, "B:B")]
+
+
+def test_volatile_functions():
+    cost = analyze("=NOW()+OFFSET(A1,1,1)")
+    assert cost.volatile == ["NOW", "OFFSET"]
+    assert cost.flags == [(FLAG_VOLATILE, "NOW, OFFSET")]
+
+
+def test_repeated_scans_in_char_count():
+    compat = analyze(FormulaEngine().generate("CHAR_COUNT", ["A1:J1", "a", "b", "c"]))
+    assert (FLAG_REPEATED_SCAN, "LEN(A1:J1) x3") in compat.flags
+    let = analyze(FormulaEngine(char_count_mode=CHAR_COUNT_LET).generate("CHAR_COUNT", ["A1:J1", "a", "b", "c"]))
+    assert not any(code == FLAG_REPEATED_SCAN for code, _ in let.flags)
+    assert let.scans < compat.scans
+
+
+def test_summary_is_one_line():
+    summary = analyze("=SUMPRODUCT((A:A=1)*B:B)").summary()
+    assert "\n" not in summary and summary.startswith("cost=high")
+
+
+def test_syntax_error():
+    with pytest.raises(FormulaSyntaxError):
+        analyze("=SUM(1+)")
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""公式生成引擎：参数加引号的规则和嵌套公式参数"""
+
+import pytest
+
+from excel_function_maker.engine import CHAR_COUNT_LET, CHAR_COUNT_MODES, VALUE_BOOLEAN, VALUE_CELL_REFERENCE, \
+    VALUE_EMPTY, VALUE_NUMBER, VALUE_QUOTED, VALUE_TEXT, FormulaEngine, classify_value
+from excel_function_maker.formula import Expression
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return FormulaEngine()
+
+
+@pytest.mark.parametrize("func, params, expected", [
+    ("VLOOKUP", ["John", "A1:D10", "3", "FALSE"], '=VLOOKUP("John",A1:D10,3,FALSE)'),
+    ("SUMIF", ["A1:A10", "apple"], '=SUMIF(A1:A10,"apple")'),
+    ("COUNTIF", ["A1:A10", ">5"], '=COUNTIF(A1:A10,">5")'),
+    ("LEFT", ["hello", "3"], '=LEFT("hello",3)'),
+    ("IF", ["A1>10", "big", "small"], '=IF(A1>10,"big","small")'),
+    ("LEFT", ['"already"', "2"], '=LEFT("already",2)'),
+])
+def test_text_parameters_are_quoted(engine, func, params, expected):
+    assert engine.generate(func, params) == expected
+
+
+@pytest.mark.parametrize("func, params, expected", [
+    # 以等号开头的普通参数是文本值，不是公式
+    ("COUNTIF", ["A1:A10", "=apple"], '=COUNTIF(A1:A10,"=apple")'),
+    ("SUMIF", ["A1:A10", "="], '=SUMIF(A1:A10,"=")'),
+    ("IF", ["A1>10", "=", "no"], '=IF(A1>10,"=","no")'),
+])
+def test_leading_equals_is_a_value(engine, func, params, expected):
+    assert engine.generate(func, params) == expected
+
+
+def test_expression_parameter_is_inserted_as_is(engine):
+    formula = engine.generate("IF", [Expression("VLOOKUP(A2,D:F,2,FALSE)>10"), Expression("B1*2"), "none"])
+    assert formula == '=IF(VLOOKUP(A2,D:F,2,FALSE)>10,B1*2,"none")'
+
+
+def test_defined_names_are_not_quoted():
+    engine = FormulaEngine(defined_names=["Sales"])
+    assert engine.generate("COUNTIF", ["sales", "x"]) == '=COUNTIF(sales,"x")'
+
+
+def test_optional_tail_is_dropped(engine):
+    assert engine.generate("SUMIF", ["A1:A10", "apple", ""]) == '=SUMIF(A1:A10,"apple")'
+
+
+def test_unknown_function(engine):
+    with pytest.raises(KeyError):
+        engine.generate("NO_SUCH_FUNCTION", [])
+
+
+def test_char_count_modes():
+    engine = FormulaEngine()
+    assert engine.generate("CHAR_COUNT", ["A1:C1", "a"]) == \
+        '="a"&SUMPRODUCT(LEN(A1:C1)-LEN(SUBSTITUTE(A1:C1,"a","")))'
+    engine.char_count_mode = CHAR_COUNT_LET
+    assert engine.generate("CHAR_COUNT", ["A1:C1", "a", "b"]).startswith("=LET(rng,A1:C1,total,SUMPRODUCT(LEN(rng)),")
+
+
+@pytest.mark.parametrize("value, kind", [
+    ("", VALUE_EMPTY),
+    ('"text"', VALUE_QUOTED),
+    ("'text'", VALUE_QUOTED),
+    ("3.5", VALUE_NUMBER),
+    ("-12", VALUE_NUMBER),
+    ("A1", VALUE_CELL_REFERENCE),
+    ("$A$1:B10", VALUE_CELL_REFERENCE),
+    ("'Sales 2024'!A1", VALUE_CELL_REFERENCE),
+    ("Table1[Col]", VALUE_CELL_REFERENCE),
+    ("true", VALUE_BOOLEAN),
+    ("hello", VALUE_TEXT),
+])
+def test_classify_value(value, kind):
+    assert classify_value(value) is kind
+
+
+def test_compiled_functions_are_reused(engine):
+    assert engine.compile("VLOOKUP") is engine.compile("VLOOKUP")
+    first = engine.generate("VLOOKUP", ["John", "A1:D10", "3"])
+    assert engine.generate("VLOOKUP", ["John", "A1:D10", "3"]) == first
+
+
+def test_variadic_layout_skips_empty_values(engine):
+    assert engine.generate("CONCATENATE", ["hello", "", "B1"]) == '=CONCATENATE("hello",B1)'
+
+
+def test_char_count_takes_any_number_of_characters():
+    chars = [chr(0x4e00 + i) for i in range(300)]
+    for mode in CHAR_COUNT_MODES:
+        formula = FormulaEngine(char_count_mode=mode).generate("CHAR_COUNT", ["A1:C1"] + chars + ["", " "])
+        assert all(f'"{char}"' in formula for char in chars)
+    let = FormulaEngine(char_count_mode=CHAR_COUNT_LET).generate("CHAR_COUNT", ["A1:C1"] + chars)
+    # LET 形式只引用一次范围
+    assert let.count("A1:C1") == 1
+
+
+def test_char_count_without_characters_asks_for_them(engine):
+    formula = engine.generate("CHAR_COUNT", ["A1:C1"])
+    assert formula == f'="{engine.lang_manager.get_text("please_input_chars")}"'
+
+
+def test_char_count_modes_evaluate_the_same():
+    pytest.importorskip("numpy")
+    from excel_function_maker.evaluator import Evaluator, Sheet, format_value
+
+    evaluator = Evaluator(Sheet.from_rows([["banana", "cab", ""], ["aaa", "", "b"]]))
+    for cells in ("A1:C1", "A1:C2"):
+        results = {format_value(evaluator.evaluate(FormulaEngine(char_count_mode=mode).generate(
+            "CHAR_COUNT", [cells, "a", "b", "n"]))) for mode in CHAR_COUNT_MODES}
+        assert len(results) == 1
+    assert results == {"a7b3n2"}
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""公式求值：常用函数、改写前后结果一致、参数个数错误时的 #VALUE!"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from excel_function_maker.evaluator import Evaluator, ExcelError, Sheet, format_value  # noqa: E402
+from excel_function_maker.formula import FormulaSyntaxError  # noqa: E402
+from excel_function_maker.optimize import optimize  # noqa: E402
+
+ROWS = [
+    ["apple", "3", "x", "red"],
+    ["pear", "5", "y", ""],
+    ["apple", "7", "x", "blue"],
+    ["plum", "", "y", "red"],
+]
+
+
+@pytest.fixture
+def evaluator():
+    return Evaluator(Sheet.from_rows(ROWS))
+
+
+def value(evaluator, formula):
+    return format_value(evaluator.evaluate(formula))
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("=SUM(B1:B4)", "15"),
+    ("=AVERAGE(B1:B3)", "5"),
+    ('=SUMIF(A1:A4,"apple",B1:B4)', "10"),
+    ('=COUNTIFS(A1:A4,"apple",C1:C4,"x")', "2"),
+    ('=VLOOKUP("pear",A1:B4,2,FALSE)', "5"),
+    ('=XLOOKUP("plum",A1:A4,C1:C4)', "y"),
+    ('=INDEX(B1:B4,MATCH("apple",A1:A4,0))', "3"),
+    ('=IF(B2>4,"big","small")', "big"),
+    ('=LEFT(A1,3)&RIGHT(A2,2)', "appar"),
+    ('=RIGHT("abc",5)&LEFT("abc",5)', "abcabc"),
+    ('=RIGHT("abc",0)&"|"', "|"),
+    ('=MID(A2,2,2)', "ea"),
+    ('=CONCATENATE(A1,"-",C1)', "apple-x"),
+    ('=TEXTJOIN(",",FALSE,A1:A2)', "apple,pear"),
+    ('=LEN(A1)-LEN(SUBSTITUTE(A1,"p",""))', "2"),
+    ('=LET(x,B1*2,x+x)', "12"),
+    ("=B1/0", "#DIV/0!"),
+    ('=VLOOKUP("fig",A1:B4,2,FALSE)', "#N/A"),
+    ("=NOSUCH(A1)", "#NAME?"),
+])
+def test_functions(evaluator, formula, expected):
+    assert value(evaluator, formula) == expected
+
+
+@pytest.mark.parametrize("formula", [
+    '=VLOOKUP("plum",A1:C4,3,FALSE)',
+    '=SUMPRODUCT((A1:A4="apple")*(C1:C4<>"y")*B1:B4)',
+    '=SUMPRODUCT(--(A1:A4="apple"))',
+    '=CONCATENATE(A1,B1,C1)',
+    '=CONCATENATE(A1,"-",A2,"-",A3)',
+    '=SUMIF(A1:A4,A1,B1:B4)+SUMIF(A1:A4,A2,B1:B4)',
+])
+def test_rewrites_keep_results(evaluator, formula):
+    rewritten = optimize(formula, "365")
+    assert rewritten.rewrites
+    assert value(evaluator, rewritten.formula) == value(evaluator, formula)
+
+
+@pytest.mark.parametrize("formula", [
+    "=LEFT()", "=RIGHT()", "=LEN()", "=SUMPRODUCT()", "=MID(A1)", "=IF()", "=VLOOKUP(A1)",
+    "=LEN(A1,A2)", "=LEFT(A1,2,3)", "=LET(x,1)",
+])
+def test_wrong_argument_count_is_value_error(evaluator, formula):
+    result = evaluator.evaluate(formula)
+    assert isinstance(result, ExcelError)
+    assert str(result) == "#VALUE!"
+
+
+def test_syntax_error_is_raised(evaluator):
+    with pytest.raises(FormulaSyntaxError):
+        evaluator.evaluate("=SUM(1+)")
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""公式填充：相对引用偏移、$ 固定、越界变为 #REF!"""
+
+import pytest
+
+from excel_function_maker.fill import FillTemplate, fill_down
+from excel_function_maker.formula import MAX_COLUMNS, MAX_ROWS, column_letters
+
+FORMULA = '=SUM($A1:B$2)+Sheet1!C3*R1C1+"A1"'
+
+
+def test_fill_down_shifts_relative_rows():
+    assert list(fill_down(FORMULA, 3)) == [
+        '=SUM($A1:B$2)+Sheet1!C3*R1C1+"A1"',
+        '=SUM($A2:B$2)+Sheet1!C4*R1C1+"A1"',
+        '=SUM($A3:B$2)+Sheet1!C5*R1C1+"A1"',
+    ]
+
+
+def test_fill_right_shifts_relative_columns():
+    assert list(FillTemplate(FORMULA).fill_right(2)) == [
+        '=SUM($A1:B$2)+Sheet1!C3*R1C1+"A1"',
+        '=SUM($A1:C$2)+Sheet1!D3*R1C1+"A1"',
+    ]
+
+
+def test_at_matches_fill():
+    template = FillTemplate(FORMULA)
+    assert template.at(2, 0) == list(template.fill_down(1, start=2))[0]
+    assert template.at(2, 1) == '=SUM($A3:C$2)+Sheet1!D5*R1C1+"A1"'
+
+
+def test_whole_columns_and_rows():
+    template = FillTemplate("=A:A+1:1")
+    assert list(template.fill_down(2)) == ["=A:A+1:1", "=A:A+2:2"]
+    assert list(template.fill_right(2)) == ["=A:A+1:1", "=B:B+1:1"]
+
+
+@pytest.mark.parametrize("formula, start, expected", [
+    ("=A1+B1", MAX_ROWS - 1, ["=A1048576+B1048576", "=#REF!+#REF!"]),
+    ("=A2:A3", MAX_ROWS - 4, ["=A1048574:A1048575", "=A1048575:A1048576", "=#REF!"]),
+    ("=A$1+A1", -1, ["=A$1+#REF!", "=A$1+A1"]),
+])
+def test_references_off_the_sheet_become_ref_errors(formula, start, expected):
+    assert list(fill_down(formula, len(expected), start)) == expected
+
+
+def test_fill_right_to_the_last_column():
+    formula = f"={column_letters(MAX_COLUMNS - 2)}1"
+    assert list(FillTemplate(formula).fill_right(2, start=1)) == ["=XFD1", "=#REF!"]
+
+
+def test_formula_without_references_is_repeated():
+    assert list(fill_down("=NOW()", 3)) == ["=NOW()"] * 3
+    assert FillTemplate("=NOW()").slot_count == 0
+
+
+def test_repeated_range_in_char_count():
+    formula = '="a"&SUMPRODUCT(LEN(A1:C1)-LEN(SUBSTITUTE(A1:C1,"a","")))'
+    assert list(fill_down(formula, 2))[1] == '="a"&SUMPRODUCT(LEN(A2:C2)-LEN(SUBSTITUTE(A2:C2,"a","")))'
+
+
+def test_braces_in_text_are_kept():
+    assert list(fill_down('=A1&"{0}"', 2)) == ['=A1&"{0}"', '=A2&"{0}"']
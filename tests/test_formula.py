@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""公式词法分析、引用识别和解析、语法分析"""
+
+import pytest
+
+from excel_function_maker.formula import MAX_COLUMNS, MAX_ROWS, REFERENCE_A1, REFERENCE_R1C1, REFERENCE_STRUCTURED, \
+    FormulaSyntaxError, column_index, column_letters, iter_tokens, parse_formula, parse_reference, reference_kind
+
+
+@pytest.mark.parametrize("text, kind", [
+    ("A1", REFERENCE_A1),
+    ("a1", REFERENCE_A1),
+    ("$A$1:$B$10", REFERENCE_A1),
+    ("XFD1048576", REFERENCE_A1),
+    ("A:A", REFERENCE_A1),
+    ("1:1", REFERENCE_A1),
+    ("Sheet1!A1", REFERENCE_A1),
+    ("'Sales 2024'!A1:B2", REFERENCE_A1),
+    ("[Book.xlsx]Sheet1!A1", REFERENCE_A1),
+    ("R1C1", REFERENCE_R1C1),
+    ("R[1]C[-1]", REFERENCE_R1C1),
+    ("Table1[Col]", REFERENCE_STRUCTURED),
+    ("XFE1", None),
+    ("A1048577", None),
+    ("A0", None),
+    ("Sales", None),
+    ("TRUE", None),
+    ("hello world", None),
+])
+def test_reference_kind(text, kind):
+    assert reference_kind(text) == kind
+
+
+@pytest.mark.parametrize("text, bounds", [
+    ("A1", (0, 0, 0, 0, None)),
+    ("$B$2:D10", (1, 1, 9, 3, None)),
+    ("C:E", (0, 2, MAX_ROWS - 1, 4, None)),
+    ("3:4", (2, 0, 3, MAX_COLUMNS - 1, None)),
+    ("R2C3", (1, 2, 1, 2, None)),
+    ("'It''s'!A1", (0, 0, 0, 0, "It's")),
+])
+def test_parse_reference(text, bounds):
+    ref = parse_reference(text)
+    assert (ref.row0, ref.col0, ref.row1, ref.col1, ref.sheet) == bounds
+
+
+@pytest.mark.parametrize("text", ["R[1]C1", "A", "1", "A1:B2:C3", "A1:B", "Sales"])
+def test_unparseable_references(text):
+    assert parse_reference(text) is None
+
+
+@pytest.mark.parametrize("letters, index", [("A", 0), ("Z", 25), ("AA", 26), ("XFD", MAX_COLUMNS - 1)])
+def test_column_letters_round_trip(letters, index):
+    assert column_index(letters) == index
+    assert column_letters(index) == letters
+
+
+def test_tokens_keep_the_original_text():
+    text = 'SUM(A1:B2, "x""y")+Tab[Col]*-1.5e3'
+    tokens = list(iter_tokens(text))
+    assert "".join(token for _, token in tokens) == text
+    assert [kind for kind, _ in tokens] == ["func", "lparen", "ref", "comma", "ws", "str", "rparen", "op",
+                                           "table", "op", "op", "num"]
+
+
+def test_operator_precedence():
+    assert parse_formula('=1+2*3^2&"a"') == \
+        ("binop", "&", ("binop", "+", ("num", 1.0), ("binop", "*", ("num", 2.0),
+                                                       ("binop", "^", ("num", 3.0), ("num", 2.0)))), ("str", "a"))
+
+
+@pytest.mark.parametrize("formula", ["=SUM(1+)", "=(A1", "=A1)", "=1 ~ 2"])
+def test_syntax_errors(formula):
+    with pytest.raises(FormulaSyntaxError):
+        parse_formula(formula)
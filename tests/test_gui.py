@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""图形界面：参数控件池、切换语言时原地更新文本、后台生成使用随任务传递的设置（需要图形显示，没有显示时跳过）"""
+
+import pytest
+
+from excel_function_maker.history import DATA_DIR_ENV
+from excel_function_maker.optimize import EXCEL_VERSIONS
+
+tk = pytest.importorskip("tkinter")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # 语言设置和历史记录写入临时目录
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path))
+    from excel_function_maker.gui import ExcelFunctionMaker
+    try:
+        app = ExcelFunctionMaker()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    app.root.withdraw()
+    yield app
+    app.runner.close()
+    app.root.destroy()
+
+
+def select(app, name):
+    app.function_var.set(name)
+    app.on_function_selected(None)
+
+
+def test_param_rows_are_reused(app):
+    select(app, "VLOOKUP")
+    rows = list(app.param_rows)
+    select(app, "SUM")
+    assert app.param_rows == rows
+    assert len(app.param_entries) < len(rows)
+    select(app, "VLOOKUP")
+    assert app.param_rows == rows
+    assert app.param_entries == [row[1] for row in rows[:len(app.param_entries)]]
+
+
+def test_language_switch_relabels_in_place(app):
+    select(app, "VLOOKUP")
+    entries = list(app.param_entries)
+    entries[0].insert(0, "A2")
+    language = app.lang_manager.current_language
+    description = app.description_label.cget("text")
+    app.on_language_changed(None)
+    assert app.lang_manager.current_language != language
+    assert app.param_entries == entries
+    assert entries[0].get() == "A2"
+    assert app.description_label.cget("text") != description
+
+
+def test_render_uses_the_settings_sent_with_the_job(app):
+    select(app, "VLOOKUP")
+    for entry, value in zip(app.param_entries, ["John", "A1:D10", "3", "FALSE"]):
+        entry.insert(0, value)
+    inputs = app.get_preview_inputs()
+    app.target_combo.current(len(EXCEL_VERSIONS))
+    app.on_target_changed()
+    # 界面线程切换设置后，已经提交的任务仍按提交时的设置生成
+    rendered = app.render_inputs(inputs)
+    assert (rendered.formula, rendered.original) == ('=VLOOKUP("John",A1:D10,3,FALSE)', None)
+    rendered = app.render_inputs(app.get_preview_inputs())
+    assert rendered.formula.startswith("=XLOOKUP(")
+    assert rendered.original == '=VLOOKUP("John",A1:D10,3,FALSE)'
+    assert app.render_tools(inputs[3])[0] is not app.engine
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""公式历史和收藏：后台写入、子串搜索、重复记录和收藏"""
+
+import pytest
+
+from excel_function_maker.history import DATA_DIR_ENV, HISTORY_FILE, HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / HISTORY_FILE))
+    yield store
+    store.close()
+
+
+def fill(store):
+    store.add("SUM", ["A1:A10"], "=SUM(A1:A10)")
+    store.add("VLOOKUP", ["John", "A1:D10", "3", "FALSE"], '=VLOOKUP("John",A1:D10,3,FALSE)')
+    store.add("SUMIF", ["B:B", "apple"], '=SUMIF(B:B,"apple")')
+    assert store.flush() == []
+
+
+def formulas(entries):
+    return [entry.formula for entry in entries]
+
+
+def test_recent_first(store):
+    fill(store)
+    assert len(store) == 3
+    assert formulas(store.search()) == ['=SUMIF(B:B,"apple")', '=VLOOKUP("John",A1:D10,3,FALSE)', "=SUM(A1:A10)"]
+    assert store.search()[1].params == ("John", "A1:D10", "3", "FALSE")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("vlookup", ['=VLOOKUP("John",A1:D10,3,FALSE)']),
+    ("A1:", ['=VLOOKUP("John",A1:D10,3,FALSE)', "=SUM(A1:A10)"]),
+    ("pp", ['=SUMIF(B:B,"apple")']),
+    ("john", ['=VLOOKUP("John",A1:D10,3,FALSE)']),
+    ('"apple"', ['=SUMIF(B:B,"apple")']),
+    ("100%", []),
+])
+def test_substring_search(store, text, expected):
+    fill(store)
+    assert formulas(store.search(text)) == expected
+
+
+def test_recording_again_moves_to_top_and_keeps_favorite(store):
+    fill(store)
+    first = store.search("SUM(A1")[0]
+    store.set_favorite(first.id)
+    store.add("SUM", ["A1:A10"], "=SUM(A1:A10)")
+    store.flush()
+    entries = store.search()
+    assert len(entries) == 3
+    assert entries[0].formula == "=SUM(A1:A10)" and entries[0].favorite
+    assert formulas(store.favorites()) == ["=SUM(A1:A10)"]
+
+
+def test_clear_keeps_favorites(store):
+    fill(store)
+    store.set_favorite(store.search("SUMIF")[0].id)
+    store.clear()
+    store.flush()
+    assert formulas(store.search()) == ['=SUMIF(B:B,"apple")']
+    store.clear(keep_favorites=False)
+    store.flush()
+    assert len(store) == 0
+
+
+def test_delete(store):
+    fill(store)
+    store.delete(store.search("VLOOKUP")[0].id)
+    store.flush()
+    assert formulas(store.search("A1")) == ["=SUM(A1:A10)"]
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / HISTORY_FILE)
+    with HistoryStore(path) as store:
+        fill(store)
+    with HistoryStore(path) as store:
+        assert len(store) == 3
+
+
+def test_default_location_follows_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path / "data"))
+    with HistoryStore() as store:
+        assert store.path == str(tmp_path / "data" / HISTORY_FILE)
+
+
+def test_closed_store_rejects_writes(store):
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.add("SUM", ["A1"], "=SUM(A1)")
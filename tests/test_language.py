@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""函数目录和语言包：目录完整性、按语言合并显示文本、缺少时使用英文"""
+
+import json
+import string
+
+import pytest
+
+from excel_function_maker.language import LANGUAGES, LanguageManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # 语言设置文件写入临时目录
+    monkeypatch.chdir(tmp_path)
+    return LanguageManager()
+
+
+def test_catalog_templates_match_arguments(manager):
+    for name, spec in manager.catalog.items():
+        slots = {field for _, field, _, _ in string.Formatter().parse(spec["template"]) if field is not None}
+        assert slots == {str(i) for i in range(len(spec["args"]))}, name
+        assert spec["template"].startswith(f"={name}(") or spec.get("layout") == "char_count", name
+
+
+@pytest.mark.parametrize("language", LANGUAGES)
+def test_every_function_has_display_texts(manager, language):
+    table = manager.get_function_table(language)
+    assert set(table) == set(manager.catalog)
+    for name in table:
+        info = table[name]
+        assert info["name"] and info["template"] == manager.catalog[name]["template"]
+
+
+def test_language_switch_changes_texts_not_functions(manager):
+    manager.current_language = "zh"
+    zh = manager.get_functions()["SUM"]
+    manager.switch_language()
+    en = manager.get_functions()["SUM"]
+    assert manager.current_language == "en"
+    assert zh["name"] != en["name"]
+    assert zh["template"] == en["template"]
+    assert LanguageManager().current_language == "en"
+
+
+def test_missing_translation_falls_back_to_english(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    catalog = {"SUM": {"template": "=SUM({0})", "args": [{"kind": "range"}]},
+               "ABS": {"template": "=ABS({0})", "args": [{"kind": "number"}]}}
+    packs = {
+        "zh": {"texts": {"title": "标题"}, "functions": {"SUM": {"name": "求和", "params": ["范围"]}}},
+        "en": {"texts": {"title": "Title"}, "functions": {"SUM": {"name": "Sum"}, "ABS": {"name": "Absolute"}}},
+    }
+    (tmp_path / "functions.json").write_text(json.dumps(catalog), encoding="utf-8")
+    for language, pack in packs.items():
+        (tmp_path / f"{language}.json").write_text(json.dumps(pack, ensure_ascii=False), encoding="utf-8")
+    manager = LanguageManager(str(tmp_path))
+    manager.current_language = "zh"
+    functions = manager.get_functions()
+    assert functions["SUM"]["name"] == "求和"
+    assert functions["ABS"]["name"] == "Absolute"
+    assert functions["ABS"]["params"] == ["number"]
+    assert manager.get_text("title") == "标题"
+    assert manager.get_text("missing_key") == "missing_key"
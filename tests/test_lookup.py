@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""VLOOKUP/HLOOKUP 查找索引：精确、近似、通配符、批量查找和缓存重建"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from excel_function_maker.evaluator import Sheet  # noqa: E402
+from excel_function_maker.formula import parse_reference  # noqa: E402
+from excel_function_maker.lookup import LookupCache  # noqa: E402
+
+ROWS = [
+    ["10", "ten"],
+    ["20", "twenty"],
+    ["Apple", "fruit"],
+    ["30", "thirty"],
+    ["apple", "second"],
+    ["banana", "yellow"],
+]
+TABLE = parse_reference("A1:B6")
+
+
+@pytest.fixture
+def cache():
+    return LookupCache(Sheet.from_rows(ROWS))
+
+
+@pytest.mark.parametrize("value, expected", [
+    (20.0, "twenty"),
+    ("20", "twenty"),
+    ("APPLE", "fruit"),
+    ("b*", "yellow"),
+    ("?pple", "fruit"),
+    (25.0, None),
+    ("cherry", None),
+])
+def test_exact(cache, value, expected):
+    assert cache.lookup(value, TABLE, 2, approximate=False) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (25.0, "twenty"),
+    (100.0, "thirty"),
+    (5.0, None),
+    ("b", "second"),
+    ("c", "yellow"),
+])
+def test_approximate(cache, value, expected):
+    assert cache.lookup(value, TABLE, 2, approximate=True) == expected
+
+
+def test_lookup_many_matches_single_lookups(cache):
+    values = [10.0, "apple", 15.0, "z*", "nothing", 30.0]
+    for approximate in (False, True):
+        expected = [cache.lookup(value, TABLE, 2, approximate) for value in values]
+        assert cache.lookup_many(values, TABLE, 2, approximate) == expected
+
+
+def test_horizontal():
+    cache = LookupCache(Sheet.from_rows([["a", "b", "c"], ["1", "2", "3"]]))
+    assert cache.lookup("B", parse_reference("A1:C2"), 2, approximate=False, horizontal=True) == 2.0
+
+
+def test_index_is_reused_until_the_column_changes(cache):
+    cache.lookup("apple", TABLE, 2, approximate=False)
+    cache.lookup(10.0, TABLE, 2, approximate=False)
+    assert cache.builds == 1
+    # 只修改返回列不需要重建
+    cache.sheet.set_cell(0, 1, "TEN")
+    assert cache.lookup(10.0, TABLE, 2, approximate=False) == "TEN"
+    assert cache.builds == 1
+    cache.sheet.set_cell(5, 0, "cherry")
+    assert cache.lookup("cherry", TABLE, 2, approximate=False) == "yellow"
+    assert cache.builds == 2
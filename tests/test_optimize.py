@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""公式改写优化：各条规则、目标版本和结果可能不同时不改写的情况"""
+
+import pytest
+
+from excel_function_maker.optimize import EXCEL_VERSIONS, RULE_CONCAT, RULE_COUNTIFS, RULE_INDEX_MATCH, \
+    RULE_SUM_IFS, RULE_SUMIFS, RULE_TEXTJOIN, RULE_XLOOKUP, check_target, optimize
+
+
+@pytest.mark.parametrize("formula, target, expected, rule", [
+    ('=VLOOKUP("John",D2:F100,3,FALSE)', "365", '=XLOOKUP("John",D2:D100,F2:F100)', RULE_XLOOKUP),
+    ('=VLOOKUP("John",D2:F100,3,FALSE)', "2016", '=INDEX(F2:F100,MATCH("John",D2:D100,0))', RULE_INDEX_MATCH),
+    ("=VLOOKUP(7,$D:$F,2,0)", "2021", "=XLOOKUP(7,$D:$D,$E:$E)", RULE_XLOOKUP),
+    ("=VLOOKUP(TRUE,$D:$F,2,0)", "2021", "=XLOOKUP(TRUE,$D:$D,$E:$E)", RULE_XLOOKUP),
+    # 单元格或通配符文本：XLOOKUP 不按通配符匹配，改用同样支持通配符的 MATCH(...,0)
+    ("=VLOOKUP(A2,D2:F100,3,FALSE)", "365", "=INDEX(F2:F100,MATCH(A2,D2:D100,0))", RULE_INDEX_MATCH),
+    ('=HLOOKUP("ab*",A1:Z3,2,0)', "365", '=INDEX(A2:Z2,MATCH("ab*",A1:Z1,0))', RULE_INDEX_MATCH),
+    ("=CONCATENATE(A1,B1,C1)", "2019", "=CONCAT(A1:C1)", RULE_CONCAT),
+    ('=CONCATENATE(A1,"-",B1,"-",C1)', "365", '=TEXTJOIN("-",FALSE,A1:C1)', RULE_TEXTJOIN),
+    ('=SUMPRODUCT((A1:A10="x")*(B1:B10<>5)*C1:C10)', "2007", '=SUMIFS(C1:C10,A1:A10,"x",B1:B10,"<>5")',
+     RULE_SUMIFS),
+    ('=SUMPRODUCT(--(A1:A10="x"),--(B1:B10=3))', "2007", '=COUNTIFS(A1:A10,"x",B1:B10,3)', RULE_COUNTIFS),
+    ("=SUMPRODUCT(--(A1:A10<>5))", "2007", '=COUNTIFS(A1:A10,"<>5")', RULE_COUNTIFS),
+    ("=SUMIF(A:A,D1,B:B)+SUMIF(A:A,D2,B:B)+SUMIF(A:A,D3,B:B)", "365", "=SUM(SUMIFS(B:B,A:A,D1:D3))", RULE_SUM_IFS),
+])
+def test_rewrites(formula, target, expected, rule):
+    result = optimize(formula, target)
+    assert result.formula == expected
+    assert [rewrite.rule for rewrite in result.rewrites] == [rule]
+
+
+@pytest.mark.parametrize("formula, target", [
+    # 近似匹配和旧版本
+    ("=VLOOKUP(A2,D:F,2,TRUE)", "365"),
+    ("=CONCATENATE(A1,B1,C1)", "2016"),
+    ("=SUMIF(A:A,D1,B:B)+SUMIF(A:A,D2,B:B)", "2019"),
+    # 与0或空文本比较：空单元格在 SUMPRODUCT 和 COUNTIFS 中结果不同
+    ("=SUMPRODUCT(--(A1:A10=0))", "365"),
+    ("=SUMPRODUCT(--(A1:A10<>0))", "365"),
+    ("=SUMPRODUCT((A1:A10<>0)*B1:B10)", "365"),
+    ('=SUMPRODUCT(--(A1:A10<>""))', "365"),
+    # 不等式、数字文本、通配符
+    ("=SUMPRODUCT(--(A1:A10>5))", "365"),
+    ('=SUMPRODUCT(--(A1:A10="5"))', "365"),
+    ('=SUMPRODUCT(--(A1:A10="a*"))', "365"),
+    # 范围大小不同
+    ('=SUMPRODUCT((A1:A10="x")*C1:C5)', "365"),
+    # CONCATENATE 的范围参数只取一个单元格，CONCAT 会连接整个范围
+    ("=CONCATENATE(A1:A3,B1,C1)", "365"),
+    ('=CONCATENATE(A1:A3,"-",B1,"-",C1)', "365"),
+    ("=CONCATENATE(A1,B1,Table1[Name])", "365"),
+    # 没有可以合并的相邻单元格
+    ("=CONCATENATE(A1,C1,E1)", "365"),
+])
+def test_not_rewritten(formula, target):
+    result = optimize(formula, target)
+    assert result.formula == formula
+    assert result.rewrites == ()
+
+
+def test_untouched_text_is_kept():
+    result = optimize("= 1 + vlookup( $A2 , D2:F100 , 3 , false ) * 2", "365")
+    assert result.formula == "= 1 + INDEX(F2:F100,MATCH($A2,D2:D100,0)) * 2"
+
+
+def test_nested_rewrites():
+    result = optimize('=CONCATENATE(VLOOKUP("x",D2:F9,2,FALSE),B1,C1)', "365")
+    assert result.formula == '=CONCAT(XLOOKUP("x",D2:D9,E2:E9),B1:C1)'
+    assert [rewrite.rule for rewrite in result.rewrites] == [RULE_XLOOKUP, RULE_CONCAT]
+
+
+def test_unparseable_formula_is_returned_unchanged():
+    assert optimize("=VLOOKUP(A2,(D2:F9,2,FALSE)", "365").formula == "=VLOOKUP(A2,(D2:F9,2,FALSE)"
+
+
+def test_rewrite_costs():
+    rewrite = optimize("=VLOOKUP(A2,D2:F100,3,FALSE)", "365").rewrites[0]
+    before, after = rewrite.costs()
+    assert after.cells < before.cells
+
+
+def test_check_target():
+    assert check_target(EXCEL_VERSIONS[0]) == EXCEL_VERSIONS[0]
+    with pytest.raises(ValueError):
+        check_target("2003")
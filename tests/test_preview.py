@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""实时预览调度：合并连续按键、输入未变化时不重新生成"""
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+from excel_function_maker.gui import PreviewScheduler  # noqa: E402
+from excel_function_maker.worker import BackgroundRunner  # noqa: E402
+
+
+class Preview:
+    """记录预览的输入、生成次数和结果"""
+
+    def __init__(self, root, delay=150):
+        self.inputs = ("SUM", ("A1",))
+        self.rendered = []
+        self.results = []
+        self.errors = []
+        self.runner = BackgroundRunner(root)
+        self.scheduler = PreviewScheduler(root, self.runner, lambda: self.inputs, self.render,
+                                          self.results.append, self.errors.append, delay)
+
+    def render(self, inputs):
+        self.rendered.append(inputs)
+        if inputs[0] == "BAD":
+            raise ValueError("bad function")
+        return f"={inputs[0]}({','.join(inputs[1])})"
+
+
+@pytest.fixture
+def preview(root):
+    preview = Preview(root)
+    yield preview
+    preview.runner.close()
+
+
+def test_keystrokes_are_coalesced(root, preview):
+    for text in ("A", "A1", "A1:", "A1:A", "A1:A9"):
+        preview.inputs = ("SUM", (text,))
+        preview.scheduler.schedule()
+        root.advance(50)
+    assert preview.rendered == []
+    root.advance(150)
+    root.wait(lambda: preview.results)
+    assert preview.rendered == [("SUM", ("A1:A9",))]
+    assert preview.results == ["=SUM(A1:A9)"]
+
+
+def test_unchanged_inputs_are_not_rendered_again(root, preview):
+    preview.scheduler.schedule()
+    root.advance(150)
+    root.wait(lambda: preview.results)
+    preview.scheduler.schedule()
+    root.advance(150)
+    assert len(preview.rendered) == 1
+    preview.scheduler.reset()
+    preview.scheduler.schedule()
+    root.advance(150)
+    root.wait(lambda: len(preview.results) == 2)
+    assert len(preview.rendered) == 2
+
+
+def test_cancel_drops_the_pending_preview(root, preview):
+    preview.scheduler.schedule()
+    preview.scheduler.cancel()
+    root.advance(1000)
+    assert preview.rendered == [] and root.pending == 0
+
+
+def test_errors_go_to_the_error_callback(root, preview):
+    preview.inputs = ("BAD", ())
+    preview.scheduler.schedule()
+    root.advance(150)
+    root.wait(lambda: preview.errors)
+    assert str(preview.errors[0]) == "bad function"
+    assert preview.results == []
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""函数搜索：前缀、片段和拼写错误匹配，逐键增量更新与一次性搜索一致"""
+
+import pytest
+
+from excel_function_maker.language import LanguageManager
+from excel_function_maker.search import FunctionIndex, FunctionSearch, normalize
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    # 语言设置文件写入临时目录
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp("search"))
+        return FunctionIndex(LanguageManager())
+
+
+def test_normalize():
+    assert normalize("  V  Lookup\t") == "v lookup"
+
+
+@pytest.mark.parametrize("text, first", [
+    ("vlookup", "VLOOKUP"),
+    ("VLOOK", "VLOOKUP"),
+    ("sum", "SUM"),
+    ("count", "COUNT"),
+    ("charcount", "CHAR_COUNT"),
+    ("vlokup", "VLOOKUP"),
+    ("求和", "SUM"),
+])
+def test_best_match_first(index, text, first):
+    assert index.search(text)[0] == first
+
+
+def test_exact_key_beats_prefix(index):
+    assert index.search("sum")[:2] == ["SUM", "SUMIF"]
+
+
+def test_empty_text_lists_every_function(index):
+    assert index.search("") == index.keys
+    assert index.search("", limit=3) == index.keys[:3]
+
+
+def test_no_match(index):
+    assert index.search("zzzz") == []
+
+
+def test_limit(index):
+    assert len(index.search("count", limit=2)) == 2
+
+
+def test_incremental_matches_one_shot(index):
+    search = FunctionSearch(index)
+    for text in ["v", "vl", "vlo", "vlook", "vl", "", "su", "sumif", "sum", "x"]:
+        assert search.update(text) == index.search(text), text
+
+
+def test_backspace_restores_state(index):
+    search = FunctionSearch(index)
+    search.update("vl")
+    counts, total = dict(search._counts), search._gram_total
+    search.update("vlookup")
+    search.update("vl")
+    assert (search._counts, search._gram_total) == (counts, total)
+    search.update("")
+    assert (search._counts, search._gram_total) == ({}, 0)
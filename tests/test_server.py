@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""本地公式服务：各个端点、流水线请求按顺序响应、大批量交给工作进程"""
+
+import asyncio
+import json
+
+import pytest
+
+from excel_function_maker.language import LanguageManager
+from excel_function_maker.server import DEFAULT_HOST, DEFAULT_PORT, INLINE_BODY, FormulaServer, parse_address
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("unix:/tmp/efm.sock", ("unix", "/tmp/efm.sock")),
+    ("0.0.0.0:9000", ("0.0.0.0", 9000)),
+    ("[::1]:9000", ("::1", 9000)),
+    (":9000", (DEFAULT_HOST, 9000)),
+    (str(DEFAULT_PORT), (DEFAULT_HOST, DEFAULT_PORT)),
+])
+def test_parse_address(address, expected):
+    assert parse_address(address) == expected
+
+
+def test_parse_address_rejects_missing_port():
+    with pytest.raises(ValueError):
+        parse_address("localhost")
+
+
+def request(method, path, payload=None, close=False):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode() + b"\r\n" + body
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, value = line.decode().split(":", 1)
+        headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, json.loads(body)
+
+
+def exchange(server, data, count):
+    """启动服务，在一个连接上一次发出 data，读取 count 个响应及之后是否收到EOF"""
+    async def run():
+        ready = asyncio.Event()
+        bound = []
+        task = asyncio.create_task(server.serve("127.0.0.1:0", lambda address: (bound.append(address), ready.set())))
+        await ready.wait()
+        host, port = parse_address(bound[0])
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(data)
+            responses = [await read_response(reader) for _ in range(count)]
+            eof = await asyncio.wait_for(reader.read(), 5) == b""
+        finally:
+            writer.close()
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return responses, eof
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # 语言设置文件写入临时目录
+    monkeypatch.chdir(tmp_path)
+    return FormulaServer(LanguageManager())
+
+
+def test_pipelined_requests_answer_in_order(server):
+    data = (request("POST", "/generate", {"function": "vlookup", "params": ["John", "A1:D10", 3, "FALSE"]})
+            + request("GET", "/health")
+            + request("POST", "/generate", {"function": "NOPE"})
+            + request("GET", "/nothing")
+            + request("GET", "/generate")
+            + b"POST /generate HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}"
+            + request("GET", "/functions", close=True))
+    responses, eof = exchange(server, data, 7)
+    assert [status for status, _, _ in responses] == [200, 200, 400, 404, 405, 400, 200]
+    assert responses[0][2] == {"formula": '=VLOOKUP("John",A1:D10,3,FALSE)'}
+    assert responses[1][2] == {"status": "ok"}
+    assert "SUM" in responses[6][2]["functions"]
+    assert responses[6][1]["connection"] == "close"
+    assert eof
+
+
+def test_batch_reports_errors_by_index(server):
+    items = [{"function": "SUM", "params": ["A1:A10"]}, ["NOPE"], ["SUMIF", "B:B", "apple"], 7]
+    (response,), _ = exchange(server, request("POST", "/batch", {"items": items}, close=True), 1)
+    status, _, payload = response
+    assert status == 200
+    assert payload["formulas"] == ["=SUM(A1:A10)", None, '=SUMIF(B:B,"apple")', None]
+    assert [error["index"] for error in payload["errors"]] == [1, 3]
+
+
+def test_batch_must_be_a_list(server):
+    (response,), _ = exchange(server, request("POST", "/batch", {"items": "SUM"}, close=True), 1)
+    assert response[0] == 400
+
+
+def test_large_batch_in_worker_process(server):
+    items = [["SUM", f"A{i}:A{i + 9}"] for i in range(1, 2001)] + [["NOPE"]]
+    data = request("POST", "/batch", {"items": items}, close=True)
+    assert len(data) > INLINE_BODY
+    (response,), _ = exchange(server, data, 1)
+    status, _, payload = response
+    assert status == 200
+    assert payload["formulas"][:2] == ["=SUM(A1:A10)", "=SUM(A2:A11)"]
+    assert len(payload["formulas"]) == 2001
+    assert [error["index"] for error in payload["errors"]] == [2000]
+    # 服务停止时关闭工作进程
+    assert server._pool is None
+
+
+def test_malformed_request_line_closes_connection(server):
+    (response,), eof = exchange(server, b"garbage\r\n\r\n", 1)
+    assert response[0] == 400
+    assert eof
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""溢出模式：逐元素展开、MAP/BYROW/INDEX 包装、不能溢出的公式和目标版本"""
+
+import pytest
+
+from excel_function_maker.spill import SPILL_BYROW, SPILL_INDEX, SPILL_MAP, SPILL_NATIVE, spill_down
+
+
+@pytest.mark.parametrize("formula, expected, mode", [
+    ("=LEFT(A2,3)", "=LEFT(A2:A1001,3)", SPILL_NATIVE),
+    ("=A2+1", "=A2:A1001+1", SPILL_NATIVE),
+    ("=Sheet2!A2+A2", "=Sheet2!A2:A1001+A2:A1001", SPILL_NATIVE),
+    ("=SUMIF($B$2:$B$100,A2,$C$2:$C$100)", "=SUMIF($B$2:$B$100,A2:A1001,$C$2:$C$100)", SPILL_NATIVE),
+    ("=SUMPRODUCT(A2*B2)", "=MAP(A2:A1001,B2:B1001,LAMBDA(cell_1,cell_2,SUMPRODUCT(cell_1*cell_2)))", SPILL_MAP),
+    ("=A2*$B$1:$B$3", "=MAP(A2:A1001,LAMBDA(cell_1,cell_1*$B$1:$B$3))", SPILL_MAP),
+    ("=SUM(A2:C2)", "=BYROW(A2:C1001,LAMBDA(row_1,SUM(row_1)))", SPILL_BYROW),
+    ("=SUM(A2:C2)+SUM(D2:E2)",
+     "=MAP(SEQUENCE(1000),LAMBDA(index_1,SUM(INDEX(A2:C1001,index_1,0))+SUM(INDEX(D2:E1001,index_1,0))))",
+     SPILL_INDEX),
+])
+def test_spill_modes(formula, expected, mode):
+    spill = spill_down(formula, 1000)
+    assert (spill.formula, spill.mode, spill.reason) == (expected, mode, None)
+
+
+def test_lambda_names_avoid_existing_names():
+    assert spill_down("=SUMPRODUCT(cell_1*A2)", 5).formula == "=MAP(A2:A6,LAMBDA(cell_2,SUMPRODUCT(cell_1*cell_2)))"
+
+
+@pytest.mark.parametrize("formula, count, reason", [
+    ("=LEFT(A2,3)", 1, "a single row has nothing to spill"),
+    ("=1+1", 10, "no reference moves from row to row"),
+    ("=ROW()", 10, "ROW() depends on the row the formula is in"),
+    ("=SUM(A$2:A2)", 10, "range A$2:A2 grows or moves by more than one row"),
+    ("=SUM(A1:B3)+A2", 10, "range A1:B3 grows or moves by more than one row"),
+    ("=A1048576", 10, "A1048576 would move past row 1,048,576"),
+    ('=A2&"abc', 10, "cannot parse formula"),
+])
+def test_unspillable_formulas_fall_back(formula, count, reason):
+    spill = spill_down(formula, count)
+    assert spill.formula is None and spill.mode is None and spill.since is None
+    assert spill.reason.startswith(reason)
+    assert (spill.source, spill.rows) == (formula, count)
+
+
+@pytest.mark.parametrize("target, native, byrow", [
+    ("2019", None, None),
+    ("2021", "=LEFT(A2:A11,3)", None),
+    ("2024", "=LEFT(A2:A11,3)", "=BYROW(A2:C11,LAMBDA(row_1,SUM(row_1)))"),
+    ("365", "=LEFT(A2:A11,3)", "=BYROW(A2:C11,LAMBDA(row_1,SUM(row_1)))"),
+])
+def test_target_version(target, native, byrow):
+    assert spill_down("=LEFT(A2,3)", 10, target).formula == native
+    assert spill_down("=SUM(A2:C2)", 10, target).formula == byrow
+
+
+def test_since():
+    assert spill_down("=LEFT(A2,3)", 10).since == "2021"
+    assert spill_down("=SUM(A2:C2)", 10).since == "2024"
+    assert spill_down("=SUM(A2:C2)", 10, "2021").reason == "needs LAMBDA (Excel 2024/365)"
+
+
+def test_unknown_target():
+    with pytest.raises(ValueError):
+        spill_down("=A2", 5, "1999")
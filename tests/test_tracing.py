@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""性能跟踪：关闭时为空操作、区间和计数器、直方图百分位、文本报表和 Chrome trace 导出"""
+
+import json
+import time
+
+import pytest
+
+from excel_function_maker.engine import FormulaEngine
+from excel_function_maker.tracing import TRACER, Histogram, Tracer
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracer.enable()
+    return tracer
+
+
+@pytest.fixture
+def global_tracer():
+    TRACER.reset()
+    TRACER.enable()
+    yield TRACER
+    TRACER.disable()
+    TRACER.reset()
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    assert tracer.span("a") is tracer.span("b")
+    with tracer.span("a") as span:
+        span.set(x=1)
+    tracer.count("c")
+    tracer.record("r", 0, 10)
+    assert (tracer.counters, tracer.histograms, list(tracer.events)) == ({}, {}, [])
+
+
+def test_span_count_and_record(tracer):
+    with tracer.span("engine.format", function="SUM") as span:
+        span.set(chars=12)
+    with pytest.raises(KeyError):
+        with tracer.span("engine.format"):
+            raise KeyError("x")
+    tracer.count("hits")
+    tracer.count("hits", 2)
+    start = time.perf_counter_ns()
+    tracer.record("worker.wait", start, start + 5000, key="preview")
+    assert tracer.counters == {"hits": 3}
+    assert tracer.histograms["engine.format"].count == 2
+    assert tracer.histograms["worker.wait"].max == 5000
+    names = [(name, args) for name, _, _, _, args in tracer.events]
+    assert names == [("engine.format", {"function": "SUM", "chars": 12}), ("engine.format", {"error": "KeyError"}),
+                     ("worker.wait", {"key": "preview"})]
+
+
+def test_histogram_percentiles_are_within_a_quarter():
+    histogram = Histogram()
+    for ns in range(1, 10001):
+        histogram.add(ns)
+    assert (histogram.count, histogram.min, histogram.max) == (10000, 1, 10000)
+    for fraction in (0.5, 0.9, 0.99):
+        exact = fraction * 10000
+        assert exact <= histogram.percentile(fraction) <= exact * 1.25
+    assert histogram.percentile(1.0) == 10000
+    assert Histogram().percentile(0.5) == 0
+
+
+def test_oldest_events_are_dropped():
+    tracer = Tracer(max_events=3)
+    tracer.enable()
+    for i in range(5):
+        tracer.record(f"span{i}", 0, 1000)
+    assert [name for name, *_ in tracer.events] == ["span2", "span3", "span4"]
+    assert tracer.snapshot()["dropped_events"] == 2
+    assert len(tracer.histograms) == 5
+    assert "2 oldest events dropped" in tracer.summary()
+
+
+def test_summary(tracer):
+    tracer.record("engine.format", 0, 1500)
+    tracer.count("gui.preview_errors", 1234)
+    lines = tracer.summary().splitlines()
+    assert lines[0].split() == ["span", "count", "mean", "p50", "p90", "p99", "max", "total"]
+    assert lines[1].startswith("engine.format") and "1.5 us" in lines[1]
+    assert lines[2].split() == ["gui.preview_errors", "1,234"]
+
+
+def test_chrome_trace_export(tracer, tmp_path):
+    with tracer.span("engine.format", function="SUM"):
+        pass
+    tracer.count("hits")
+    path = tmp_path / "trace.json"
+    tracer.export(str(path))
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    complete, counter = trace["traceEvents"]
+    assert (complete["name"], complete["cat"], complete["ph"], complete["args"]) == \
+        ("engine.format", "engine", "X", {"function": "SUM"})
+    assert complete["ts"] >= 0 and complete["dur"] >= 0
+    assert (counter["name"], counter["ph"], counter["args"]) == ("hits", "C", {"value": 1})
+    assert trace["otherData"]["spans"]["engine.format"]["count"] == 1
+
+
+def test_reset_keeps_enabled(tracer):
+    tracer.count("hits")
+    tracer.reset()
+    assert tracer.enabled and tracer.counters == {}
+
+
+def test_engine_stages_are_traced(global_tracer):
+    engine = FormulaEngine()
+    plain = engine.generate("VLOOKUP", ["John", "A1:D10", "3", "FALSE"])
+    assert plain == '=VLOOKUP("John",A1:D10,3,FALSE)'
+    assert {"engine.classify", "engine.format"} <= set(global_tracer.histograms)
+    assert "engine.rewrite" not in global_tracer.histograms
+    global_tracer.disable()
+    assert engine.generate("VLOOKUP", ["John", "A1:D10", "3", "FALSE"]) == plain
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""后台任务：结果在轮询时分发、同一 key 的新任务取代旧任务、错误回调、忙碌状态和关闭"""
+
+import threading
+
+import pytest
+
+from excel_function_maker.worker import BackgroundRunner
+
+
+@pytest.fixture
+def runner(root):
+    states = []
+    runner = BackgroundRunner(root, on_busy=states.append)
+    runner.states = states
+    yield runner
+    runner.close()
+
+
+def test_results_arrive_on_poll(root, runner):
+    results = []
+    runner.submit("preview", str.upper, ("sum",), on_result=results.append)
+    assert runner.busy and runner.states == [True]
+    assert results == []
+    root.wait(lambda: results)
+    assert results == ["SUM"]
+    assert not runner.busy and runner.states == [True, False]
+    # 全部完成后不再轮询
+    assert root.pending == 0
+
+
+def test_new_job_supersedes_the_running_one(root, runner):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(value):
+        started.set()
+        release.wait(5)
+        return value
+
+    results = []
+    runner.submit("preview", slow, ("old",), on_result=results.append)
+    assert started.wait(5)
+    runner.submit("preview", str, ("new",), on_result=results.append)
+    runner.submit("other", str, ("other",), on_result=results.append)
+    release.set()
+    root.wait(lambda: not runner.busy)
+    assert results == ["new", "other"]
+    assert runner.states == [True, False]
+
+
+def test_queued_job_is_skipped_when_superseded(root, runner):
+    release = threading.Event()
+    calls = []
+    runner.submit("block", release.wait, (5,))
+    runner.submit("preview", calls.append, ("old",))
+    runner.submit("preview", calls.append, ("new",))
+    release.set()
+    root.wait(lambda: not runner.busy)
+    assert calls == ["new"]
+
+
+def test_errors_go_to_on_error(root, runner):
+    results, errors = [], []
+    runner.submit("generate", int, ("x",), on_result=results.append, on_error=errors.append)
+    root.wait(lambda: not runner.busy)
+    assert results == []
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+
+
+def test_error_without_handler_is_dropped(root, runner):
+    runner.submit("generate", int, ("x",))
+    root.wait(lambda: not runner.busy)
+    assert runner.states == [True, False]
+
+
+def test_cancel(root, runner):
+    release = threading.Event()
+    results = []
+    runner.submit("preview", release.wait, (5,), on_result=results.append)
+    runner.cancel("preview")
+    release.set()
+    root.wait(lambda: not runner.busy)
+    assert results == []
+
+
+def test_close_cancels_jobs_and_polling(root, runner):
+    release = threading.Event()
+    results = []
+    runner.submit("preview", release.wait, (5,), on_result=results.append)
+    assert root.pending == 1
+    runner.close()
+    assert root.pending == 0
+    release.set()
+    root.advance(100)
+    assert results == []
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""流式 .xlsx 写入"""
+
+import math
+import zipfile
+
+import pytest
+
+from excel_function_maker.xlsx import XlsxWriter, display_formula, storage_formula, write_formulas
+
+
+def sheet_xml(path):
+    with zipfile.ZipFile(path) as archive:
+        return archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+
+def test_cells_by_type(tmp_path):
+    path = tmp_path / "out.xlsx"
+    with XlsxWriter(str(path)) as writer:
+        writer.write_row(["=SUM(A1:A3)", "text", 1.5, True, None, " padded", "a<b&c"])
+    xml = sheet_xml(path)
+    assert '<c r="A1"><f>SUM(A1:A3)</f></c>' in xml
+    assert '<c r="B1" t="inlineStr"><is><t>text</t></is></c>' in xml
+    assert '<c r="C1"><v>1.5</v></c>' in xml
+    assert '<c r="D1" t="b"><v>1</v></c>' in xml
+    assert 'r="E1"' not in xml
+    assert '<t xml:space="preserve"> padded</t>' in xml
+    assert "a&lt;b&amp;c" in xml
+
+
+def test_write_formulas_counts_rows(tmp_path):
+    path = tmp_path / "out.xlsx"
+    assert write_formulas(str(path), (f"=A{row}*2" for row in range(1, 101))) == 100
+    assert sheet_xml(path).count("<row ") == 100
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_nan_and_infinity_are_errors(tmp_path, value):
+    path = tmp_path / "out.xlsx"
+    with XlsxWriter(str(path)) as writer:
+        writer.write_row([value])
+    xml = sheet_xml(path)
+    assert '<c r="A1" t="e"><v>#NUM!</v></c>' in xml
+    assert "nan" not in xml and "inf" not in xml
+
+
+def test_formulas_off_writes_text(tmp_path):
+    path = tmp_path / "out.xlsx"
+    with XlsxWriter(str(path), formulas=False) as writer:
+        writer.write_row(["=SUM(A1)"])
+    assert "<t>=SUM(A1)</t>" in sheet_xml(path)
+
+
+@pytest.mark.parametrize("formula, stored", [
+    ("=SUM(A1:A3)", "SUM(A1:A3)"),
+    ("=XLOOKUP(A2,D:D,F:F)", "_xlfn.XLOOKUP(A2,D:D,F:F)"),
+    ('=CONCAT(A1:B1)&TEXTJOIN(",",TRUE,A1:C1)', '_xlfn.CONCAT(A1:B1)&_xlfn.TEXTJOIN(",",TRUE,A1:C1)'),
+    ("=STDEV.S(A1:A9)", "_xlfn.STDEV.S(A1:A9)"),
+    ("=SUM(FILTER(A1:A3,A1:A3>0))", "SUM(_xlfn._xlws.FILTER(A1:A3,A1:A3>0))"),
+    ("=LET(rng,A1:C1,total,SUMPRODUCT(LEN(rng)),total*2)",
+     "_xlfn.LET(_xlpm.rng,A1:C1,_xlpm.total,SUMPRODUCT(LEN(_xlpm.rng)),_xlpm.total*2)"),
+    ("=MAP(A2:A5,LAMBDA(cell_1,cell_1*2))", "_xlfn.MAP(A2:A5,_xlfn.LAMBDA(_xlpm.cell_1,_xlpm.cell_1*2))"),
+    # LET 外面的同名名称是工作簿中定义的名称，不加前缀
+    ("=SUM(x)+LET(x,1,x)", "SUM(x)+_xlfn.LET(_xlpm.x,1,_xlpm.x)"),
+    ("=_xlfn.XLOOKUP(A1,B:B,C:C)", "_xlfn.XLOOKUP(A1,B:B,C:C)"),
+    ('="XLOOKUP(A1)"', '"XLOOKUP(A1)"'),
+])
+def test_storage_formula_prefixes(formula, stored):
+    assert storage_formula(formula) == stored
+    assert display_formula(stored) == display_formula(formula[1:])
+
+
+def test_display_formula_keeps_text_in_strings():
+    assert display_formula('_xlfn.CONCAT("_xlfn.",A1)') == 'CONCAT("_xlfn.",A1)'
+
+
+def test_char_count_let_is_prefixed_in_file(tmp_path):
+    from excel_function_maker.engine import CHAR_COUNT_LET, FormulaEngine
+    formula = FormulaEngine(char_count_mode=CHAR_COUNT_LET).generate("CHAR_COUNT", ["A1:C1", "a"])
+    path = tmp_path / "out.xlsx"
+    write_formulas(str(path), [formula])
+    xml = sheet_xml(path)
+    assert "<f>_xlfn.LET(_xlpm.rng,A1:C1,_xlpm.total," in xml
+    assert "(rng" not in xml
+
+
+def test_invalid_sheet_name(tmp_path):
+    with pytest.raises(ValueError):
+        XlsxWriter(str(tmp_path / "out.xlsx"), sheet_name="a/b")